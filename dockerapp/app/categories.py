@@ -0,0 +1,87 @@
+import functools
+import logging
+import os
+import re
+
+# Category resolution for LLM responses and metadata rows. The taxonomy is loaded once at
+# startup (CATEGORY_TAXONOMY: a text file with one category per line, in priority order)
+# and lowercased up front; a response resolves to the first category, in taxonomy order,
+# that equals the suggested category or appears anywhere in the response text.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAXONOMY = [
+    'general tools', 'graph technologies', 'healthcare data', 'ai and legal systems',
+    'federated search', 'organized crime analysis', 'beneficial ownership',
+    'financial crime technology', 'corporate governance', 'power and utilities',
+    'Social Media', 'Community Platform', 'Database', 'News', 'Blog', 'E-commerce',
+    'International Economics/Policy', 'Data Analysis', 'Machine Learning / AI'
+]
+UNCATEGORIZED = 'Uncategorized'
+CATEGORY_PATTERN = re.compile(r'Category:\s*([A-Za-z\s/]+)(?:\s*Keywords:|$)')
+KEYWORDS_PATTERN = re.compile(r'Keywords:\s*([^.]+)')
+CAPITALIZED_PATTERN = re.compile(r'\b[A-Z][a-zA-Z\s-]+\b')
+
+
+def load_taxonomy(path=None):
+    if not path:
+        return list(DEFAULT_TAXONOMY)
+    with open(path, 'r', encoding='utf-8') as file:
+        categories = [line.strip() for line in file if line.strip() and not line.lstrip().startswith('#')]
+    if not categories:
+        raise ValueError(f"Category taxonomy {path} is empty")
+    logger.info("Loaded %d categories from %s", len(categories), path)
+    return categories
+
+
+class CategoryMatcher:
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self.lowered = [category.lower() for category in self.categories]
+        self.exact = {}
+        for index, lowered in enumerate(self.lowered):
+            self.exact.setdefault(lowered, index)
+
+    def match(self, suggested_category, response):
+        # An exact match on the suggested category bounds the search: only higher-priority
+        # categories need a substring check, each one a single C-level scan of the lowered response
+        first = self.exact.get(suggested_category.lower(), len(self.categories))
+        lowered_response = response.lower()
+        for index in range(first):
+            if self.lowered[index] in lowered_response:
+                return self.categories[index]
+        return self.categories[first] if first < len(self.categories) else UNCATEGORIZED
+
+    def parse(self, response):
+        category = UNCATEGORIZED
+        suggested_category = UNCATEGORIZED
+        keywords = ['none']
+        if not response:
+            return category, suggested_category, keywords
+        match = CATEGORY_PATTERN.search(response)
+        if match:
+            suggested_category = match.group(1).strip()
+        category = self.match(suggested_category, response)
+        match = KEYWORDS_PATTERN.search(response)
+        if match:
+            keyword_str = match.group(1).strip()
+            keywords = [k.strip() for k in keyword_str.split(',') if k.strip()][:3]
+        if not keywords or keywords == ['none']:
+            lowered_category = category.lower()
+            lowered_suggested = suggested_category.lower()
+            keywords = [k.strip() for k in CAPITALIZED_PATTERN.findall(response)
+                        if len(k.split()) <= 2 and k.lower() not in lowered_category and k.lower() not in lowered_suggested][:3]
+        return category, suggested_category, keywords if keywords else ['none']
+
+
+matcher = CategoryMatcher(load_taxonomy(os.getenv('CATEGORY_TAXONOMY')))
+
+
+def parse_category_and_keywords(response):
+    return matcher.parse(response)
+
+
+@functools.lru_cache(maxsize=4096)
+def category_for(label):
+    # Category of a bare label (metadata CSV rows, structured LLM output); labels repeat, so results are memoized
+    return matcher.parse(f"Category: {label}")[0]
@@ -0,0 +1,103 @@
+import contextvars
+import queue
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import kuzu
+
+from telemetry import KUZU_SECONDS, statement_clause
+
+# Connection management over the shared kuzu.Database: a pool of connections checked out
+# per request for reads, and a single writer thread that applies every write in order so
+# concurrent requests never share a connection or contend for the write transaction.
+
+
+class PooledConnection:
+    # Wraps a kuzu.Connection with a per-connection cache of prepared statements, so hot
+    # parameterized queries (existence checks, MERGEs) are only planned once
+    def __init__(self, conn, max_statements=128):
+        self.conn = conn
+        self.max_statements = max_statements
+        self.statements = OrderedDict()
+
+    def _prepare(self, query):
+        statement = self.statements.get(query)
+        if statement is not None:
+            self.statements.move_to_end(query)
+            return statement
+        with warnings.catch_warnings():
+            # Newer Kùzu releases deprecate prepare() in favour of execute(), which still accepts prepared statements
+            warnings.simplefilter('ignore', DeprecationWarning)
+            statement = self.conn.prepare(query)
+        self.statements[query] = statement
+        if len(self.statements) > self.max_statements:
+            self.statements.popitem(last=False)
+        return statement
+
+    def execute(self, query, parameters=None):
+        with KUZU_SECONDS.time(statement_clause(query)):
+            if not parameters:
+                return self.conn.execute(query)
+            return self.conn.execute(self._prepare(query), parameters)
+
+
+class ConnectionPool:
+    def __init__(self, db, size=4):
+        self.db = db
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                return PooledConnection(kuzu.Connection(self.db))
+        return self.idle.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+
+class WriteQueue:
+    def __init__(self, db):
+        self.db = db
+        self.tasks = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        conn = PooledConnection(kuzu.Connection(self.db))
+        while True:
+            future, context, fn, args, kwargs = self.tasks.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                # Run in the submitter's context so its trace id follows the write
+                future.set_result(context.run(fn, conn, *args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.tasks.put((future, contextvars.copy_context(), fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        # Blocks until the writer thread has applied fn(conn, *args, **kwargs)
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("WriteQueue.run called from the writer thread")
+        return self.submit(fn, *args, **kwargs).result()
@@ -0,0 +1,120 @@
+import csv
+import logging
+import os
+import threading
+
+from helpers import METADATA_FIELDS
+from telemetry import stage
+
+# Incremental export of links_with_metadata.csv. Each mutation appends one line to a
+# change log (adds and tombstoned deletes); compaction replays the log over the current
+# snapshot and atomically replaces it, so per-mutation cost is O(change) instead of
+# rewriting every link. on_snapshot is called after each new snapshot is in place.
+
+LOG_FIELDS = ['op'] + METADATA_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def record_to_row(record):
+    return {
+        "url": record['url'],
+        "title": record['title'] or '',
+        "content": record['raw_content'] or '',
+        "category": record['raw_category'] or '',
+        "keyword": record['keywords'] or '',
+        "category_explanation": record['category_explanation'] or '',
+        "keyword_explanation": record['keyword_explanation'] or ''
+    }
+
+
+class Exporter:
+    def __init__(self, snapshot_path, log_path=None, compact_every=500, parquet=False, on_snapshot=None):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or f"{os.path.splitext(snapshot_path)[0]}.changes.csv"
+        self.parquet_path = f"{os.path.splitext(snapshot_path)[0]}.parquet" if parquet else None
+        self.compact_every = compact_every
+        self.on_snapshot = on_snapshot
+        self.lock = threading.Lock()
+        self.pending = self._count_log()
+
+    def _count_log(self):
+        if not os.path.exists(self.log_path):
+            return 0
+        with open(self.log_path, 'r', encoding='utf-8', newline='') as file:
+            return sum(1 for _ in csv.DictReader(file))
+
+    def _append(self, rows):
+        with self.lock, stage('export_append'):
+            new_file = not os.path.exists(self.log_path)
+            with open(self.log_path, 'a', encoding='utf-8', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=LOG_FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(rows)
+            self.pending += len(rows)
+            due = self.compact_every and self.pending >= self.compact_every
+        if due:
+            self.compact()
+
+    def record_add(self, records):
+        self._append([dict(record_to_row(record), op='add') for record in records])
+
+    def record_delete(self, url):
+        self._append([dict({field: '' for field in METADATA_FIELDS}, url=url, op='delete')])
+
+    def _read_rows(self, path):
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            return list(csv.DictReader(file))
+
+    def _write_snapshot(self, rows):
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=METADATA_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, self.snapshot_path)
+        if self.parquet_path:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            tmp_path = f"{self.parquet_path}.tmp"
+            table = pa.table({field: pa.array([row[field] for row in rows], type=pa.string()) for field in METADATA_FIELDS})
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, self.parquet_path)
+        if self.on_snapshot:
+            self.on_snapshot()
+
+    def _truncate_log(self):
+        # Replaying a log twice is idempotent, so a crash between replace and truncate is safe
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.pending = 0
+
+    def compact(self):
+        with self.lock, stage('export_compact'):
+            changes = self._read_rows(self.log_path)
+            if not changes and (not self.parquet_path or os.path.exists(self.parquet_path)):
+                return 0
+            rows = {row['url']: {field: row.get(field) or '' for field in METADATA_FIELDS}
+                    for row in self._read_rows(self.snapshot_path)}
+            for change in changes:
+                if change['op'] == 'delete':
+                    rows.pop(change['url'], None)
+                else:
+                    rows[change['url']] = {field: change[field] for field in METADATA_FIELDS}
+            self._write_snapshot(list(rows.values()))
+            self._truncate_log()
+            logger.info("Compacted %d changes into %s (%d links)", len(changes), self.snapshot_path, len(rows))
+            return len(changes)
+
+    def rebuild(self, conn):
+        # Full export from the database, for recovery or when the snapshot has drifted
+        with self.lock, stage('export_rebuild'):
+            result = conn.execute("MATCH (l:Link) RETURN l.url, l.title, l.raw_content, l.raw_category, l.keywords, l.category_explanation, l.keyword_explanation")
+            rows = [dict(zip(METADATA_FIELDS, [value if value else '' for value in row])) for row in result]
+            self._write_snapshot(rows)
+            self._truncate_log()
+            logger.info("Saved %d links to %s", len(rows), self.snapshot_path)
+            return len(rows)
@@ -0,0 +1,234 @@
+import html.entities
+import re
+from html.parser import HTMLParser
+
+# Title and text extraction from fetched pages. Two interchangeable extractors return
+# (title, raw_content): 'soup' builds a full BeautifulSoup tree, and 'streaming' runs
+# html.parser without building a tree, keeping only the text of <p>/<h1>-<h6> elements,
+# and stops as soon as the first <title> and the content budget are filled.
+# The streaming extractor mirrors how BeautifulSoup's html.parser builder nests tags
+# and splits strings, so both return the same results.
+
+MAX_CONTENT_CHARS = 5000
+CONTENT_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+# Tags BeautifulSoup closes immediately, and tags whose text is not part of get_text()
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta', 'param',
+    'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+}
+STRING_CONTAINER_TAGS = {'rt', 'rp', 'style', 'script', 'template'}
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+NUMERIC_REFERENCE = re.compile(r'^([0-9a-fA-F]+)(.*)', re.DOTALL)
+
+
+def extract_with_soup(html, url):
+    from bs4 import BeautifulSoup  # Only this extractor needs bs4, so it is not loaded at startup
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.title.string.strip() if soup.title and soup.title.string is not None else url
+    text_elements = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    return title, ' '.join(element.get_text(strip=True) for element in text_elements)[:MAX_CONTENT_CHARS]
+
+
+def numeric_reference(name):
+    # Resolve a character reference the way the HTML spec (and BeautifulSoup) does; returns (character, trailing data)
+    base = 16 if name[:1] in ('x', 'X') else 10
+    match = NUMERIC_REFERENCE.match(name[1:] if base == 16 else name)
+    if not match or (base == 10 and not match.group(1).isdigit()):
+        return '', name
+    codepoint = int(match.group(1), base)
+    if codepoint == 0 or codepoint > 0x10ffff or 0xd800 <= codepoint <= 0xdfff:
+        return '\ufffd', match.group(2)
+    if 0x80 <= codepoint <= 0x9f:
+        try:
+            return bytes([codepoint]).decode('windows-1252'), match.group(2)
+        except UnicodeDecodeError:
+            pass
+    return chr(codepoint), match.group(2)
+
+
+class _Done(Exception):
+    pass
+
+
+class StreamingExtractor(HTMLParser):
+    def __init__(self, limit=MAX_CONTENT_CHARS):
+        super().__init__(convert_charrefs=False)
+        self.limit = limit
+        self.stack = []  # open elements as [name, content index or None, title subtree node or None]
+        self.containers = 0
+        self.pending = []
+        self.texts = []
+        self.lengths = []
+        self.closed = []
+        self.open_content = []
+        self.stable_index = 0
+        self.stable_length = -1
+        self.title = None
+        self.title_done = False
+        self.already_closed = []
+
+    def _node(self):
+        # Title subtree node of the innermost open element, if we are inside the first <title>
+        return self.stack[-1][2] if self.stack else None
+
+    def _add_child(self, child):
+        node = self._node()
+        if node is not None:
+            node.append(child)
+
+    def _flush(self, content=True):
+        if not self.pending:
+            return
+        data = ''.join(self.pending)
+        self.pending = []
+        if not data.strip(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        self._add_child(data)
+        if content and not self.containers:
+            self._add_text(data)
+
+    def _add_text(self, data):
+        data = data.strip()
+        if data and self.open_content:
+            for index in self.open_content:
+                self.texts[index].append(data)
+                self.lengths[index] += len(data)
+            self._check_done()
+
+    def _check_done(self):
+        if not self.title_done:
+            return
+        while self.stable_index < len(self.texts) and self.closed[self.stable_index]:
+            self.stable_length += self.lengths[self.stable_index] + 1
+            self.stable_index += 1
+        stable = max(self.stable_length, 0)
+        if self.stable_index < len(self.texts):
+            stable = self.stable_length + 1 + self.lengths[self.stable_index]
+        if stable >= self.limit:
+            raise _Done()
+
+    def _push(self, tag):
+        node = self._node()
+        child = None
+        if node is not None:
+            child = []
+            node.append(child)
+        elif tag == 'title' and self.title is None:
+            child = self.title = []
+        index = None
+        if tag in CONTENT_TAGS:
+            index = len(self.texts)
+            self.texts.append([])
+            self.lengths.append(0)
+            self.closed.append(False)
+            self.open_content.append(index)
+        if tag in STRING_CONTAINER_TAGS:
+            self.containers += 1
+        self.stack.append([tag, index, child])
+
+    def _pop_to(self, tag):
+        for position in range(len(self.stack) - 1, -1, -1):
+            if self.stack[position][0] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > position:
+            name, index, node = self.stack.pop()
+            if index is not None:
+                self.closed[index] = True
+                self.open_content.remove(index)
+            if name in STRING_CONTAINER_TAGS:
+                self.containers -= 1
+            if node is not None and node is self.title:
+                self.title_done = True
+        self._check_done()
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in VOID_TAGS:
+            # Closed on the spot; a later explicit end tag for it is swallowed
+            self._add_child([])
+            self.already_closed.append(tag)
+        else:
+            self._push(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        self._push(tag)
+        self._pop_to(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.already_closed:
+            self.already_closed.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self.pending.append(data)
+
+    def handle_charref(self, name):
+        character, extra = numeric_reference(name)
+        self.pending.append(character)
+        self.pending.append(extra)
+
+    def handle_entityref(self, name):
+        character = html.entities.html5.get(name + ';')
+        if character is None and name in html.entities.name2codepoint:
+            character = chr(html.entities.name2codepoint[name])
+        self.pending.append(character if character is not None else f"&{name}")
+
+    def _handle_node(self, data, content=False):
+        self._flush()
+        self.pending.append(data)
+        self._flush(content=False)
+        if content:
+            self._add_text(data)
+
+    def handle_comment(self, data):
+        self._handle_node(data)
+
+    def handle_decl(self, decl):
+        self._handle_node(decl[len("DOCTYPE "):])
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            self._handle_node(data[len("CDATA["):], content=True)
+        else:
+            self._handle_node(data)
+
+    def handle_pi(self, data):
+        self._handle_node(data)
+
+    def result(self, url):
+        title = url
+        text = self.title
+        while text is not None and not isinstance(text, str):
+            text = text[0] if len(text) == 1 else None
+        if text is not None:
+            title = text.strip()
+        content = ' '.join(''.join(parts) for parts in self.texts)
+        return title, content[:self.limit]
+
+
+def extract_streaming(html, url):
+    # One feed() call, as BeautifulSoup does: html.parser tokenizes malformed references differently
+    # at chunk boundaries. Parsing still stops early, from inside the handlers.
+    parser = StreamingExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+        parser._flush()
+    except _Done:
+        pass
+    return parser.result(url)
+
+
+EXTRACTORS = {'soup': extract_with_soup, 'streaming': extract_streaming}
+
+
+def get_extractor(name):
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown HTML extractor: {name} (expected one of {', '.join(EXTRACTORS)})")
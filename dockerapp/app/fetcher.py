@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+import urllib.parse
+
+from telemetry import STAGE_SECONDS
+
+# Fetch stage for the job workers: one pooled keep-alive session per worker thread, a
+# per-host concurrency cap, retry with exponential backoff, a cap on the number of body
+# bytes downloaded per page, and conditional GETs for recrawls. There is no pool of its
+# own: each job worker fetches one page at a time, so JOB_WORKERS sets how many fetches
+# run at once. FetchStats collects a job's fetch throughput and latency percentiles.
+# requests is imported by the first fetch rather than at startup.
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def decode_body(response, body):
+    # Same decoding as requests' Response.text, applied to the (possibly truncated) body
+    if not body:
+        return ""
+    from requests.compat import chardet
+    encoding = response.encoding
+    if encoding is None:
+        encoding = chardet.detect(body)['encoding'] if chardet is not None else 'utf-8'
+    try:
+        return str(body, encoding, errors='replace')
+    except (LookupError, TypeError):
+        return str(body, errors='replace')
+
+
+class FetchStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.failures = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, page):
+        with self.lock:
+            self.latencies.append(page['elapsed'])
+            if page['error']:
+                self.failures += 1
+            self.finished = time.perf_counter()
+
+    def summary(self):
+        with self.lock:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+            pages = len(self.latencies)
+            return {
+                "pages": pages,
+                "failures": self.failures,
+                "seconds": elapsed,
+                "pages_per_sec": pages / elapsed if elapsed > 0 else 0.0,
+                "p50_ms": percentile(self.latencies, 50) * 1000,
+                "p99_ms": percentile(self.latencies, 99) * 1000
+            }
+
+
+class Fetcher:
+    def __init__(self, pool_connections=16, per_host=4, retries=2, backoff=0.5, timeout=10, max_bytes=2 * 1024 * 1024):
+        self.pool_connections = pool_connections  # Hosts each worker's session keeps a keep-alive connection to
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def _session(self):
+        # requests.Session is not thread-safe, so each worker thread keeps its own pooled session
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=1)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def _host_slot(self, url):
+        host = urllib.parse.urlparse(url).netloc
+        with self._hosts_lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+        return slot
+
+    def _read_body(self, response):
+        # Stop downloading at max_bytes; only the start of a page is ever extracted
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if self.max_bytes and size >= self.max_bytes:
+                response.close()
+                return b''.join(chunks)[:self.max_bytes], True
+        return b''.join(chunks), False
+
+    def fetch(self, url, etag=None, last_modified=None, stats=None):
+        # With etag/last_modified from an earlier fetch this is a conditional GET; an unchanged page comes back as a 304
+        import requests
+        conditional = {}
+        if etag:
+            conditional['If-None-Match'] = etag
+        if last_modified:
+            conditional['If-Modified-Since'] = last_modified
+        start = time.perf_counter()
+        error = None
+        response = None
+        body = b''
+        truncated = False
+        for attempt in range(self.retries + 1):
+            try:
+                with self._host_slot(url):
+                    response = self._session().get(url, timeout=self.timeout, stream=True, headers=conditional)
+                    if response.status_code < 400:
+                        body, truncated = self._read_body(response)
+                    else:
+                        response.close()
+                if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                    raise requests.HTTPError(f"{response.status_code} retryable status", response=response)
+                response.raise_for_status()
+                error = None
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                error = e
+                status = e.response.status_code if getattr(e, 'response', None) is not None else None
+                if attempt >= self.retries or (status is not None and status not in RETRY_STATUSES):
+                    break
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random() * 0.25))
+            except requests.RequestException as e:
+                error = e
+                break
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, 'fetch')
+        page = {
+            "url": url,
+            "status": response.status_code if response is not None else None,
+            "text": decode_body(response, body) if response is not None and error is None else "",
+            "headers": dict(response.headers) if response is not None else {},
+            "etag": response.headers.get('ETag') if response is not None else None,
+            "last_modified": response.headers.get('Last-Modified') if response is not None else None,
+            "not_modified": response is not None and response.status_code == 304 and error is None,
+            "truncated": truncated,
+            "error": error,
+            "elapsed": elapsed
+        }
+        if stats is not None:
+            stats.record(page)
+        return page
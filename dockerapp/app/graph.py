@@ -0,0 +1,184 @@
+import base64
+import json
+import threading
+import uuid
+from collections import OrderedDict
+
+# Graph export for /graph_data: keyset-paginated scans over each node and edge table,
+# k-hop neighbourhood subgraphs, and a response cache keyed on the data version so
+# repeated loads of an unchanged graph skip the database entirely.
+
+SECTIONS = [
+    {"kind": "node", "match": "MATCH (l:Link) WHERE l.title IS NOT NULL", "keys": ["l.url"], "returns": "l.url, l.title",
+     "item": lambda row: {"id": f"Link:{row[0]}", "label": row[1], "group": "Link"}},
+    {"kind": "node", "match": "MATCH (c:Category) WHERE c.name IS NOT NULL", "keys": ["c.name"], "returns": "c.name",
+     "item": lambda row: {"id": f"Category:{row[0]}", "label": row[0], "group": "Category"}},
+    {"kind": "node", "match": "MATCH (k:Keyword) WHERE k.name IS NOT NULL", "keys": ["k.name"], "returns": "k.name, k.label",
+     "item": lambda row: {"id": f"Keyword:{row[0]}", "label": row[1] or row[0], "group": "Keyword"}},
+    {"kind": "edge", "relation": "BELONGS_TO", "match": "MATCH (l:Link)-[:BELONGS_TO]->(c:Category) WHERE true", "keys": ["l.url", "c.name"], "returns": "l.url, c.name",
+     "item": lambda row: {"from": f"Link:{row[0]}", "to": f"Category:{row[1]}"}},
+    {"kind": "edge", "relation": "HAS_KEYWORD", "match": "MATCH (l:Link)-[:HAS_KEYWORD]->(k:Keyword) WHERE true", "keys": ["l.url", "k.name"], "returns": "l.url, k.name",
+     "item": lambda row: {"from": f"Link:{row[0]}", "to": f"Keyword:{row[1]}"}}
+]
+
+
+class DataVersion:
+    # Bumped on every mutation; the boot token keeps ETags from colliding across restarts
+    def __init__(self):
+        self.token = uuid.uuid4().hex[:8]
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def bump(self):
+        with self.lock:
+            self.value += 1
+            return self.value
+
+    def tag(self):
+        return f"{self.token}-{self.value}"
+
+
+class ResponseCache:
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get(self, version, key):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+                return None
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def put(self, version, key, body):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            self.entries[key] = body
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def encode_cursor(section, key):
+    return base64.urlsafe_b64encode(json.dumps([section, key]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return 0, None
+    section, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return int(section), key
+
+
+def iter_section(conn, section, after=None, limit=None):
+    keys = section['keys']
+    params = {}
+    condition = ""
+    if after is not None:
+        # Keyset condition: (k0, k1) > (after0, after1)
+        params = {f"k{i}": value for i, value in enumerate(after)}
+        if len(keys) == 1:
+            condition = f" AND {keys[0]} > $k0"
+        else:
+            condition = f" AND ({keys[0]} > $k0 OR ({keys[0]} = $k0 AND {keys[1]} > $k1))"
+    query = f"{section['match']}{condition} RETURN {section['returns']}"
+    if limit is not None:
+        query += f" ORDER BY {', '.join(keys)} LIMIT $limit"
+        params['limit'] = limit
+    for row in conn.execute(query, params):
+        yield row[:len(keys)], section['item'](row)
+
+
+def iter_graph(conn):
+    for section in SECTIONS:
+        for _, item in iter_section(conn, section):
+            yield section['kind'], item
+
+
+def page_graph(conn, cursor=None, limit=1000):
+    start, after = decode_cursor(cursor)
+    items = []
+    for index in range(start, len(SECTIONS)):
+        need = limit + 1 - len(items)
+        if need <= 0:
+            break
+        section_after = after if index == start else None
+        for key, item in iter_section(conn, SECTIONS[index], section_after, need):
+            items.append((index, key, item))
+    next_cursor = None
+    if len(items) > limit:
+        index, key, _ = items[limit - 1]
+        next_cursor = encode_cursor(index, key)
+        items = items[:limit]
+    return [(SECTIONS[index]['kind'], item) for index, _, item in items], next_cursor
+
+
+def neighbourhood(conn, links=(), categories=(), keywords=(), hops=1):
+    seen = {"links": set(links), "categories": set(categories), "keywords": set(keywords)}
+    frontier = {name: set(values) for name, values in seen.items()}
+    for _ in range(hops):
+        found = {"links": set(), "categories": set(), "keywords": set()}
+        if frontier['categories']:
+            result = conn.execute("MATCH (l:Link)-[:BELONGS_TO]->(c:Category) WHERE c.name IN $names RETURN l.url", {"names": list(frontier['categories'])})
+            found['links'].update(row[0] for row in result)
+        if frontier['keywords']:
+            result = conn.execute("MATCH (l:Link)-[:HAS_KEYWORD]->(k:Keyword) WHERE k.name IN $names RETURN l.url", {"names": list(frontier['keywords'])})
+            found['links'].update(row[0] for row in result)
+        if frontier['links']:
+            urls = list(frontier['links'])
+            result = conn.execute("MATCH (l:Link)-[:BELONGS_TO]->(c:Category) WHERE l.url IN $urls RETURN c.name", {"urls": urls})
+            found['categories'].update(row[0] for row in result)
+            result = conn.execute("MATCH (l:Link)-[:HAS_KEYWORD]->(k:Keyword) WHERE l.url IN $urls RETURN k.name", {"urls": urls})
+            found['keywords'].update(row[0] for row in result)
+        frontier = {name: found[name] - seen[name] for name in seen}
+        if not any(frontier.values()):
+            break
+        for name in seen:
+            seen[name].update(frontier[name])
+    return seen
+
+
+def iter_subgraph(conn, links, categories, keywords):
+    urls, category_names, keyword_names = list(links), list(categories), list(keywords)
+    queries = [
+        ("node", "MATCH (l:Link) WHERE l.url IN $urls AND l.title IS NOT NULL RETURN l.url, l.title", {"urls": urls}, SECTIONS[0]['item']),
+        ("node", "MATCH (c:Category) WHERE c.name IN $names RETURN c.name", {"names": category_names}, SECTIONS[1]['item']),
+        ("node", "MATCH (k:Keyword) WHERE k.name IN $names RETURN k.name, k.label", {"names": keyword_names}, SECTIONS[2]['item']),
+        ("edge", "MATCH (l:Link)-[:BELONGS_TO]->(c:Category) WHERE l.url IN $urls AND c.name IN $names RETURN l.url, c.name",
+         {"urls": urls, "names": category_names}, SECTIONS[3]['item']),
+        ("edge", "MATCH (l:Link)-[:HAS_KEYWORD]->(k:Keyword) WHERE l.url IN $urls AND k.name IN $names RETURN l.url, k.name",
+         {"urls": urls, "names": keyword_names}, SECTIONS[4]['item'])
+    ]
+    for kind, query, params, to_item in queries:
+        if not all(params.values()):
+            continue
+        for row in conn.execute(query, params):
+            yield kind, to_item(row)
+
+
+def parse_node_id(node_id):
+    group, _, name = node_id.partition(':')
+    if group == 'Link':
+        return {"links": [name]}
+    if group == 'Category':
+        return {"categories": [name]}
+    if group == 'Keyword':
+        return {"keywords": [name]}
+    raise ValueError(f"Unknown node id: {node_id}")
+
+
+def find_duplicate_ids(nodes):
+    seen = set()
+    duplicates = set()
+    for node in nodes:
+        if node['id'] in seen:
+            duplicates.add(node['id'])
+        seen.add(node['id'])
+    return duplicates
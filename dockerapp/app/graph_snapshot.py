@@ -0,0 +1,325 @@
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import threading
+import uuid
+from collections import deque
+
+import numpy as np
+
+from graph import SECTIONS, iter_section
+from telemetry import stage
+
+# Compact graph snapshot for the browser and the notebook. Every node gets an integer id,
+# every node name and label is stored once in a string dictionary, and edges are a CSR
+# adjacency over the node ids, so the whole graph is a handful of flat NumPy arrays
+# saved as .npy files that can be memory-mapped instead of replaying ingestion. Ids are
+# never reused within an epoch, which lets a client holding an older version apply just
+# the nodes and edges that changed since; when too many ids have been freed the graph is
+# renumbered under a new epoch and clients start over from the full snapshot.
+#
+#   <snapshot_dir>/CURRENT                  name of the newest generation directory
+#   <snapshot_dir>/<generation>/meta.json   version, group and relation names, counts
+#   strings.npy        uint8   UTF-8 bytes of every string, concatenated
+#   string_offsets.npy int64   string i is strings[string_offsets[i]:string_offsets[i + 1]]
+#   node_group.npy     uint8   index into groups; REMOVED for freed ids
+#   node_name.npy      int32   string index of the node's name (URL, category or keyword), -1 if freed
+#   node_label.npy     int32   string index of the node's display label, -1 if freed
+#   indptr.npy         int64   the edges of node i are indices[indptr[i]:indptr[i + 1]]
+#   indices.npy        int32   target node id of each edge
+#   edge_type.npy      uint8   index into relations
+
+FORMAT_VERSION = 1
+GROUPS = ['Link', 'Category', 'Keyword']
+RELATIONS = [section['relation'] for section in SECTIONS if section['kind'] == 'edge']
+REMOVED = 255
+ARRAYS = ('strings', 'string_offsets', 'node_group', 'node_name', 'node_label', 'indptr', 'indices', 'edge_type')
+TARGET_BITS = 30  # An edge is packed into one int64 as source << 32 | target << 2 | relation
+GENERATION_RE = re.compile(r"^\d{8}$")
+
+logger = logging.getLogger(__name__)
+
+
+def pack_edges(sources, targets, relations):
+    return (np.asarray(sources, dtype=np.int64) << 32) | (np.asarray(targets, dtype=np.int64) << 2) | np.asarray(relations, dtype=np.int64)
+
+
+def unpack_edges(codes):
+    return codes >> 32, (codes >> 2) & ((1 << TARGET_BITS) - 1), codes & 3
+
+
+def encode_strings(values):
+    # (strings, string_offsets, index of each value); repeated values are stored once
+    ids, encoded = {}, []
+    refs = []
+    for value in values:
+        ref = ids.get(value)
+        if ref is None:
+            ref = ids[value] = len(encoded)
+            encoded.append(value.encode('utf-8'))
+        refs.append(ref)
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets, refs
+
+
+def decode_strings(strings, offsets):
+    data = bytes(strings)
+    offsets = offsets.tolist()
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+
+def load_arrays(snapshot_dir, mmap_mode='r'):
+    # (meta, {name: array}) of the current generation, or None when there is none
+    try:
+        with open(os.path.join(snapshot_dir, 'CURRENT'), 'r', encoding='utf-8') as file:
+            directory = os.path.join(snapshot_dir, file.read().strip())
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS}
+    except (OSError, ValueError):
+        return None
+    return meta, arrays
+
+
+class GraphSnapshot:
+    def __init__(self, snapshot_dir, history=64, compact_ratio=0.25):
+        self.snapshot_dir = snapshot_dir
+        self.compact_ratio = compact_ratio
+        self.lock = threading.Lock()
+        self.data_version = None
+        self.loaded = False
+        self.history = deque(maxlen=history)  # One step per generation: the changes from the version before it
+        self.generation = 0
+        self._reset()
+
+    def _reset(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.ids = {}  # graph node id ('Link:<url>') -> integer id
+        self.keys = []  # integer id -> graph node id, None once freed
+        self.labels = []
+        self.codes = np.zeros(0, dtype=np.int64)  # Sorted packed edges
+        self.history.clear()
+
+    @property
+    def version(self):
+        return f"{self.epoch}-{self.generation}"
+
+    def __len__(self):
+        return len(self.ids)
+
+    def refresh(self, version, connection):
+        # version is the app's data version; connection is a context-manager factory such as ConnectionPool.connection
+        if self.data_version == version:
+            return self
+        with self.lock:
+            if self.data_version != version:
+                if not self.loaded:
+                    self.load()
+                with connection() as conn, stage('graph_snapshot'):
+                    nodes, edges = self._read(conn)
+                    self._update(nodes, edges)
+                self.data_version = version
+        return self
+
+    def _read(self, conn):
+        nodes, edges = {}, []
+        for section in SECTIONS:
+            if section['kind'] == 'node':
+                nodes.update((item['id'], item['label']) for _, item in iter_section(conn, section))
+            else:
+                relation = RELATIONS.index(section['relation'])
+                edges.extend((item['from'], item['to'], relation) for _, item in iter_section(conn, section))
+        return nodes, edges
+
+    def _update(self, nodes, edges):
+        ids, keys, labels = self.ids, self.keys, self.labels
+        removed = [key for key in ids if key not in nodes]
+        removed = {ids.pop(key) for key in removed}
+        for node in removed:
+            keys[node] = labels[node] = None
+        renumber = len(keys) - len(ids) > max(1024, len(ids) * self.compact_ratio)
+        if renumber:
+            # Too many freed ids: start a new epoch with dense ids
+            self._reset()
+            ids, keys, labels = self.ids, self.keys, self.labels
+        upserted = set()
+        for key, label in nodes.items():
+            node = ids.get(key)
+            if node is None:
+                node = ids[key] = len(keys)
+                keys.append(key)
+                labels.append(label)
+                upserted.add(node)
+            elif labels[node] != label:
+                labels[node] = label
+                upserted.add(node)
+        if len(keys) >= 1 << TARGET_BITS:
+            raise ValueError(f"Graph snapshot ids exceed {1 << TARGET_BITS}")
+        packed = [(ids[source], ids[target], relation) for source, target, relation in edges
+                  if source in nodes and target in nodes]  # Edges to nodes the graph leaves out, like untitled links
+        codes = np.unique(pack_edges(*zip(*packed))) if packed else np.zeros(0, dtype=np.int64)
+        added = np.setdiff1d(codes, self.codes, assume_unique=True)
+        dropped = np.setdiff1d(self.codes, codes, assume_unique=True)
+        if not (renumber or upserted or removed or len(added) or len(dropped)) and self.generation:
+            return False
+        previous = self.version
+        self.generation += 1
+        if not renumber and self.generation > 1:
+            self.history.append({"since": previous, "nodes": upserted, "removed_nodes": removed,
+                                 "edges": added, "removed_edges": dropped})
+        self.codes = codes
+        self.save()
+        logger.info("Graph snapshot %s: %d nodes, %d edges (%d nodes and %d edges changed)", self.version, len(ids),
+                    len(codes), len(upserted) + len(removed), len(added) + len(dropped))
+        return True
+
+    def arrays(self):
+        groups = {group: index for index, group in enumerate(GROUPS)}
+        node_group = np.full(len(self.keys), REMOVED, dtype=np.uint8)
+        node_name = np.full(len(self.keys), -1, dtype=np.int32)
+        node_label = np.full(len(self.keys), -1, dtype=np.int32)
+        live = [node for node, key in enumerate(self.keys) if key is not None]
+        values = []
+        for node in live:
+            group, _, name = self.keys[node].partition(':')
+            node_group[node] = groups[group]
+            values.append(name)
+            values.append(self.labels[node])
+        strings, offsets, refs = encode_strings(values)
+        node_name[live] = refs[0::2]
+        node_label[live] = refs[1::2]
+        sources, targets, relations = unpack_edges(self.codes)
+        indptr = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(self.keys)), out=indptr[1:])
+        return {"strings": strings, "string_offsets": offsets, "node_group": node_group, "node_name": node_name,
+                "node_label": node_label, "indptr": indptr, "indices": targets.astype(np.int32),
+                "edge_type": relations.astype(np.uint8)}
+
+    def save(self):
+        name = f"{self.generation:08d}"
+        directory = os.path.join(self.snapshot_dir, name)
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        arrays = self.arrays()
+        for array_name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{array_name}.npy"), array)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as file:
+            json.dump({"format": FORMAT_VERSION, "version": self.version, "epoch": self.epoch,
+                       "generation": self.generation, "groups": GROUPS, "relations": RELATIONS,
+                       "removed_group": REMOVED, "nodes": len(self.ids), "ids": len(self.keys),
+                       "edges": len(self.codes), "strings": len(arrays['string_offsets']) - 1}, file)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+        with open(os.path.join(self.snapshot_dir, 'CURRENT.tmp'), 'w', encoding='utf-8') as file:
+            file.write(name)
+        os.replace(os.path.join(self.snapshot_dir, 'CURRENT.tmp'), os.path.join(self.snapshot_dir, 'CURRENT'))
+        # Keep the generation before this one for readers that opened it just before CURRENT moved
+        for entry in os.listdir(self.snapshot_dir):
+            if GENERATION_RE.match(entry) and int(entry) < self.generation - 1:
+                shutil.rmtree(os.path.join(self.snapshot_dir, entry), ignore_errors=True)
+
+    def directory(self, version):
+        # The saved generation directory of version, or None once it has been pruned or replaced by another epoch
+        epoch, _, generation = version.rpartition('-')
+        if not generation.isdigit() or int(generation) < self.generation - 1:
+            return None
+        directory = os.path.join(self.snapshot_dir, f"{int(generation):08d}")
+        try:
+            with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as file:
+                return directory if json.load(file)['version'] == version else None
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def load(self):
+        # Picks up the ids and generation of the saved snapshot, so clients holding it get a delta after a restart
+        self.loaded = True
+        saved = load_arrays(self.snapshot_dir, mmap_mode=None)
+        if saved is None:
+            return False
+        meta, arrays = saved
+        if meta.get('format') != FORMAT_VERSION or meta.get('groups') != GROUPS or meta.get('relations') != RELATIONS:
+            return False
+        self._reset()
+        strings = decode_strings(arrays['strings'], arrays['string_offsets'])
+        for node, (group, name, label) in enumerate(zip(arrays['node_group'].tolist(), arrays['node_name'].tolist(),
+                                                        arrays['node_label'].tolist())):
+            if group == REMOVED:
+                self.keys.append(None)
+                self.labels.append(None)
+                continue
+            key = f"{GROUPS[group]}:{strings[name]}"
+            self.ids[key] = node
+            self.keys.append(key)
+            self.labels.append(strings[label])
+        sources = np.repeat(np.arange(len(self.keys), dtype=np.int64), np.diff(arrays['indptr']))
+        self.codes = pack_edges(sources, arrays['indices'], arrays['edge_type'])
+        self.epoch, self.generation = meta['epoch'], meta['generation']
+        logger.info("Loaded graph snapshot %s: %d nodes, %d edges", self.version, len(self.ids), len(self.codes))
+        return True
+
+    def full(self):
+        # The whole snapshot as JSON-ready columns; node ids are positions in the node columns
+        with self.lock:
+            arrays = self.arrays()
+            return {"version": self.version, "delta": False, "groups": GROUPS, "relations": RELATIONS,
+                    "removed_group": REMOVED,
+                    "strings": decode_strings(arrays['strings'], arrays['string_offsets']),
+                    "nodes": {name: arrays[f"node_{name}"].tolist() for name in ('group', 'name', 'label')},
+                    "indptr": arrays['indptr'].tolist(), "indices": arrays['indices'].tolist(),
+                    "edge_type": arrays['edge_type'].tolist()}
+
+    def delta(self, since):
+        # The changes from version since to now, or None when the history no longer reaches back to it
+        with self.lock:
+            if since == self.version:
+                steps = []
+            else:
+                start = next((index for index, step in enumerate(self.history) if step['since'] == since), None)
+                if start is None:
+                    return None
+                steps = list(self.history)[start:]
+            nodes, removed_nodes, edges, removed_edges = set(), set(), set(), set()
+            for step in steps:
+                # Ids are not reused within an epoch, so a removed node never comes back under the same id
+                nodes -= step['removed_nodes']
+                removed_nodes |= step['removed_nodes']
+                nodes |= step['nodes']
+                for code in step['removed_edges'].tolist():
+                    if code in edges:
+                        edges.remove(code)
+                    else:
+                        removed_edges.add(code)
+                for code in step['edges'].tolist():
+                    if code in removed_edges:
+                        removed_edges.remove(code)
+                    else:
+                        edges.add(code)
+            nodes = sorted(node for node in nodes if self.keys[node] is not None)
+            columns = {"id": nodes, "group": [], "name": [], "label": []}
+            for node in nodes:
+                group, _, name = self.keys[node].partition(':')
+                columns['group'].append(GROUPS.index(group))
+                columns['name'].append(name)
+                columns['label'].append(self.labels[node])
+
+            def edge_columns(codes):
+                sources, targets, relations = unpack_edges(np.array(sorted(codes), dtype=np.int64))
+                return {"source": sources.tolist(), "target": targets.tolist(), "type": relations.tolist()}
+            return {"version": self.version, "since": since, "delta": True, "groups": GROUPS, "relations": RELATIONS,
+                    "nodes": columns, "removed_nodes": sorted(removed_nodes), "edges": edge_columns(edges),
+                    "removed_edges": edge_columns(removed_edges)}
+
+
+if __name__ == "__main__":
+    # Offline export: python graph_snapshot.py [db_path] [snapshot_dir] (stop the web app first to release the DB lock)
+    import contextlib
+    import kuzu
+    db = kuzu.Database(sys.argv[1] if len(sys.argv) > 1 else "/app/db/kuzu.db")
+    snapshot = GraphSnapshot(sys.argv[2] if len(sys.argv) > 2 else "/app/db/graph")
+    snapshot.refresh('offline', lambda: contextlib.nullcontext(kuzu.Connection(db)))
+    print(f"Graph snapshot {snapshot.version} in {snapshot.snapshot_dir}: {len(snapshot)} nodes, {len(snapshot.codes)} edges")
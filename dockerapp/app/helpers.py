@@ -0,0 +1,99 @@
+import hashlib
+import urllib.parse
+
+from categories import category_for
+from interconnections import refresh_cross_category
+from keywords import keyword_labels
+from telemetry import stage
+
+# Recrawl bookkeeping: a fingerprint of the extracted text and the validators for a conditional GET
+FETCH_COLUMNS = ['content_hash', 'etag', 'last_modified']
+# Column order of the Link node table; staged bulk files must match it exactly
+LINK_COLUMNS = [
+    'url', 'title', 'raw_category', 'suggested_category', 'raw_content', 'cleaned_content',
+    'keywords', 'category_explanation', 'keyword_explanation'
+] + FETCH_COLUMNS
+METADATA_FIELDS = ['url', 'title', 'content', 'category', 'keyword', 'category_explanation', 'keyword_explanation']
+
+
+def normalize_url(url):
+    with stage('normalize'):
+        url = url.strip() if url else ''
+        if not url:
+            return ''
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        parsed_url = urllib.parse.urlparse(url)
+        normalized_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}".rstrip('/')
+        return urllib.parse.quote(normalized_url, safe=':/?=&')
+
+
+def keywords_to_str(keywords):
+    return ', '.join(keywords) if keywords and keywords != ['none'] else 'none'
+
+
+def keywords_from_str(keywords):
+    return [k.strip() for k in keywords.split(',') if k.strip()] if keywords and keywords != 'none' else ['none']
+
+
+def content_fingerprint(text):
+    # Whitespace-insensitive, so re-extracting an unchanged page gives the same fingerprint
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest() if text else ''
+
+
+def migrate_link_columns(conn):
+    # Adds the recrawl columns to Link tables created before they existed; they append in FETCH_COLUMNS order
+    for column in FETCH_COLUMNS:
+        conn.execute(f"ALTER TABLE Link ADD IF NOT EXISTS {column} STRING")
+
+
+def metadata_row_to_record(row, url):
+    # Build a Link record (plus its category and keyword list) from a links_with_metadata.csv row
+    title = row['title'].strip() if row['title'] else url
+    raw_content = row['content'][:5000].strip() if row['content'] else ""
+    raw_category = row['category'].strip() if row['category'] else 'Uncategorized'
+    keywords = [k.strip() for k in row['keyword'].split(',') if k.strip()][:3] if row['keyword'] else ['none']
+    return {
+        "url": url,
+        "title": title,
+        "raw_category": raw_category,
+        "suggested_category": raw_category,
+        "raw_content": raw_content,
+        "cleaned_content": raw_content[:500],
+        "keywords": keywords_to_str(keywords),
+        "category_explanation": row['category_explanation'].strip() if row['category_explanation'] else 'None',
+        "keyword_explanation": row['keyword_explanation'].strip() if row['keyword_explanation'] else 'None',
+        "content_hash": content_fingerprint(raw_content),
+        "etag": '',
+        "last_modified": '',
+        "category": category_for(raw_category),
+        "keyword_list": keywords
+    }
+
+
+def write_link(conn, record):
+    # Row-at-a-time write path: Link, Category and keyword MERGEs for a single record
+    conn.execute(
+        "MERGE (:Link {url: $url, title: $title, raw_category: $raw_category, suggested_category: $suggested_category, "
+        "raw_content: $raw_content, cleaned_content: $cleaned_content, keywords: $keywords, "
+        "category_explanation: $category_explanation, keyword_explanation: $keyword_explanation, "
+        "content_hash: $content_hash, etag: $etag, last_modified: $last_modified})",
+        {column: record[column] for column in LINK_COLUMNS}
+    )
+    write_link_relations(conn, record)
+
+
+def write_link_relations(conn, record, refresh=True):
+    conn.execute("MERGE (c:Category {name: $name})", {"name": record['category']})
+    conn.execute(
+        "MATCH (l:Link {url: $url}), (c:Category {name: $name}) MERGE (l)-[:BELONGS_TO]->(c)",
+        {"url": record['url'], "name": record['category']}
+    )
+    for name, label in keyword_labels(record['keyword_list']).items():
+        conn.execute("MERGE (k:Keyword {name: $name}) ON CREATE SET k.label = $label", {"name": name, "label": label})
+        conn.execute(
+            "MATCH (l:Link {url: $url}), (k:Keyword {name: $name}) MERGE (l)-[:HAS_KEYWORD]->(k)",
+            {"url": record['url'], "name": name}
+        )
+    if refresh:
+        refresh_cross_category(conn, [record['url']])
@@ -0,0 +1,213 @@
+import csv
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+
+# Background ingestion jobs. Uploaded CSVs are copied into the jobs directory and a
+# state.json per job records progress, so unfinished jobs resume from the last committed
+# row after a restart. Rows are processed by a pool of worker threads and handed to a
+# single writer thread, which also keeps the per-job bookkeeping.
+
+MAX_RECORDED_FAILURES = 200
+
+logger = logging.getLogger(__name__)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+class JobManager:
+    def __init__(self, jobs_dir, process_row, write_record, on_complete=None, workers=4, row_stats=None):
+        # row_stats makes a per-job collector (record(), summary()) handed to process_row; its summary shows in the status
+        self.jobs_dir = jobs_dir
+        self.process_row = process_row
+        self.write_record = write_record
+        self.on_complete = on_complete
+        self.workers = workers
+        self.row_stats = row_stats
+        self.stats = {}  # job id -> row_stats() collector, for jobs run since startup
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.tasks = queue.Queue(maxsize=workers * 4)
+        self.results = queue.Queue()
+        self.started = False
+
+    def start(self):
+        if self.started:
+            return
+        self.started = True
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True).start()
+        threading.Thread(target=self._writer, name="job-writer", daemon=True).start()
+        self.resume()
+
+    def resume(self):
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            state_path = os.path.join(self.jobs_dir, job_id, 'state.json')
+            if not os.path.exists(state_path):
+                continue
+            with open(state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            with self.lock:
+                self.jobs[job_id] = state
+            if state['status'] in ('queued', 'running'):
+                logger.info("Resuming job %s from row %d of %d", job_id, state['committed'], state['total'])
+                self._launch(job_id)
+
+    def submit(self, stream, filename, metadata, limit=None, recrawl=False):
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        input_path = os.path.join(job_dir, 'input.csv')
+        with open(input_path, 'w', encoding='utf-8', newline='') as file:
+            shutil.copyfileobj(stream, file)
+        with open(input_path, 'r', encoding='utf-8', newline='') as file:
+            total = sum(1 for _ in csv.DictReader(file))
+        if limit is not None:
+            total = min(total, limit)
+        state = {
+            "id": job_id,
+            "filename": filename,
+            "metadata": metadata,
+            "recrawl": recrawl,
+            "status": "queued",
+            "total": total,
+            "committed": 0,
+            "done_ahead": [],
+            "processed": 0,
+            "skipped": 0,
+            "skip_reasons": {},
+            "failed": 0,
+            "failures": [],
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        with self.lock:
+            self.jobs[job_id] = state
+            self._save(job_id)
+        self._launch(job_id)
+        return job_id
+
+    def status(self, job_id):
+        with self.lock:
+            state = self.jobs.get(job_id)
+            if state is None:
+                return None
+            state = dict(state)
+            stats = self.stats.get(job_id)
+        if stats is not None:
+            state['fetch'] = stats.summary()
+        done = state['processed'] + state['skipped'] + state['failed']
+        end = state['finished_at'] or time.time()
+        elapsed = end - state['started_at'] if state['started_at'] else 0.0
+        state.pop('done_ahead')
+        state['done'] = done
+        state['progress'] = done / state['total'] if state['total'] else 1.0
+        state['rows_per_sec'] = done / elapsed if elapsed > 0 else 0.0
+        return state
+
+    def _save(self, job_id):
+        _write_json(os.path.join(self.jobs_dir, job_id, 'state.json'), self.jobs[job_id])
+
+    def _launch(self, job_id):
+        threading.Thread(target=self._feed, args=(job_id,), name=f"job-feed-{job_id}", daemon=True).start()
+
+    def _feed(self, job_id):
+        with self.lock:
+            state = self.jobs[job_id]
+            state['status'] = 'running'
+            state['started_at'] = state['started_at'] or time.time()
+            if self.row_stats is not None:
+                self.stats.setdefault(job_id, self.row_stats())
+            start_row = state['committed']
+            done_ahead = set(state['done_ahead'])
+            total = state['total']
+            metadata = state['metadata']
+            recrawl = state.get('recrawl', False)
+            self._save(job_id)
+        if start_row >= total:
+            self._finish(job_id)
+            return
+        input_path = os.path.join(self.jobs_dir, job_id, 'input.csv')
+        with open(input_path, 'r', encoding='utf-8', newline='') as file:
+            csv_reader = csv.DictReader(file)
+            for index, row in enumerate(csv_reader):
+                if index >= total:
+                    break
+                if index < start_row or index in done_ahead:
+                    continue
+                self.tasks.put((job_id, index, csv_reader.line_num, row, metadata, recrawl))
+
+    def _worker(self):
+        while True:
+            job_id, index, line_num, row, metadata, recrawl = self.tasks.get()
+            try:
+                record, reason = self.process_row(row, line_num, metadata, recrawl, self.stats.get(job_id))
+                self.results.put((job_id, index, line_num, row.get('url'), record, reason, None))
+            except Exception as e:
+                self.results.put((job_id, index, line_num, row.get('url'), None, None, str(e)))
+
+    def _writer(self):
+        while True:
+            job_id, index, line_num, url, record, reason, error = self.results.get()
+            if record is not None and error is None:
+                try:
+                    if not self.write_record(record):
+                        record, reason = None, 'duplicate'
+                except Exception as e:
+                    error = str(e)
+            with self.lock:
+                state = self.jobs[job_id]
+                if error is not None:
+                    state['failed'] += 1
+                    state['failures'].append({"row": line_num, "url": url, "error": error})
+                    del state['failures'][:-MAX_RECORDED_FAILURES]
+                    logger.warning("Job %s: error processing row %d for URL %s: %s", job_id, line_num, url, error)
+                elif record is None:
+                    state['skipped'] += 1
+                    reasons = state.setdefault('skip_reasons', {})
+                    reasons[reason] = reasons.get(reason, 0) + 1
+                    logger.debug("Job %s: skipping row %d (%s): %s", job_id, line_num, reason, url)
+                else:
+                    state['processed'] += 1
+                    logger.debug("Job %s: added link in row %d: %s, Category: %s, Keywords: %s",
+                                 job_id, line_num, record['url'], record['category'], record['keyword_list'])
+                # Advance the committed pointer over contiguous finished rows
+                done_ahead = set(state['done_ahead'])
+                done_ahead.add(index)
+                while state['committed'] in done_ahead:
+                    done_ahead.remove(state['committed'])
+                    state['committed'] += 1
+                state['done_ahead'] = sorted(done_ahead)
+                finished = state['committed'] >= state['total']
+                self._save(job_id)
+            if finished:
+                self._finish(job_id)
+
+    def _finish(self, job_id):
+        with self.lock:
+            state = self.jobs[job_id]
+            state['status'] = 'completed'
+            state['finished_at'] = time.time()
+            self._save(job_id)
+        logger.info("Job %s completed: %d added, %d skipped, %d failed", job_id, state['processed'], state['skipped'], state['failed'])
+        summary = self.stats[job_id].summary() if job_id in self.stats else None
+        if summary and summary.get('pages'):
+            logger.info("Job %s fetched %d pages (%d failed) at %.1f pages/sec, p50 %.0fms, p99 %.0fms", job_id,
+                        summary['pages'], summary['failures'], summary['pages_per_sec'], summary['p50_ms'], summary['p99_ms'])
+        if self.on_complete:
+            try:
+                self.on_complete(job_id)
+            except Exception as e:
+                logger.exception("Error in completion hook for job %s: %s", job_id, e)
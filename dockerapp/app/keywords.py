@@ -0,0 +1,174 @@
+import heapq
+import logging
+import math
+import threading
+
+from interconnections import update_cross_category
+
+# Keyword canonicalization and an in-memory inverted index over HAS_KEYWORD edges.
+# Keyword nodes are keyed by a canonical id (whitespace collapsed, case folded) and keep the
+# first spelling seen as their label, so 'Graph database' and 'graph  database' share a node.
+# The index holds one posting list per keyword; related links are ranked by the IDF-weighted
+# sum of the keywords they share with a given link. It is loaded from the database once, then
+# kept current from the same add/delete hooks as the search index, and keeps link titles so
+# queries need no database round trip.
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_keyword(keyword):
+    return ' '.join(keyword.split()).casefold()
+
+
+def keyword_labels(keywords):
+    # {canonical id: first spelling} for a record's keyword list, without the 'none' placeholder
+    labels = {}
+    for keyword in keywords:
+        name = canonical_keyword(keyword)
+        if name and name != 'none':
+            labels.setdefault(name, ' '.join(keyword.split()))
+    return labels
+
+
+def migrate_keywords(conn):
+    # Adds the label column to databases created before it existed and folds non-canonical Keyword nodes into canonical ones
+    conn.execute("ALTER TABLE Keyword ADD IF NOT EXISTS label STRING")
+    stale = [row[0] for row in conn.execute("MATCH (k:Keyword) RETURN k.name") if canonical_keyword(row[0]) != row[0]]
+    urls = set()
+    for name in stale:
+        canonical = canonical_keyword(name)
+        urls.update(row[0] for row in conn.execute(
+            "MATCH (l:Link)-[:HAS_KEYWORD]->(:Keyword {name: $name}) RETURN l.url", {"name": name}))
+        if canonical and canonical != 'none':
+            conn.execute("MERGE (c:Keyword {name: $canonical}) ON CREATE SET c.label = $label",
+                         {"canonical": canonical, "label": ' '.join(name.split())})
+            conn.execute(
+                "MATCH (l:Link)-[:HAS_KEYWORD]->(:Keyword {name: $name}), (c:Keyword {name: $canonical}) "
+                "MERGE (l)-[:HAS_KEYWORD]->(c)",
+                {"name": name, "canonical": canonical}
+            )
+        conn.execute("MATCH (k:Keyword {name: $name}) DETACH DELETE k", {"name": name})
+    conn.execute("MATCH (k:Keyword) WHERE k.label IS NULL SET k.label = k.name")
+    if stale:
+        update_cross_category(conn, urls)
+        logger.info("Merged %d keywords into canonical ids (%d links updated)", len(stale), len(urls))
+    return len(stale)
+
+
+class KeywordIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.url_ids = {}  # url -> link id; ids of deleted links are reused
+        self.urls = []
+        self.titles = []
+        self.link_keywords = []  # link id -> keyword ids, kept so deletes can find their postings
+        self.free = []
+        self.name_ids = {}  # canonical keyword -> keyword id; like the Keyword node, a keyword keeps its first label
+        self.names = []
+        self.labels = []
+        self.postings = []  # keyword id -> {link id}
+
+    def __len__(self):
+        return len(self.url_ids)
+
+    def _add(self, url, title, labels):
+        self._remove(url)
+        keywords = []
+        for name, label in labels:
+            keyword = self.name_ids.get(name)
+            if keyword is None:
+                keyword = self.name_ids[name] = len(self.names)
+                self.names.append(name)
+                self.labels.append(label or name)
+                self.postings.append(set())
+            if keyword not in keywords:
+                keywords.append(keyword)
+        if self.free:
+            link = self.free.pop()
+            self.urls[link], self.titles[link], self.link_keywords[link] = url, title, keywords
+        else:
+            link = len(self.urls)
+            self.urls.append(url)
+            self.titles.append(title)
+            self.link_keywords.append(keywords)
+        self.url_ids[url] = link
+        for keyword in keywords:
+            self.postings[keyword].add(link)
+
+    def _remove(self, url):
+        link = self.url_ids.pop(url, None)
+        if link is None:
+            return
+        for keyword in self.link_keywords[link]:
+            self.postings[keyword].discard(link)
+        self.urls[link], self.titles[link], self.link_keywords[link] = None, None, []
+        self.free.append(link)
+
+    def _idf(self, keyword):
+        return math.log(1 + len(self.url_ids) / len(self.postings[keyword]))
+
+    def add(self, records):
+        # records are Link records (url, title, keyword_list); an existing url is replaced
+        with self.lock:
+            for record in records:
+                self._add(record['url'], record['title'], keyword_labels(record['keyword_list']).items())
+
+    def delete(self, url):
+        with self.lock:
+            self._remove(url)
+
+    def rebuild(self, conn):
+        # Full load from the database, for startup and after writes that did not keep their records
+        links = {url: (title, []) for url, title in conn.execute("MATCH (l:Link) RETURN l.url, l.title")}
+        for url, name, label in conn.execute("MATCH (l:Link)-[:HAS_KEYWORD]->(k:Keyword) RETURN l.url, k.name, k.label"):
+            if url in links:
+                links[url][1].append((name, label))
+        with self.lock:
+            self._reset()
+            for url, (title, labels) in links.items():
+                self._add(url, title, labels)
+            logger.debug("Keyword index rebuilt: %d links, %d keywords", len(self.url_ids), len(self.names))
+        return len(self.url_ids)
+
+    def __contains__(self, url):
+        return url in self.url_ids
+
+    def title(self, url):
+        with self.lock:
+            link = self.url_ids.get(url)
+            return None if link is None else self.titles[link]
+
+    def keywords(self, url):
+        with self.lock:
+            link = self.url_ids.get(url)
+            if link is None:
+                return []
+            return [{"keyword": self.labels[keyword], "links": len(self.postings[keyword]), "idf": self._idf(keyword)}
+                    for keyword in self.link_keywords[link]]
+
+    def related(self, url, limit=10, min_shared=1):
+        with self.lock:
+            link = self.url_ids.get(url)
+            if link is None:
+                return []
+            scores = {}
+            shared = {}
+            for keyword in self.link_keywords[link]:
+                weight = self._idf(keyword)
+                for other in self.postings[keyword]:
+                    scores[other] = scores.get(other, 0.0) + weight
+                    shared[other] = shared.get(other, 0) + 1
+            scores.pop(link, None)
+            candidates = [other for other in scores if shared[other] >= min_shared]
+            # Ranked on the reported score, so ties break by url whatever order the weights were summed in
+            top = heapq.nsmallest(limit, candidates, key=lambda other: (-round(scores[other], 6), self.urls[other]))
+            own = set(self.link_keywords[link])
+            return [{
+                "url": self.urls[other],
+                "title": self.titles[other],
+                "score": round(scores[other], 6),
+                "shared": [self.labels[keyword] for keyword in self.link_keywords[other] if keyword in own]
+            } for other in top]
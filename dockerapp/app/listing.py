@@ -0,0 +1,54 @@
+# Link listing for the index page: one page of summary rows at a time, sorted in the
+# database, with long text columns cut down to short previews so a page costs the same
+# no matter how many links there are. The full row is fetched separately on demand.
+
+SORTS = {
+    "url": "l.url",
+    "title": "l.title",
+    "category": "c.name",
+    "suggested_category": "l.suggested_category"
+}
+PREVIEW_CHARS = 60
+DETAIL_FIELDS = ['url', 'title', 'category', 'raw_category', 'suggested_category', 'raw_content', 'cleaned_content',
+                 'keywords', 'category_explanation', 'keyword_explanation']
+
+
+def count_links(conn):
+    return conn.execute("MATCH (l:Link)-[:BELONGS_TO]->(:Category) RETURN COUNT(l)").get_next()[0]
+
+
+def page_links(conn, skip, limit, sort='url', descending=False):
+    order = SORTS.get(sort, SORTS['url'])
+    direction = " DESC" if descending else ""
+    tiebreak = "" if order == SORTS['url'] else f", l.url{direction}"
+    result = conn.execute(
+        "MATCH (l:Link)-[:BELONGS_TO]->(c:Category) "
+        "RETURN l.url, l.title, c.name, l.suggested_category, l.keywords, substring(l.raw_category, 1, $chars), "
+        "substring(l.category_explanation, 1, $chars), substring(l.keyword_explanation, 1, $chars), "
+        "substring(l.raw_content, 1, $chars) "
+        f"ORDER BY {order}{direction}{tiebreak} SKIP $skip LIMIT $limit",
+        {"chars": PREVIEW_CHARS, "skip": skip, "limit": limit}
+    )
+    return [{
+        "url": row[0],
+        "title": row[1],
+        "category": row[2],
+        "suggested_category": row[3] if row[3] else 'None',
+        "keywords": row[4] if row[4] else 'none',
+        "raw_category": row[5],
+        "category_explanation": row[6] if row[6] else 'None',
+        "keyword_explanation": row[7] if row[7] else 'None',
+        "raw_content": row[8] if row[8] else 'Failed to fetch content'
+    } for row in result]
+
+
+def get_link(conn, url):
+    result = conn.execute(
+        "MATCH (l:Link {url: $url}) OPTIONAL MATCH (l)-[:BELONGS_TO]->(c:Category) "
+        "RETURN l.url, l.title, c.name, l.raw_category, l.suggested_category, l.raw_content, l.cleaned_content, "
+        "l.keywords, l.category_explanation, l.keyword_explanation",
+        {"url": url}
+    )
+    if not result.has_next():
+        return None
+    return dict(zip(DETAIL_FIELDS, result.get_next()))
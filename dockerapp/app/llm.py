@@ -0,0 +1,170 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+
+from telemetry import OLLAMA_SECONDS
+
+# Ollama service layer: a reusable client pool, a cap on in-flight requests and an
+# on-disk response cache keyed by (model, prompt, format), so re-ingesting identical
+# content costs no LLM time. The ollama and pydantic libraries are imported on first use
+# rather than at startup.
+
+DEFAULT_MODEL = 'mistral:7b-instruct-v0.3-q4_0'
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def page_analysis_model():
+    from pydantic import BaseModel, Field
+
+    class PageAnalysis(BaseModel):
+        cleaned_content: str = Field(..., description="The main meaningful content of the page, up to 500 characters")
+        category: str = Field(..., description="A single category for the page (2-3 words)")
+        keywords: list[str] = Field(..., description="Up to three key terms (1-2 words each)", max_length=3)
+        category_explanation: str = Field(..., description="One sentence explaining the category choice")
+        keyword_explanations: list[str] = Field(..., description="One sentence per keyword explaining the choice", max_length=3)
+
+    return PageAnalysis
+
+
+class ResponseCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as file:
+                return json.load(file)['content']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, content):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"content": content}, file)
+        os.replace(tmp_path, path)
+
+
+class LLMService:
+    def __init__(self, host, model=DEFAULT_MODEL, timeout=20, max_in_flight=4, cache_dir=None):
+        self.host = host
+        self.model = model
+        self.timeout = timeout
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.clients = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+        self.eval_tokens = 0
+        self.eval_seconds = 0.0
+
+    def _cache_key(self, prompt, fmt):
+        payload = json.dumps([self.model, prompt, fmt], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _client(self):
+        try:
+            return self.clients.get_nowait()
+        except queue.Empty:
+            from ollama import Client
+            return Client(host=self.host, timeout=self.timeout)
+
+    def chat(self, prompt, fmt=None):
+        key = self._cache_key(prompt, fmt)
+        with self.lock:
+            self.requests += 1
+        if self.cache:
+            content = self.cache.get(key)
+            if content is not None:
+                with self.lock:
+                    self.cache_hits += 1
+                return content
+        with self.slots:
+            client = self._client()
+            try:
+                kwargs = {'format': fmt} if fmt else {}
+                with OLLAMA_SECONDS.time('structured' if fmt else 'chat'):
+                    response = client.chat(model=self.model, messages=[{'role': 'user', 'content': prompt}], **kwargs)
+            finally:
+                self.clients.put(client)
+        content = response['message']['content'].strip()
+        eval_count = response.get('eval_count') or 0
+        eval_duration = response.get('eval_duration') or 0
+        with self.lock:
+            self.eval_tokens += eval_count
+            self.eval_seconds += eval_duration / 1e9
+        if self.cache:
+            self.cache.put(key, content)
+        return content
+
+    def embed(self, texts, model):
+        # One vector per text; cache misses go to Ollama together in a single batched request
+        keys = [hashlib.sha256(json.dumps([model, 'embed', text]).encode('utf-8')).hexdigest() for text in texts]
+        vectors = [self.cache.get(key) if self.cache else None for key in keys]
+        with self.lock:
+            self.requests += len(texts)
+            self.cache_hits += sum(vector is not None for vector in vectors)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with self.slots:
+                client = self._client()
+                try:
+                    with OLLAMA_SECONDS.time('embed'):
+                        response = client.embed(model=model, input=[texts[i] for i in missing])
+                finally:
+                    self.clients.put(client)
+            for i, vector in zip(missing, response['embeddings']):
+                vectors[i] = list(vector)
+                if self.cache:
+                    self.cache.put(keys[i], vectors[i])
+        return vectors
+
+    def clean_content(self, content):
+        if not content or len(content.strip()) < 100:
+            return ""
+        prompt = f"Extract the main meaningful content from the following text, up to 500 characters: {content[:2000]}"
+        try:
+            return self.chat(prompt)[:500]
+        except Exception as e:
+            logger.warning("Failed to clean content with Ollama: %s", e)
+            return content[:500]
+
+    def classify(self, title, content):
+        prompt = (
+            f"Given the webpage title '{title}' and the following content excerpt: '{content[:1000]}', "
+            f"suggest a single category (e.g., Social Media, Database, News) and up to three keywords (1-2 words each)."
+        )
+        return self.chat(prompt)
+
+    def analyze(self, title, content):
+        # Cleaning and classification in one structured call instead of two
+        prompt = (
+            f"Given the webpage title '{title}' and the following page text: '{content[:2000]}', "
+            f"extract the main meaningful content (up to 500 characters), suggest a single category "
+            f"(e.g., Social Media, Database, News) and up to three keywords (1-2 words each), "
+            f"with a one sentence explanation for the category and for each keyword."
+        )
+        PageAnalysis = page_analysis_model()
+        return PageAnalysis.model_validate_json(self.chat(prompt, fmt=PageAnalysis.model_json_schema()))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "hit_rate": self.cache_hits / self.requests if self.requests else 0.0,
+                "eval_tokens": self.eval_tokens,
+                "tokens_per_sec": self.eval_tokens / self.eval_seconds if self.eval_seconds > 0 else 0.0
+            }
@@ -1,224 +1,571 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
+from flask import (Flask, render_template, request, redirect, url_for, jsonify, flash, g, has_request_context,
+                   Response, stream_with_context, send_from_directory)
+from markupsafe import Markup
 import kuzu
+import logging
 import os
-import requests
-from bs4 import BeautifulSoup
-import urllib.parse
-from ollama import Client
-import re
+import time
+import json
+import hashlib
 import io
+import gzip
 import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from categories import category_for, parse_category_and_keywords
+from helpers import (METADATA_FIELDS, normalize_url, keywords_to_str, keywords_from_str, content_fingerprint,
+                     metadata_row_to_record, migrate_link_columns, write_link)
+from ingest import bulk_ingest_rows, merge_existing_link
+from fetcher import Fetcher, FetchStats
+from jobs import JobManager
+from keywords import KeywordIndex, canonical_keyword, migrate_keywords
+from pipeline import RowPipeline
+from llm import LLMService, DEFAULT_MODEL
+from mirrors import MirrorIndex
+from export import Exporter
+from search import SearchIndex
+from similarity import (SCHEMA as SIMILAR_SCHEMA, VectorIndex, hashing_embedder, ollama_embedder, link_similar,
+                        copy_similar, rebuild_similar)
+from graph import (DataVersion, ResponseCache, iter_graph, page_graph, neighbourhood, iter_subgraph,
+                   parse_node_id, find_duplicate_ids)
+from graph_snapshot import ARRAYS as SNAPSHOT_ARRAYS, GraphSnapshot
+from dbpool import ConnectionPool, WriteQueue
+from telemetry import (HTTP_SECONDS, configure_logging, new_trace_id, render_metrics, stage,
+                       trace_id as current_trace_id)
+from interconnections import (SCHEMA as CROSS_CATEGORY_SCHEMA, rebuild_cross_category, count_cross_category,
+                              page_cross_category)
+from listing import SORTS as LINK_SORTS, count_links, page_links, get_link
+from startup import PRELOAD_STATE, ensure_schema, file_fingerprint, file_loaded, write_state
+
+configure_logging(os.getenv('LOG_LEVEL', 'INFO'))  # DEBUG adds per-row and per-request detail
+logger = logging.getLogger("webgraph")
 
 app = Flask(__name__, template_folder='templates')
+trace_requests = os.getenv('TRACE_REQUESTS', '0') == '1'  # Tag every request with a trace id, not only ones sent with X-Request-ID
 app.secret_key = 'your_secret_key'  # Replace with a secure random string in production
+ingest_mode = os.getenv('INGEST_MODE', 'bulk')  # 'bulk' (COPY FROM staged files) or 'row' (per-row MERGE)
+llm_mode = os.getenv('LLM_MODE', 'split')  # 'split' (clean, then classify) or 'combined' (one structured call)
+llm = LLMService(
+    os.getenv('OLLAMA_HOST', 'http://host.docker.internal:11434'),
+    model=os.getenv('OLLAMA_MODEL', DEFAULT_MODEL),
+    max_in_flight=int(os.getenv('OLLAMA_MAX_IN_FLIGHT', 4)),
+    cache_dir=os.getenv('LLM_CACHE_DIR', '/app/db/llm_cache')
+)
+metadata_csv_path = os.getenv('METADATA_CSV', '/app/links_with_metadata.csv')
+exporter = Exporter(
+    metadata_csv_path,
+    compact_every=int(os.getenv('EXPORT_COMPACT_EVERY', 500)),
+    parquet=os.getenv('EXPORT_PARQUET', '0') == '1'
+)
+search_index = SearchIndex(
+    os.getenv('SEARCH_INDEX_DIR', '/app/db/search'),
+    compact_every=int(os.getenv('SEARCH_COMPACT_EVERY', 1000))
+)
+embedding_model = os.getenv('EMBEDDING_MODEL', '')  # An Ollama embedding model, or empty for the local hashing embedder
+vector_index = VectorIndex(
+    os.getenv('VECTOR_INDEX_DIR', '/app/db/vectors'),
+    ollama_embedder(llm, embedding_model) if embedding_model else hashing_embedder(),
+    batch_size=int(os.getenv('EMBED_BATCH_SIZE', 256))
+)
+similar_k = int(os.getenv('SIMILAR_TOP_K', 5))  # SIMILAR_TO edges per link
+similar_threshold = float(os.getenv('SIMILAR_THRESHOLD', 0.3))  # Minimum cosine similarity for a SIMILAR_TO edge
+data_version = DataVersion()
+# Search index and similarity updates, applied in order on one thread instead of in the request or job that made them
+index_updates = ThreadPoolExecutor(max_workers=1, thread_name_prefix='index-update')
+graph_cache = ResponseCache()
+fragment_cache = ResponseCache(max_entries=64)  # Rendered index page tables, keyed on the data version
+keyword_index = KeywordIndex()
+mirror_index = MirrorIndex()  # content_hash -> URLs, so mirror lookups on the write path skip a Link table scan
+graph_snapshot = GraphSnapshot(os.getenv('GRAPH_SNAPSHOT_DIR', '/app/db/graph'))
+snapshot_cache = ResponseCache(max_entries=16)  # /graph_snapshot bodies, keyed on the snapshot version
+fetcher = Fetcher(
+    pool_connections=int(os.getenv('FETCH_POOL_HOSTS', 16)),
+    per_host=int(os.getenv('FETCH_PER_HOST', 4)),
+    max_bytes=int(os.getenv('FETCH_MAX_BYTES', 2 * 1024 * 1024))
+)
+# Worker processes for URL normalization, metadata row parsing and HTML extraction; forked before the database opens
+row_pipeline = RowPipeline(
+    workers=int(os.getenv('PARSE_WORKERS', min(8, os.cpu_count() or 1))),
+    chunk_size=int(os.getenv('PARSE_CHUNK_SIZE', 500)),
+    extractor=os.getenv('HTML_EXTRACTOR', 'streaming')  # 'streaming' or 'soup' (full BeautifulSoup tree)
+).start()
 
-# Initialize Kùzu database
-db_path = "/app/db/kuzu.db"
+# Initialize Kùzu database. Only what every request needs happens here; loading the search and vector
+# indexes and preloading the metadata CSV are left to warm_up(), which runs while the server starts serving.
+db_path = os.getenv('KUZU_DB_PATH', '/app/db/kuzu.db')
+SCHEMA = [
+    "CREATE NODE TABLE IF NOT EXISTS Link (url STRING, title STRING, raw_category STRING, suggested_category STRING, raw_content STRING, cleaned_content STRING, keywords STRING, category_explanation STRING, keyword_explanation STRING, content_hash STRING, etag STRING, last_modified STRING, PRIMARY KEY (url))",
+    "CREATE NODE TABLE IF NOT EXISTS Category (name STRING, PRIMARY KEY (name))",
+    "CREATE NODE TABLE IF NOT EXISTS Keyword (name STRING, label STRING, PRIMARY KEY (name))",
+    "CREATE REL TABLE IF NOT EXISTS BELONGS_TO (FROM Link TO Category)",
+    "CREATE REL TABLE IF NOT EXISTS HAS_KEYWORD (FROM Link TO Keyword)",
+    CROSS_CATEGORY_SCHEMA,
+    SIMILAR_SCHEMA
+]
 try:
     db = kuzu.Database(db_path)
-    conn = kuzu.Connection(db)
-    conn.execute("CREATE NODE TABLE IF NOT EXISTS Link (url STRING, title STRING, raw_category STRING, suggested_category STRING, raw_content STRING, cleaned_content STRING, keywords STRING, category_explanation STRING, keyword_explanation STRING, PRIMARY KEY (url))")
-    conn.execute("CREATE NODE TABLE IF NOT EXISTS Category (name STRING, PRIMARY KEY (name))")
-    conn.execute("CREATE NODE TABLE IF NOT EXISTS Keyword (name STRING, PRIMARY KEY (name))")
-    conn.execute("CREATE REL TABLE IF NOT EXISTS BELONGS_TO (FROM Link TO Category)")
-    conn.execute("CREATE REL TABLE IF NOT EXISTS HAS_KEYWORD (FROM Link TO Keyword)")
-    result = conn.execute("MATCH (l:Link) RETURN COUNT(l) AS cnt")
+    init_conn = kuzu.Connection(db)
+    new_tables = ensure_schema(init_conn, SCHEMA, migrations=[migrate_link_columns, migrate_keywords])
+    result = init_conn.execute("MATCH (l:Link) RETURN COUNT(l) AS cnt")
     count = result.get_next()[0]
     if count == 0:
-        conn.execute("MERGE (:Link {url: 'https://kuzudb.com', title: 'Kùzu Database', raw_category: 'Database', suggested_category: 'Database', raw_content: 'Graph database platform', cleaned_content: 'Graph database platform', keywords: 'graph database', category_explanation: 'None', keyword_explanation: 'None'})")
-        conn.execute("MERGE (:Link {url: 'https://example.com', title: 'Example Site', raw_category: 'Example', suggested_category: 'Example', raw_content: 'Example content', cleaned_content: 'Example content', keywords: 'example', category_explanation: 'None', keyword_explanation: 'None'})")
-        conn.execute("MERGE (:Category {name: 'Database'})")
-        conn.execute("MERGE (:Keyword {name: 'graph database'})")
-        conn.execute("MATCH (l:Link {url: 'https://kuzudb.com'}), (c:Category {name: 'Database'}) MERGE (l)-[:BELONGS_TO]->(c)")
-        conn.execute("MATCH (l:Link {url: 'https://example.com'}), (c:Category {name: 'Database'}) MERGE (l)-[:BELONGS_TO]->(c)")
-        conn.execute("MATCH (l:Link {url: 'https://kuzudb.com'}), (k:Keyword {name: 'graph database'}) MERGE (l)-[:HAS_KEYWORD]->(k)")
-        print("Kùzu database initialized with sample data")
+        init_conn.execute("MERGE (:Link {url: 'https://kuzudb.com', title: 'Kùzu Database', raw_category: 'Database', suggested_category: 'Database', raw_content: 'Graph database platform', cleaned_content: 'Graph database platform', keywords: 'graph database', category_explanation: 'None', keyword_explanation: 'None'})")
+        init_conn.execute("MERGE (:Link {url: 'https://example.com', title: 'Example Site', raw_category: 'Example', suggested_category: 'Example', raw_content: 'Example content', cleaned_content: 'Example content', keywords: 'example', category_explanation: 'None', keyword_explanation: 'None'})")
+        init_conn.execute("MERGE (:Category {name: 'Database'})")
+        init_conn.execute("MERGE (:Keyword {name: 'graph database', label: 'graph database'})")
+        init_conn.execute("MATCH (l:Link {url: 'https://kuzudb.com'}), (c:Category {name: 'Database'}) MERGE (l)-[:BELONGS_TO]->(c)")
+        init_conn.execute("MATCH (l:Link {url: 'https://example.com'}), (c:Category {name: 'Database'}) MERGE (l)-[:BELONGS_TO]->(c)")
+        init_conn.execute("MATCH (l:Link {url: 'https://kuzudb.com'}), (k:Keyword {name: 'graph database'}) MERGE (l)-[:HAS_KEYWORD]->(k)")
+        logger.info("Kùzu database initialized with sample data")
+    if "CROSS_CATEGORY" in new_tables:
+        logger.info("Materialized %d cross-category interconnections", rebuild_cross_category(init_conn))
+    init_conn.close()
+    pool = ConnectionPool(db, size=int(os.getenv('DB_POOL_SIZE', 8)))
+    writer = WriteQueue(db)
 except Exception as e:
-    print(f"Error initializing Kùzu: {e}")
+    logger.error("Error initializing Kùzu: %s", e)
     raise
 
+indexes_lock = threading.Lock()
+indexes_loaded = False
+csv_synced = threading.Event()  # Set once the database is known to hold every row of the metadata CSV
+
+def load_indexes():
+    # Loads the search and vector indexes once: from warm_up(), or from the first request that needs them if that comes first
+    global indexes_loaded
+    if indexes_loaded:
+        return
+    with indexes_lock:
+        if indexes_loaded:
+            return
+        with pool.connection() as conn:
+            count = conn.execute("MATCH (l:Link) RETURN COUNT(l) AS cnt").get_next()[0]
+            if not search_index.load() or len(search_index) != count:
+                search_index.rebuild(conn)
+            keyword_index.rebuild(conn)
+            mirror_index.rebuild(conn)
+            vector_index.load()
+            try:
+                embedded = vector_index.sync(conn)
+            except Exception as e:
+                embedded = None
+                logger.warning("Could not embed links for similarity search, retry with POST /similar/rebuild: %s", e)
+        if embedded is not None:
+            if "SIMILAR_TO" in new_tables:
+                logger.info("Materialized %d similarity links", rebuild_similar_links())
+            elif embedded:
+                write_similar(embedded)
+        indexes_loaded = True
+
+def record_metadata_csv():
+    # Exporter callback: a snapshot it writes only holds links already in the database, so a restart need not preload it
+    if csv_synced.is_set() and os.path.exists(metadata_csv_path):
+        writer.run(write_state, PRELOAD_STATE, file_fingerprint(metadata_csv_path))
+
+exporter.on_snapshot = record_metadata_csv
+
 # Helper functions
-def clean_content_with_ollama(content, ollama_host):
-    if not content or len(content.strip()) < 100:
-        return ""
-    prompt = f"Extract the main meaningful content from the following text, up to 500 characters: {content[:2000]}"
-    try:
-        client = Client(host=ollama_host, timeout=20)
-        response = client.chat(model='mistral:7b-instruct-v0.3-q4_0', messages=[{'role': 'user', 'content': prompt}])
-        return response['message']['content'].strip()[:500]
-    except Exception as e:
-        print(f"Failed to clean content with Ollama: {e}")
-        return content[:500]
-
-def parse_category_and_keywords(response):
-    categories = [
-        'general tools', 'graph technologies', 'healthcare data', 'ai and legal systems',
-        'federated search', 'organized crime analysis', 'beneficial ownership',
-        'financial crime technology', 'corporate governance', 'power and utilities',
-        'Social Media', 'Community Platform', 'Database', 'News', 'Blog', 'E-commerce',
-        'International Economics/Policy', 'Data Analysis', 'Machine Learning / AI'
-    ]
-    category = 'Uncategorized'
-    suggested_category = 'Uncategorized'
-    keywords = ['none']
-    if not response:
-        return category, suggested_category, keywords
-    match = re.search(r'Category:\s*([A-Za-z\s/]+)(?:\s*Keywords:|$)', response)
-    if match:
-        suggested_category = match.group(1).strip()
-    for cat in categories:
-        if cat.lower() == suggested_category.lower() or cat.lower() in response.lower():
-            category = cat
-            break
-    match = re.search(r'Keywords:\s*([^.]+)', response)
-    if match:
-        keyword_str = match.group(1).strip()
-        keywords = [k.strip() for k in keyword_str.split(',') if k.strip()][:3]
-    if not keywords or keywords == ['none']:
-        keywords = re.findall(r'\b[A-Z][a-zA-Z\s-]+\b', response)
-        keywords = [k.strip() for k in keywords if len(k.split()) <= 2 and k.lower() not in category.lower() and k.lower() not in suggested_category.lower()][:3]
-    return category, suggested_category, keywords if keywords else ['none']
+def extract_page(page, where=""):
+    if page['error']:
+        logger.warning("Failed to fetch title/content for %s%s: %s", page['url'], where, page['error'])
+        return page['url'], "Failed to fetch content"
+    with stage('parse'):
+        return row_pipeline.extract(page['text'], page['url'])
+
+def find_mirror(url, content_hash):
+    # An already classified link with the same extracted text, such as a mirror of the page under another URL
+    load_indexes()
+    mirror = mirror_index.find(content_hash, url)
+    if mirror is None:
+        return None
+    with pool.connection() as conn:
+        result = conn.execute(
+            "MATCH (l:Link {url: $url})-[:BELONGS_TO]->(c:Category) "
+            "RETURN l.url, l.raw_category, l.suggested_category, l.cleaned_content, l.keywords, l.category_explanation, "
+            "l.keyword_explanation, c.name",
+            {"url": mirror}
+        )
+        return result.get_next() if result.has_next() else None
+
+def build_record_from_page(page, line_num=None, extracted=None):
+    url = page['url']
+    where = f" in row {line_num}" if line_num else ""
+    title, raw_content = extracted or extract_page(page, where)
+    content_hash = content_fingerprint(raw_content) if not page['error'] else ''
+    mirror = find_mirror(url, content_hash) if content_hash else None
+    if mirror:
+        # Identical content was already classified, so the LLM is skipped
+        logger.info("Reusing classification of %s for %s (same content)", mirror[0], url)
+        raw_category, suggested_category, cleaned_content, keyword_str, category_explanation, keyword_explanation, category = mirror[1:]
+        keywords = keywords_from_str(keyword_str)
+    else:
+        try:
+            if llm_mode == 'combined':
+                analysis = llm.analyze(title, raw_content)
+                cleaned_content = analysis.cleaned_content.strip()[:500]
+                raw_category = analysis.model_dump_json()
+                category = category_for(analysis.category)
+                suggested_category = analysis.category.strip() or 'Uncategorized'
+                keywords = [k.strip() for k in analysis.keywords if k.strip()][:3] or ['none']
+                category_explanation = analysis.category_explanation
+                keyword_explanation = ' '.join(analysis.keyword_explanations) or 'None'
+            else:
+                cleaned_content = llm.clean_content(raw_content)
+                raw_category = llm.classify(title, cleaned_content if cleaned_content else raw_content[:1000])
+                category, suggested_category, keywords = parse_category_and_keywords(raw_category)
+                category_explanation = 'Generated by LLM'
+                keyword_explanation = 'Generated by LLM'
+        except Exception as e:
+            logger.warning("Failed to connect to Ollama for %s%s: %s", url, where, e)
+            raw_category = 'Failed to connect to Ollama'
+            category = 'Uncategorized'
+            suggested_category = 'Uncategorized'
+            keywords = ['none']
+            category_explanation = 'Ollama failure'
+            keyword_explanation = 'Ollama failure'
+            cleaned_content = raw_content[:500]
+    return {
+        "url": url,
+        "title": title,
+        "raw_category": raw_category,
+        "suggested_category": suggested_category,
+        "raw_content": raw_content,
+        "cleaned_content": cleaned_content,
+        "keywords": keywords_to_str(keywords),
+        "category_explanation": category_explanation,
+        "keyword_explanation": keyword_explanation,
+        "content_hash": content_hash,
+        "etag": page.get('etag') or '',
+        "last_modified": page.get('last_modified') or '',
+        "category": category,
+        "keyword_list": keywords
+    }
+
+def link_exists(url):
+    with pool.connection() as conn:
+        return conn.execute("MATCH (l:Link {url: $url}) RETURN l.url", {"url": url}).has_next()
+
+def insert_link(conn, record):
+    # Runs on the writer thread; re-checks existence so concurrent submissions of one URL write it once
+    if conn.execute("MATCH (l:Link {url: $url}) RETURN l.url", {"url": record['url']}).has_next():
+        return False
+    write_link(conn, record)
+    return True
+
+def delete_link_node(conn, url):
+    conn.execute("MATCH (l:Link {url: $url}) DETACH DELETE l", {"url": url})
+
+def update_fetch_state(conn, url, content_hash, etag, last_modified):
+    conn.execute(
+        "MATCH (l:Link {url: $url}) SET l.content_hash = $content_hash, l.etag = $etag, l.last_modified = $last_modified",
+        {"url": url, "content_hash": content_hash, "etag": etag, "last_modified": last_modified}
+    )
+
+def recrawl_link(url, line_num=None, stats=None):
+    # Conditional re-fetch of a stored link; only content with a new fingerprint goes back through the LLM
+    with pool.connection() as conn:
+        result = conn.execute("MATCH (l:Link {url: $url}) RETURN l.content_hash, l.etag, l.last_modified, l.raw_content",
+                              {"url": url})
+        if not result.has_next():
+            return None, 'unknown link'
+        content_hash, etag, last_modified, raw_content = result.get_next()
+    page = fetcher.fetch(url, etag=etag, last_modified=last_modified, stats=stats)
+    if page['not_modified']:
+        return None, 'not modified'
+    if page['error']:
+        raise RuntimeError(f"Fetch failed, keeping the stored content: {page['error']}")
+    extracted = extract_page(page)
+    new_hash = content_fingerprint(extracted[1])
+    # Links stored before fingerprints existed are compared against their stored text
+    if new_hash == (content_hash or content_fingerprint(raw_content)):
+        writer.run(update_fetch_state, url, new_hash, page['etag'] or '', page['last_modified'] or '')
+        mirror_index.set(url, new_hash)
+        return None, 'unchanged'
+    record = build_record_from_page(page, line_num, extracted)
+    record['replace'] = True
+    return record, None
+
+def process_job_row(row, line_num, metadata, recrawl=False, stats=None):
+    url = normalize_url(row.get('url'))
+    if not url:
+        return None, 'empty URL'
+    if recrawl:
+        return recrawl_link(url, line_num, stats)
+    if link_exists(url):
+        return None, 'duplicate'
+    if metadata:
+        return metadata_row_to_record(row, url), None
+    return build_record_from_page(fetcher.fetch(url, stats=stats), line_num), None
+
+def write_job_record(record):
+    if record.pop('replace', False):
+        writer.run(merge_existing_link, record)
+    elif not writer.run(insert_link, record):
+        return False
+    save_to_csv(added=[record])
+    return True
+
+def preload_rows(conn, prepared):
+    # prepared yields (line_num, url, record) in file order from row_pipeline, parsed ahead of the writes
+    processed = 0
+    for line_num, url, record in prepared:
+        if not url:
+            logger.debug("Skipping empty URL in preload row %d", line_num)
+            continue
+        result = conn.execute("MATCH (l:Link {url: $url}) RETURN l.url", {"url": url})
+        if result.has_next():
+            logger.debug("Skipping existing link during preload row %d: %s", line_num, url)
+            continue
+        write_link(conn, record)
+        logger.debug("Preloaded link in row %d: %s, Title: %s, Category: %s, Suggested Category: %s, Keywords: %s",
+                     line_num, url, record['title'], record['category'], record['suggested_category'],
+                     record['keyword_list'])
+        processed += 1
+    return processed
 
 def preload_metadata_csv():
-    csv_path = "/app/links_with_metadata.csv"
-    if not os.path.exists(csv_path):
-        print("No links_with_metadata.csv found, skipping preload")
+    if not os.path.exists(metadata_csv_path):
+        logger.info("No links_with_metadata.csv found, skipping preload")
         return 0
     try:
-        with open(csv_path, 'r', encoding='utf-8') as file:
+        load_indexes()
+        # Fingerprinted before reading, so a file replaced mid-preload does not count as loaded on the next start
+        fingerprint = file_fingerprint(metadata_csv_path)
+        with open(metadata_csv_path, 'r', encoding='utf-8') as file:
             csv_reader = csv.DictReader(file)
-            required_fields = ['url', 'title', 'content', 'category', 'keyword', 'category_explanation', 'keyword_explanation']
-            if not all(field in csv_reader.fieldnames for field in required_fields):
-                print(f"links_with_metadata.csv missing required columns: {required_fields}, skipping preload")
+            if not all(field in csv_reader.fieldnames for field in METADATA_FIELDS):
+                logger.warning("links_with_metadata.csv missing required columns: %s, skipping preload", METADATA_FIELDS)
                 return 0
-            processed = 0
-            for row in csv_reader:
-                url = row['url'].strip()
-                if not url:
-                    print(f"Skipping empty URL in preload row {csv_reader.line_num}")
-                    continue
-                if not url.startswith(('http://', 'https://')):
-                    url = 'https://' + url
-                parsed_url = urllib.parse.urlparse(url)
-                normalized_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}".rstrip('/')
-                url = urllib.parse.quote(normalized_url, safe=':/?=&')
-                result = conn.execute("MATCH (l:Link {url: $url}) RETURN l.url", {"url": url})
-                if result.has_next():
-                    print(f"Skipping existing link during preload row {csv_reader.line_num}: {url}")
-                    continue
-                title = row['title'].strip() if row['title'] else url
-                raw_content = row['content'][:5000].strip() if row['content'] else ""
-                cleaned_content = raw_content[:500]
-                raw_category = row['category'].strip() if row['category'] else 'Uncategorized'
-                suggested_category = raw_category
-                category_explanation = row['category_explanation'].strip() if row['category_explanation'] else 'None'
-                keyword_explanation = row['keyword_explanation'].strip() if row['keyword_explanation'] else 'None'
-                keywords = [k.strip() for k in row['keyword'].split(',') if k.strip()][:3] if row['keyword'] else ['none']
-                category, _, _ = parse_category_and_keywords(f"Category: {raw_category}")
-                keywords_str = ', '.join(keywords) if keywords and keywords != ['none'] else 'none'
-                conn.execute(
-                    "MERGE (:Link {url: $url, title: $title, raw_category: $raw_category, suggested_category: $suggested_category, "
-                    "raw_content: $raw_content, cleaned_content: $cleaned_content, keywords: $keywords, "
-                    "category_explanation: $category_explanation, keyword_explanation: $keyword_explanation})",
-                    {
-                        "url": url,
-                        "title": title,
-                        "raw_category": raw_category,
-                        "suggested_category": suggested_category,
-                        "raw_content": raw_content,
-                        "cleaned_content": cleaned_content,
-                        "keywords": keywords_str,
-                        "category_explanation": category_explanation,
-                        "keyword_explanation": keyword_explanation
-                    }
-                )
-                conn.execute("MERGE (c:Category {name: $name})", {"name": category})
-                conn.execute(
-                    "MATCH (l:Link {url: $url}), (c:Category {name: $name}) MERGE (l)-[:BELONGS_TO]->(c)",
-                    {"url": url, "name": category}
-                )
-                for keyword in keywords:
-                    if keyword != 'none':
-                        conn.execute("MERGE (k:Keyword {name: $name})", {"name": keyword})
-                        conn.execute(
-                            "MATCH (l:Link {url: $url}), (k:Keyword {name: $name}) MERGE (l)-[:HAS_KEYWORD]->(k)",
-                            {"url": url, "name": keyword}
-                        )
-                print(f"Preloaded link in row {csv_reader.line_num}: {url}, Title: {title}, Category: {category}, "
-                      f"Suggested Category: {suggested_category}, Keywords: {keywords}")
-                processed += 1
-            print(f"Preloaded {processed} links from links_with_metadata.csv")
-            return processed
+            if ingest_mode == 'bulk':
+                stats = bulk_ingest_rows(writer.run, csv_reader, pipeline=row_pipeline)
+                if stats['loaded']:
+                    data_version.bump()
+                    index_updates.submit(update_indexes, added=stats['records'])
+                logger.info("Preloaded %d links from links_with_metadata.csv in %.2fs (%.0f rows/sec), skipped %d",
+                            stats['loaded'], stats['seconds'], stats['rows_per_sec'], stats['skipped'])
+                processed = stats['loaded']
+            else:
+                processed = writer.run(preload_rows, row_pipeline.prepare_metadata(csv_reader))
+                if processed:
+                    data_version.bump()
+                    index_updates.submit(resync_indexes)
+                logger.info("Preloaded %d links from links_with_metadata.csv", processed)
+        writer.run(write_state, PRELOAD_STATE, fingerprint)
+        return processed
     except Exception as e:
-        print(f"Error preloading links_with_metadata.csv: {e}")
-        flash(f"Error preloading CSV: {str(e)}")
+        logger.exception("Error preloading links_with_metadata.csv: %s", e)
         return 0
 
-def save_to_csv():
-    csv_path = "/app/links_with_metadata.csv"
+def sync_metadata_csv():
+    # Compacts the CSV export, then preloads it unless the database already holds the file as it is now
+    with pool.connection() as conn:
+        loaded = file_loaded(conn, metadata_csv_path)
+    if loaded:
+        logger.info("Database already holds links_with_metadata.csv, skipping preload")
+        csv_synced.set()  # From here on record_metadata_csv records each new snapshot, starting with the compaction below
+    exporter.compact()  # Fold changes logged before the last shutdown into the snapshot
+    if not loaded:
+        preload_metadata_csv()
+        csv_synced.set()
+
+def update_similar(added=None, deleted=None):
+    # Embeds added links and replaces their SIMILAR_TO edges with their current nearest neighbours
+    if deleted:
+        vector_index.delete(deleted)
+    if added:
+        vector_index.add(added)
+        write_similar([record['url'] for record in added])
+
+def write_similar(urls):
+    # A single link's edges are MERGEd by primary key; uploads, preloads and startup syncs COPY their pairs
+    pairs = vector_index.pairs(urls, k=similar_k, threshold=similar_threshold)
+    if len(urls) == 1:
+        writer.run(link_similar, urls, pairs)
+    else:
+        writer.run(copy_similar, urls, pairs)
+
+def rebuild_similar_links():
+    # Exact top-k for every link; the pairs are computed before the writer is taken
+    return writer.run(rebuild_similar, vector_index.pairs(k=similar_k, threshold=similar_threshold))
+
+def update_indexes(added=None, deleted=None):
+    # Runs on index_updates: search and keyword index changes, embeddings and SIMILAR_TO edges for the added links only
+    load_indexes()
+    try:
+        if added:
+            search_index.add(added)
+            keyword_index.add(added)
+        if deleted:
+            search_index.delete(deleted)
+            keyword_index.delete(deleted)
+    except Exception as e:
+        logger.exception("Error updating search index: %s", e)
     try:
-        result = conn.execute("MATCH (l:Link) RETURN l.url, l.title, l.raw_content, l.raw_category, l.keywords, l.category_explanation, l.keyword_explanation")
-        links = [{
-            "url": row[0],
-            "title": row[1] if row[1] else '',
-            "content": row[2] if row[2] else '',
-            "category": row[3] if row[3] else '',
-            "keyword": row[4] if row[4] else '',
-            "category_explanation": row[5] if row[5] else '',
-            "keyword_explanation": row[6] if row[6] else ''
-        } for row in result]
-        with open(csv_path, 'w', encoding='utf-8', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=['url', 'title', 'content', 'category', 'keyword', 'category_explanation', 'keyword_explanation'])
-            writer.writeheader()
-            for link in links:
-                writer.writerow(link)
-        print(f"Saved {len(links)} links to {csv_path}")
+        update_similar(added, deleted)
     except Exception as e:
-        print(f"Error saving to CSV: {e}")
-        flash(f"Error saving to CSV: {str(e)}")
+        logger.exception("Error updating similarity links: %s", e)
+
+def resync_indexes():
+    # Runs on index_updates after a row-at-a-time preload, which does not keep the records it wrote
+    load_indexes()
+    with pool.connection() as conn:
+        search_index.rebuild(conn)
+        keyword_index.rebuild(conn)
+        mirror_index.rebuild(conn)
+        embedded = vector_index.sync(conn)
+    if embedded:
+        write_similar(embedded)
+
+def save_to_csv(added=None, deleted=None):
+    # Mutations append to the export change log and queue the search and similarity updates, so a bulk
+    # upload returns once its rows are in the database; with no arguments the snapshot is rebuilt from the database
+    if added or deleted:
+        data_version.bump()
+        # The mirror index is a dict update and applied here, so the next job row already sees these fingerprints
+        if added:
+            mirror_index.add(added)
+        if deleted:
+            mirror_index.delete(deleted)
+        index_updates.submit(update_indexes, added, deleted)
+    try:
+        if added:
+            exporter.record_add(added)
+        if deleted:
+            exporter.record_delete(deleted)
+        if added is None and deleted is None:
+            with pool.connection() as conn:
+                exporter.rebuild(conn)
+    except Exception as e:
+        logger.exception("Error saving to CSV: %s", e)
+        if has_request_context():
+            flash(f"Error saving to CSV: {str(e)}")
+
+def finish_job(job_id):
+    exporter.compact()
+    index_updates.submit(vector_index.save)  # After the job's queued embeddings
+
+job_manager = JobManager(
+    os.getenv('JOBS_DIR', '/app/db/jobs'),
+    process_row=process_job_row,
+    write_record=write_job_record,
+    on_complete=finish_job,
+    workers=int(os.getenv('JOB_WORKERS', 8)),  # Also the number of pages fetched at once (FETCH_PER_HOST caps each host)
+    row_stats=FetchStats  # Pages/sec and p50/p99 fetch latency in each job's status
+)
+
+INTERCONNECTIONS_PER_PAGE = 100
+LINKS_PER_PAGE = 50
+MAX_LINKS_PER_PAGE = 500
+GRAPH_PAGE_SIZE = 1000
+MAX_GRAPH_PAGE_SIZE = 10000
+MAX_GRAPH_HOPS = 3
+RELATED_LIMIT = 10
+MAX_RELATED_LIMIT = 100
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+SIMILAR_LIMIT = 10
+MAX_SIMILAR_LIMIT = 100
+
+@app.before_request
+def start_trace():
+    request_trace_id = request.headers.get('X-Request-ID')
+    if request_trace_id or trace_requests:
+        # Reset in end_trace, so a reused worker thread does not tag later log lines with this request's id
+        g.trace_token = current_trace_id.set(request_trace_id or new_trace_id())
+    request.environ['webgraph.started'] = time.perf_counter()
+
+@app.after_request
+def finish_trace(response):
+    started = request.environ.get('webgraph.started')
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        HTTP_SECONDS.observe(elapsed, request.endpoint or 'unknown', request.method)
+        logger.debug("%s %s -> %d in %.1fms", request.method, request.path, response.status_code, elapsed * 1000)
+    if current_trace_id.get() != '-':
+        response.headers['X-Request-ID'] = current_trace_id.get()
+    return response
+
+@app.teardown_request
+def end_trace(exc=None):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        current_trace_id.reset(token)
+
+# Routes
+def cached_fragment(key, render):
+    # Renders a template fragment once per data version and query; later requests skip the database
+    version = data_version.tag()
+    html = fragment_cache.get(version, key)
+    if html is None:
+        html = render()
+        fragment_cache.put(version, key, html)
+    return Markup(html)
+
+def render_links_table(page, per_page, sort, order):
+    with stage('index_query'), pool.connection() as conn:
+        total = count_links(conn)
+        links = page_links(conn, (page - 1) * per_page, per_page, sort, order == 'desc')
+    with stage('render'):
+        return render_template("links_table.html", links=links, links_total=total, page=page,
+                               pages=max(1, -(-total // per_page)), per_page=per_page, sort=sort, order=order)
+
+def links_fragment(page, per_page, sort, order):
+    return cached_fragment(('links', page, per_page, sort, order), lambda: render_links_table(page, per_page, sort, order))
+
+def render_interconnections_table(page):
+    with stage('index_query'), pool.connection() as conn:
+        total = count_cross_category(conn)
+        interconnections = page_cross_category(conn, (page - 1) * INTERCONNECTIONS_PER_PAGE, INTERCONNECTIONS_PER_PAGE)
+    with stage('render'):
+        return render_template("interconnections_table.html", interconnections=interconnections,
+                               interconnections_page=page, interconnections_total=total,
+                               interconnections_pages=max(1, -(-total // INTERCONNECTIONS_PER_PAGE)))
+
+def interconnections_fragment(page):
+    return cached_fragment(('interconnections', page), lambda: render_interconnections_table(page))
 
 # Routes
 @app.route("/", methods=["GET"])
 @app.route("/index", methods=["GET"])
 def index():
     try:
-        result = conn.execute("MATCH (l:Link)-[:BELONGS_TO]->(c:Category) RETURN l.url, l.title, c.name, l.raw_category, l.suggested_category, l.raw_content, l.cleaned_content, l.keywords, l.category_explanation, l.keyword_explanation")
-        links = [{
-            "url": row[0],
-            "title": row[1],
-            "category": row[2],
-            "raw_category": row[3],
-            "suggested_category": row[4] if row[4] else 'None',
-            "raw_content": row[5] if row[5] else 'Failed to fetch content',
-            "cleaned_content": row[6] if row[6] else 'Failed to clean content',
-            "keywords": row[7] if row[7] else 'none',
-            "category_explanation": row[8] if row[8] else 'None',
-            "keyword_explanation": row[9] if row[9] else 'None'
-        } for row in result]
-        print("Fetched links for index route")
-        result = conn.execute("""
-            MATCH (l1:Link)-[:HAS_KEYWORD]->(k:Keyword)<-[:HAS_KEYWORD]-(l2:Link), 
-                  (l1)-[:BELONGS_TO]->(c1:Category), (l2)-[:BELONGS_TO]->(c2:Category)
-            WHERE l1.url <> l2.url AND c1.name <> c2.name
-            RETURN l1.url, l2.url, k.name, c1.name, c2.name
-        """)
-        interconnections = [{
-            "link1": row[0],
-            "link2": row[1],
-            "keyword": row[2],
-            "category1": row[3],
-            "category2": row[4]
-        } for row in result]
-        return render_template("index.html", links=links, interconnections=interconnections)
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = min(max(request.args.get('per_page', LINKS_PER_PAGE, type=int), 1), MAX_LINKS_PER_PAGE)
+        sort = request.args.get('sort', 'url')
+        sort = sort if sort in LINK_SORTS else 'url'
+        order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+        interconnections_page = max(1, request.args.get('interconnections_page', 1, type=int))
+        # The fragments time their queries (index_query) and templates (render) separately
+        links_table = links_fragment(page, per_page, sort, order)
+        interconnections_table = interconnections_fragment(interconnections_page)
+        with stage('render'):
+            return render_template("index.html", links_table=links_table, interconnections_table=interconnections_table)
     except Exception as e:
-        print(f"Error fetching links: {e}")
+        logger.exception("Error fetching links: %s", e)
         return f"Error: {str(e)}", 500
 
+@app.route("/links", methods=["GET"])
+@app.route("/links/<path:url>", methods=["GET"], merge_slashes=False)
+def link_detail(url=None):
+    # Every column of one link, for the index page to show full content on demand; the URL goes in the path or ?url=
+    try:
+        url = url or request.args.get('url', '')
+        with pool.connection() as conn:
+            link = get_link(conn, url) or get_link(conn, normalize_url(url))
+        if link is None:
+            return jsonify({"error": f"Unknown link: {url}"}), 404
+        return jsonify(link)
+    except Exception as e:
+        logger.exception("Error fetching link: %s", e)
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/upload_csv", methods=["POST"])
 def upload_csv():
     try:
-        result = conn.execute("MATCH (l:Link) RETURN COUNT(l) AS cnt")
-        print(f"Total links before CSV upload: {result.get_next()[0]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            with pool.connection() as conn:
+                result = conn.execute("MATCH (l:Link) RETURN COUNT(l) AS cnt")
+                logger.debug("Total links before CSV upload: %d", result.get_next()[0])
         if 'file' not in request.files:
             flash("No file uploaded")
             return redirect(url_for("index"))
@@ -226,7 +573,8 @@ def upload_csv():
         if not file.filename.endswith('.csv'):
             flash("File must be a CSV")
             return redirect(url_for("index"))
-        batch_size = int(request.form.get('batch_size', 5))
+        batch_size = request.form.get('batch_size')
+        batch_size = int(batch_size) if batch_size else None
         try:
             stream = io.StringIO(file.stream.read().decode("UTF-8"), newline=None)
         except UnicodeDecodeError as e:
@@ -234,274 +582,339 @@ def upload_csv():
             return redirect(url_for("index"))
         csv_reader = csv.DictReader(stream)
         required_fields = ['url']
-        metadata_fields = ['url', 'title', 'content', 'category', 'keyword', 'category_explanation', 'keyword_explanation']
-        is_metadata_csv = all(field in csv_reader.fieldnames for field in metadata_fields)
+        is_metadata_csv = all(field in csv_reader.fieldnames for field in METADATA_FIELDS)
         if not all(field in csv_reader.fieldnames for field in required_fields):
             flash("CSV must contain a 'url' column")
             return redirect(url_for("index"))
-        processed = 0
-        skipped = 0
-        for row in csv_reader:
-            if processed >= batch_size:
-                break
-            url = row['url'].strip()
-            if not url:
-                print(f"Skipping empty URL in row {csv_reader.line_num}")
-                skipped += 1
-                continue
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-            parsed_url = urllib.parse.urlparse(url)
-            normalized_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}".rstrip('/')
-            url = urllib.parse.quote(normalized_url, safe=':/?=&')
-            result = conn.execute("MATCH (l:Link {url: $url}) RETURN l.url", {"url": url})
-            if result.has_next():
-                print(f"Skipping duplicate link in row {csv_reader.line_num}: {url}")
-                skipped += 1
-                continue
-            try:
-                if is_metadata_csv:
-                    title = row['title'].strip() if row['title'] else url
-                    raw_content = row['content'][:5000].strip() if row['content'] else ""
-                    cleaned_content = raw_content[:500]
-                    raw_category = row['category'].strip() if row['category'] else 'Uncategorized'
-                    suggested_category = raw_category
-                    category_explanation = row['category_explanation'].strip() if row['category_explanation'] else 'None'
-                    keyword_explanation = row['keyword_explanation'].strip() if row['keyword_explanation'] else 'None'
-                    keywords = [k.strip() for k in row['keyword'].split(',') if k.strip()][:3] if row['keyword'] else ['none']
-                    category, _, _ = parse_category_and_keywords(f"Category: {raw_category}")
-                    keywords_str = ', '.join(keywords) if keywords and keywords != ['none'] else 'none'
-                else:
-                    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-                    try:
-                        response = requests.get(url, headers=headers, timeout=10)
-                        response.raise_for_status()
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        title = soup.title.string.strip() if soup.title else url
-                        text_elements = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-                        raw_content = ' '.join(element.get_text(strip=True) for element in text_elements)[:5000]
-                    except requests.RequestException as e:
-                        print(f"Failed to fetch title/content for {url} in row {csv_reader.line_num}: {e}")
-                        title = url
-                        raw_content = "Failed to fetch content"
-                    ollama_host = os.getenv('OLLAMA_HOST', 'http://host.docker.internal:11434')
-                    cleaned_content = clean_content_with_ollama(raw_content, ollama_host)
-                    try:
-                        client = Client(host=ollama_host, timeout=20)
-                        content_for_prompt = cleaned_content if cleaned_content else raw_content[:1000]
-                        prompt = (
-                            f"Given the webpage title '{title}' and the following content excerpt: '{content_for_prompt[:1000]}', "
-                            f"suggest a single category (e.g., Social Media, Database, News) and up to three keywords (1-2 words each)."
-                        )
-                        response = client.chat(model='mistral:7b-instruct-v0.3-q4_0', messages=[{'role': 'user', 'content': prompt}])
-                        raw_category = response['message']['content'].strip()
-                        category, suggested_category, keywords = parse_category_and_keywords(raw_category)
-                        category_explanation = 'Generated by LLM'
-                        keyword_explanation = 'Generated by LLM'
-                        keywords_str = ', '.join(keywords) if keywords and keywords != ['none'] else 'none'
-                    except Exception as e:
-                        print(f"Failed to connect to Ollama for {url} in row {csv_reader.line_num}: {e}")
-                        raw_category = 'Failed to connect to Ollama'
-                        category = 'Uncategorized'
-                        suggested_category = 'Uncategorized'
-                        keywords = ['none']
-                        keywords_str = 'none'
-                        category_explanation = 'Ollama failure'
-                        keyword_explanation = 'Ollama failure'
-                        cleaned_content = raw_content[:500]
-                conn.execute(
-                    "MERGE (:Link {url: $url, title: $title, raw_category: $raw_category, suggested_category: $suggested_category, "
-                    "raw_content: $raw_content, cleaned_content: $cleaned_content, keywords: $keywords, "
-                    "category_explanation: $category_explanation, keyword_explanation: $keyword_explanation})",
-                    {
-                        "url": url,
-                        "title": title,
-                        "raw_category": raw_category,
-                        "suggested_category": suggested_category,
-                        "raw_content": raw_content,
-                        "cleaned_content": cleaned_content,
-                        "keywords": keywords_str,
-                        "category_explanation": category_explanation,
-                        "keyword_explanation": keyword_explanation
-                    }
-                )
-                conn.execute("MERGE (c:Category {name: $name})", {"name": category})
-                conn.execute(
-                    "MATCH (l:Link {url: $url}), (c:Category {name: $name}) MERGE (l)-[:BELONGS_TO]->(c)",
-                    {"url": url, "name": category}
-                )
-                for keyword in keywords:
-                    if keyword != 'none':
-                        conn.execute("MERGE (k:Keyword {name: $name})", {"name": keyword})
-                        conn.execute(
-                            "MATCH (l:Link {url: $url}), (k:Keyword {name: $name}) MERGE (l)-[:HAS_KEYWORD]->(k)",
-                            {"url": url, "name": keyword}
-                        )
-                print(f"Added link in row {csv_reader.line_num}: {url}, Title: {title}, Category: {category}, "
-                      f"Suggested Category: {suggested_category}, Keywords: {keywords}")
-                processed += 1
-            except Exception as e:
-                print(f"Error processing row {csv_reader.line_num} for URL {url}: {e}")
-                flash(f"Error processing row {csv_reader.line_num} for URL {url}: {str(e)}")
-                skipped += 1
-                continue
-        result = conn.execute("MATCH (l:Link) RETURN COUNT(l) AS cnt")
-        print(f"Total links after CSV upload: {result.get_next()[0]}")
-        save_to_csv()  # Save to CSV after uploading
-        flash(f"Successfully processed {processed} links, skipped {skipped} duplicates or invalid entries")
+        if is_metadata_csv and ingest_mode == 'bulk':
+            merge_existing = request.form.get('merge_existing') == 'on'
+            stats = bulk_ingest_rows(writer.run, csv_reader, merge_existing=merge_existing, limit=batch_size,
+                                     pipeline=row_pipeline)
+            logger.info("Bulk loaded %d links, merged %d in %.2fs (%.0f rows/sec)",
+                        stats['loaded'], stats['merged'], stats['seconds'], stats['rows_per_sec'])
+            save_to_csv(added=stats['records'])  # Log uploaded links to the CSV export
+            flash(f"Successfully processed {stats['loaded'] + stats['merged']} links, skipped {stats['skipped']} duplicates "
+                  f"or invalid entries ({stats['rows_per_sec']:.0f} rows/sec)")
+            return redirect(url_for("index"))
+        stream.seek(0)
+        job_manager.start()
+        job_id = job_manager.submit(stream, file.filename, is_metadata_csv, limit=batch_size)
+        logger.info("Queued job %s for %s", job_id, file.filename)
+        flash(f"Queued job {job_id}, track progress at {url_for('job_status', job_id=job_id)}")
         return redirect(url_for("index"))
     except Exception as e:
-        print(f"Error processing CSV: {e}")
+        logger.exception("Error processing CSV: %s", e)
         flash(f"Error processing CSV: {str(e)}")
         return redirect(url_for("index"))
 
 @app.route("/add_link", methods=["POST"])
 def add_link():
     try:
-        url = request.form["url"]
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-        parsed_url = urllib.parse.urlparse(url)
-        normalized_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}".rstrip('/')
-        url = urllib.parse.quote(normalized_url, safe=':/?=&')
-        result = conn.execute("MATCH (l:Link {url: $url}) RETURN l.url", {"url": url})
-        if result.has_next():
-            print(f"Skipping duplicate link: {url}")
+        url = normalize_url(request.form["url"])
+        if link_exists(url):
+            logger.info("Skipping duplicate link: %s", url)
             flash(f"Link already exists: {url}")
             return redirect(url_for("index"))
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-        content = ""
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title = soup.title.string.strip() if soup.title else url
-            text_elements = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            content = ' '.join(element.get_text(strip=True) for element in text_elements)[:5000]
-        except requests.RequestException as e:
-            print(f"Failed to fetch title/content for {url}: {e}")
-            title = url
-            content = "Failed to fetch content"
-        ollama_host = os.getenv('OLLAMA_HOST', 'http://host.docker.internal:11434')
-        cleaned_content = clean_content_with_ollama(content, ollama_host)
-        try:
-            client = Client(host=ollama_host, timeout=20)
-            content_for_prompt = cleaned_content if cleaned_content else content[:1000]
-            prompt = (
-                f"Given the webpage title '{title}' and the following content excerpt: '{content_for_prompt[:1000]}', "
-                f"suggest a single category (e.g., Social Media, Database, News) and up to three keywords (1-2 words each)."
-            )
-            response = client.chat(model='mistral:7b-instruct-v0.3-q4_0', messages=[{'role': 'user', 'content': prompt}])
-            raw_category = response['message']['content'].strip()
-            category, suggested_category, keywords = parse_category_and_keywords(raw_category)
-            print(f"Ollama raw response: {raw_category}")
-            conn.execute("MERGE (c:Category {name: $name})", {"name": category})
-            for keyword in keywords:
-                if keyword != 'none':
-                    conn.execute("MERGE (k:Keyword {name: $name})", {"name": keyword})
-                    conn.execute("MATCH (l:Link {url: $url}), (k:Keyword {name: $name}) MERGE (l)-[:HAS_KEYWORD]->(k)", {"url": url, "name": keyword})
-            keywords_str = ', '.join(keywords) if keywords and keywords != ['none'] else 'none'
-        except Exception as e:
-            print(f"Failed to connect to Ollama at {ollama_host}: {e}")
-            raw_category = 'Failed to connect to Ollama'
-            category = 'Uncategorized'
-            suggested_category = 'Uncategorized'
-            keywords = ['none']
-            keywords_str = 'none'
-            conn.execute("MERGE (c:Category {name: 'Uncategorized'})")
-        conn.execute(
-            "MERGE (:Link {url: $url, title: $title, raw_category: $raw_category, suggested_category: $suggested_category, "
-            "raw_content: $raw_content, cleaned_content: $cleaned_content, keywords: $keywords})",
-            {
-                "url": url,
-                "title": title,
-                "raw_category": raw_category,
-                "suggested_category": suggested_category,
-                "raw_content": content,
-                "cleaned_content": cleaned_content,
-                "keywords": keywords_str
-            }
-        )
-        conn.execute("MATCH (l:Link {url: $url}), (c:Category {name: $name}) MERGE (l)-[:BELONGS_TO]->(c)", {"url": url, "name": category})
-        print(f"Added link: {url}, Title: {title}, Category: {category}, Suggested Category: {suggested_category}, Keywords: {keywords}")
-        save_to_csv()  # Save to CSV after adding link
+        record = build_record_from_page(fetcher.fetch(url))
+        if not writer.run(insert_link, record):
+            logger.info("Skipping duplicate link: %s", url)
+            flash(f"Link already exists: {url}")
+            return redirect(url_for("index"))
+        logger.info("Added link: %s, Title: %s, Category: %s, Suggested Category: %s, Keywords: %s",
+                    url, record['title'], record['category'], record['suggested_category'], record['keyword_list'])
+        save_to_csv(added=[record])  # Log the new link to the CSV export
         flash(f"Successfully added link: {url}")
         return redirect(url_for("index"))
     except Exception as e:
-        print(f"Error adding link: {e}")
+        logger.exception("Error adding link: %s", e)
         flash(f"Error adding link: {str(e)}")
         return redirect(url_for("index"))
 
+def select_graph_items(conn, args):
+    node_id = args.get('node')
+    category = args.get('category')
+    keyword = args.get('keyword')
+    if node_id or category or keyword:
+        if node_id:
+            seeds = parse_node_id(node_id)
+        else:
+            seeds = {"categories": [category]} if category else {"keywords": [canonical_keyword(keyword)]}
+        hops = min(max(args.get('hops', 1 if node_id else 2, type=int), 0), MAX_GRAPH_HOPS)
+        found = neighbourhood(conn, hops=hops, **seeds)
+        return iter_subgraph(conn, found['links'], found['categories'], found['keywords']), None
+    if 'limit' in args or 'cursor' in args:
+        limit = min(max(args.get('limit', GRAPH_PAGE_SIZE, type=int), 1), MAX_GRAPH_PAGE_SIZE)
+        return page_graph(conn, args.get('cursor'), limit)
+    return iter_graph(conn), None
+
 @app.route("/graph_data", methods=["GET"])
 def graph_data():
     try:
-        nodes = []
-        result = conn.execute("MATCH (l:Link) WHERE l.title IS NOT NULL RETURN l.url, l.title")
-        link_count = 0
-        for row in result:
-            nodes.append({"id": f"Link:{row[0]}", "label": row[1], "group": "Link"})
-            link_count += 1
-        print(f"Fetched {link_count} links for graph")
-        
-        result = conn.execute("MATCH (c:Category) WHERE c.name IS NOT NULL RETURN c.name")
-        category_count = 0
-        for row in result:
-            nodes.append({"id": f"Category:{row[0]}", "label": row[0], "group": "Category"})
-            category_count += 1
-        print(f"Fetched {category_count} categories for graph")
-        
-        result = conn.execute("MATCH (k:Keyword) WHERE k.name IS NOT NULL RETURN k.name")
-        keyword_count = 0
-        for row in result:
-            nodes.append({"id": f"Keyword:{row[0]}", "label": row[0], "group": "Keyword"})
-            keyword_count += 1
-        print(f"Fetched {keyword_count} keywords for graph")
-        
-        edges = []
-        result = conn.execute("MATCH (l:Link)-[:BELONGS_TO]->(c:Category) WHERE l.url IS NOT NULL AND c.name IS NOT NULL RETURN l.url, c.name")
-        belongs_to_count = 0
-        for row in result:
-            edges.append({"from": f"Link:{row[0]}", "to": f"Category:{row[1]}"})
-            belongs_to_count += 1
-        print(f"Fetched {belongs_to_count} BELONGS_TO edges for graph")
-        
-        result = conn.execute("MATCH (l:Link)-[:HAS_KEYWORD]->(k:Keyword) WHERE l.url IS NOT NULL AND k.name IS NOT NULL RETURN l.url, k.name")
-        has_keyword_count = 0
-        for row in result:
-            edges.append({"from": f"Link:{row[0]}", "to": f"Keyword:{row[1]}"})
-            has_keyword_count += 1
-        print(f"Fetched {has_keyword_count} HAS_KEYWORD edges for graph")
-        
-        node_ids = [node['id'] for node in nodes]
-        print(f"Node IDs: {node_ids}")
-        if len(node_ids) != len(set(node_ids)):
-            print(f"Warning: Duplicate node IDs detected: {set([x for x in node_ids if node_ids.count(x) > 1])}")
-        
-        print(f"Graph data: {len(nodes)} nodes, {len(edges)} edges")
-        return jsonify({"nodes": nodes, "edges": edges})
+        version = data_version.tag()
+        cache_key = request.query_string.decode('utf-8')
+        etag = f"{version}-{hashlib.sha1(cache_key.encode('utf-8')).hexdigest()[:12]}"
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        streaming = request.args.get('format') == 'ndjson'
+        body = None if streaming else graph_cache.get(version, cache_key)
+        if body is None:
+            if streaming:
+                def generate():
+                    with pool.connection() as conn:
+                        items, next_cursor = select_graph_items(conn, request.args)
+                        for kind, item in items:
+                            yield json.dumps(dict(item, type=kind)) + "\n"
+                    if next_cursor:
+                        yield json.dumps({"type": "cursor", "next_cursor": next_cursor}) + "\n"
+                response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+                response.set_etag(etag, weak=True)
+                return response
+            with pool.connection() as conn:
+                items, next_cursor = select_graph_items(conn, request.args)
+                nodes = []
+                edges = []
+                for kind, item in items:
+                    (nodes if kind == 'node' else edges).append(item)
+            duplicates = find_duplicate_ids(nodes)
+            if duplicates:
+                logger.warning("Duplicate node IDs detected: %s", duplicates)
+            logger.debug("Graph data: %d nodes, %d edges", len(nodes), len(edges))
+            payload = {"nodes": nodes, "edges": edges, "version": version}
+            if next_cursor or 'cursor' in request.args or 'limit' in request.args:
+                payload["next_cursor"] = next_cursor
+            body = json.dumps(payload).encode('utf-8')
+            graph_cache.put(version, cache_key, body)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag, weak=True)
+        return response
     except Exception as e:
-        print(f"Error fetching graph data: {e}")
+        logger.exception("Error fetching graph data: %s", e)
         return jsonify({"nodes": [], "edges": [], "error": str(e)}), 200
 
+@app.route("/graph_snapshot", methods=["GET"])
+def graph_snapshot_data():
+    # The graph as integer-id columns with CSR edges; ?since=<version> returns only what changed since that version,
+    # or the full snapshot when the history no longer reaches back to it
+    try:
+        snapshot = graph_snapshot.refresh(data_version.tag(), pool.connection)
+        version = snapshot.version
+        if request.if_none_match.contains_weak(version):
+            response = Response(status=304)
+            response.set_etag(version, weak=True)
+            return response
+        since = request.args.get('since', '')
+        compress = 'gzip' in request.accept_encodings
+        cache_key = f"{since}|{'gzip' if compress else 'identity'}"
+        body = snapshot_cache.get(version, cache_key)
+        if body is None:
+            payload = (snapshot.delta(since) if since else None) or snapshot.full()
+            version = payload['version']  # A refresh may have landed in between
+            body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+            if compress:
+                body = gzip.compress(body, compresslevel=6)
+            snapshot_cache.put(version, cache_key, body)
+        response = Response(body, mimetype='application/json')
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(version, weak=True)
+        return response
+    except Exception as e:
+        logger.exception("Error building graph snapshot: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/graph_snapshot/files/<version>/<name>", methods=["GET"])
+def graph_snapshot_file(version, name):
+    # The saved .npy arrays and meta.json of one snapshot version, for clients that memory-map them;
+    # version 'current' redirects to the newest one
+    snapshot = graph_snapshot.refresh(data_version.tag(), pool.connection)
+    if version == 'current':
+        return redirect(url_for('graph_snapshot_file', version=snapshot.version, name=name))
+    directory = snapshot.directory(version)
+    if directory is None or name not in {'meta.json'} | {f"{array}.npy" for array in SNAPSHOT_ARRAYS}:
+        return jsonify({"error": f"Unknown snapshot file: {version}/{name}"}), 404
+    return send_from_directory(directory, name, max_age=86400)  # A version's files never change
+
+@app.route("/related", methods=["GET"])
+@app.route("/related/<path:url>", methods=["GET"], merge_slashes=False)
+def related_links(url=None):
+    # Top links sharing keywords with a link, weighted by keyword IDF; the URL goes in the path or ?url=
+    try:
+        url = url or request.args.get('url', '')
+        url = normalize_url(url) or url
+        limit = min(max(request.args.get('limit', RELATED_LIMIT, type=int), 1), MAX_RELATED_LIMIT)
+        min_shared = max(request.args.get('min_shared', 1, type=int), 1)
+        load_indexes()
+        if url not in keyword_index:
+            return jsonify({"error": f"Unknown link: {url}"}), 404
+        return jsonify({"url": url, "title": keyword_index.title(url), "keywords": keyword_index.keywords(url),
+                        "related": keyword_index.related(url, limit=limit, min_shared=min_shared)})
+    except Exception as e:
+        logger.exception("Error finding related links: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/similar", methods=["GET"])
+@app.route("/similar/<path:url>", methods=["GET"], merge_slashes=False)
+def similar_links(url=None):
+    # Nearest links by content embedding; the URL goes in the path or ?url=
+    try:
+        url = url or request.args.get('url', '')
+        url = normalize_url(url) or url
+        limit = min(max(request.args.get('limit', SIMILAR_LIMIT, type=int), 1), MAX_SIMILAR_LIMIT)
+        threshold = request.args.get('threshold', similar_threshold, type=float)
+        load_indexes()
+        if url not in vector_index:
+            return jsonify({"error": f"Unknown link: {url}"}), 404
+        return jsonify({"url": url, "similar": vector_index.neighbours(url, k=limit, threshold=threshold)})
+    except Exception as e:
+        logger.exception("Error finding similar links: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/similar/rebuild", methods=["POST"])
+def rebuild_similar_route():
+    try:
+        load_indexes()
+        with pool.connection() as conn:
+            embedded = vector_index.sync(conn)
+        count = rebuild_similar_links()
+        logger.info("Rebuilt %d similarity links (%d links embedded)", count, len(embedded))
+        return jsonify({"rebuilt": True, "embedded": len(embedded), "edges": count})
+    except Exception as e:
+        logger.exception("Error rebuilding similarity links: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/search", methods=["GET"])
+def search():
+    # BM25-ranked links for ?q= over title and cleaned content; a trailing '*' makes a word a prefix
+    try:
+        query = request.args.get('q', '').strip()
+        limit = min(max(request.args.get('limit', SEARCH_LIMIT, type=int), 1), MAX_SEARCH_LIMIT)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        if not query:
+            return jsonify({"error": "Missing query parameter q"}), 400
+        load_indexes()
+        return jsonify(dict(search_index.search(query, limit=limit, offset=offset), query=query))
+    except Exception as e:
+        logger.exception("Error searching links: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/search/rebuild", methods=["POST"])
+def rebuild_search():
+    try:
+        load_indexes()
+        with pool.connection() as conn:
+            count = search_index.rebuild(conn)
+            keyword_index.rebuild(conn)
+        logger.info("Rebuilt search index over %d links", count)
+        return jsonify({"rebuilt": True, "links": count})
+    except Exception as e:
+        logger.exception("Error rebuilding search index: %s", e)
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/delete_link", methods=["POST"])
 def delete_link():
     try:
         url = request.form["url"]
-        conn.execute("MATCH (l:Link {url: $url}) DETACH DELETE l", {"url": url})
-        print(f"Deleted link: {url}")
-        save_to_csv()  # Save to CSV after deleting link
+        writer.run(delete_link_node, url)
+        logger.info("Deleted link: %s", url)
+        save_to_csv(deleted=url)  # Log the deletion to the CSV export
         flash(f"Successfully deleted link: {url}")
         return redirect(url_for("index"))
     except Exception as e:
-        print(f"Error deleting link: {e}")
+        logger.exception("Error deleting link: %s", e)
         flash(f"Error deleting link: {str(e)}")
         return redirect(url_for("index"))
 
+@app.route("/recrawl", methods=["POST"])
+def recrawl():
+    # Queues a job re-fetching the given url(s), or every link; unchanged pages keep their stored classification
+    try:
+        urls = request.values.getlist('url')
+        if not urls:
+            with pool.connection() as conn:
+                urls = [row[0] for row in conn.execute("MATCH (l:Link) RETURN l.url")]
+        stream = io.StringIO()
+        csv_writer = csv.writer(stream)
+        csv_writer.writerow(['url'])
+        csv_writer.writerows([url] for url in urls)
+        stream.seek(0)
+        job_manager.start()
+        job_id = job_manager.submit(stream, 'recrawl', False, recrawl=True)
+        logger.info("Queued recrawl job %s for %d links", job_id, len(urls))
+        return jsonify({"job_id": job_id, "links": len(urls), "status_url": url_for('job_status', job_id=job_id)}), 202
+    except Exception as e:
+        logger.exception("Error queueing recrawl: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    state = job_manager.status(job_id)
+    if state is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(state)
+
+@app.route("/interconnections/rebuild", methods=["POST"])
+def rebuild_interconnections():
+    try:
+        count = writer.run(rebuild_cross_category)
+        data_version.bump()
+        logger.info("Rebuilt %d cross-category interconnections", count)
+        flash(f"Rebuilt {count} interconnections")
+    except Exception as e:
+        logger.exception("Error rebuilding interconnections: %s", e)
+        flash(f"Error rebuilding interconnections: {str(e)}")
+    return redirect(url_for("index"))
+
+@app.route("/export", methods=["POST"])
+def export_snapshot():
+    try:
+        if request.args.get('full') == '1':
+            with pool.connection() as conn:
+                count = exporter.rebuild(conn)
+            return jsonify({"rebuilt": True, "links": count})
+        return jsonify({"rebuilt": False, "compacted_changes": exporter.compact()})
+    except Exception as e:
+        logger.exception("Error exporting snapshot: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/llm_stats", methods=["GET"])
+def llm_stats():
+    return jsonify(llm.stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route("/instructions", methods=["GET"])
 def instructions():
-    return render_template("instructions.html")
+    with stage('render'):
+        return render_template("instructions.html")
+
+def warm_up_index_page():
+    # Renders the default index page tables so the first visitor does not pay for the cold queries
+    with app.test_request_context('/'):
+        links_fragment(1, LINKS_PER_PAGE, 'url', 'asc')
+        interconnections_fragment(1)
+
+def warm_up():
+    # Startup work that can finish while requests are already being served
+    start = time.perf_counter()
+    try:
+        warm_up_index_page()
+        load_indexes()
+        version = data_version.tag()
+        sync_metadata_csv()
+        if data_version.tag() != version:
+            warm_up_index_page()
+        graph_snapshot.refresh(data_version.tag(), pool.connection)
+        logger.info("Warm-up finished in %.2fs", time.perf_counter() - start)
+    except Exception as e:
+        logger.exception("Error warming up: %s", e)
 
 if __name__ == "__main__":
-    print("Starting Flask server")
-    preload_metadata_csv()
+    logger.info("Starting Flask server")
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+    job_manager.start()
     app.run(host="0.0.0.0", port=5000, debug=False)
\ No newline at end of file
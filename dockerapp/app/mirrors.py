@@ -0,0 +1,62 @@
+import logging
+import threading
+
+# In-memory content fingerprint lookup. content_hash is not the Link primary key, so
+# matching a fetched page against the stored ones in Kùzu scans the whole Link table;
+# this map from fingerprint to URLs is loaded from the database once and then kept
+# current from the same add/delete hooks as the search index.
+
+logger = logging.getLogger(__name__)
+
+
+class MirrorIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hashes = {}  # url -> content_hash
+        self.urls = {}  # content_hash -> {url}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _set(self, url, content_hash):
+        self._remove(url)
+        if content_hash:
+            self.hashes[url] = content_hash
+            self.urls.setdefault(content_hash, set()).add(url)
+
+    def _remove(self, url):
+        content_hash = self.hashes.pop(url, None)
+        if content_hash is None:
+            return
+        urls = self.urls[content_hash]
+        urls.discard(url)
+        if not urls:
+            del self.urls[content_hash]
+
+    def set(self, url, content_hash):
+        with self.lock:
+            self._set(url, content_hash)
+
+    def add(self, records):
+        # records are Link records (url, content_hash); an existing url is replaced
+        with self.lock:
+            for record in records:
+                self._set(record['url'], record['content_hash'])
+
+    def delete(self, url):
+        with self.lock:
+            self._remove(url)
+
+    def rebuild(self, conn):
+        rows = conn.execute("MATCH (l:Link) WHERE l.content_hash <> '' RETURN l.url, l.content_hash")
+        with self.lock:
+            self.hashes, self.urls = {}, {}
+            for url, content_hash in rows:
+                self._set(url, content_hash)
+            logger.debug("Mirror index rebuilt: %d links, %d fingerprints", len(self.hashes), len(self.urls))
+        return len(self.hashes)
+
+    def find(self, content_hash, url=None):
+        # Another link with this fingerprint, or None
+        with self.lock:
+            return next((other for other in sorted(self.urls.get(content_hash, ())) if other != url), None)
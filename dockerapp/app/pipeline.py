@@ -0,0 +1,104 @@
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from extractor import get_extractor
+from helpers import normalize_url, metadata_row_to_record
+
+# CPU-bound per-row work (URL normalization, category/keyword parsing, HTML extraction)
+# fanned out to a pool of worker processes. Rows go out in chunks and come back in input
+# order, so the single DB writer sees exactly the sequence the sequential path produces.
+# Workers are forked once at startup, before the database or any threads exist; with one
+# worker, or if the pool breaks, the same functions run in the calling thread instead.
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_metadata_chunk(chunk):
+    prepared = []
+    for line_num, row in chunk:
+        url = normalize_url(row.get('url'))
+        prepared.append((line_num, url, metadata_row_to_record(row, url) if url else None))
+    return prepared
+
+
+def extract_html(extractor_name, html, url):
+    return get_extractor(extractor_name)(html, url)
+
+
+def _ready():
+    return True
+
+
+class RowPipeline:
+    def __init__(self, workers=1, chunk_size=500, extractor='streaming'):
+        get_extractor(extractor)
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.extractor = extractor
+        self.executor = None
+
+    def start(self):
+        if self.workers > 1 and self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('fork'))
+            # Fork every worker now, while the process is still single-threaded
+            for future in [self.executor.submit(_ready) for _ in range(self.workers)]:
+                future.result()
+            logger.info("Started %d parse workers", self.workers)
+        return self
+
+    def shutdown(self):
+        executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _broken(self, error):
+        if self.executor is not None:
+            logger.warning("Parse worker pool failed (%s), continuing in-process", error)
+            self.executor = None
+
+    def _submit(self, fn, *args):
+        executor = self.executor
+        if executor is not None:
+            try:
+                return executor.submit(fn, *args)
+            except (BrokenProcessPool, RuntimeError) as e:
+                self._broken(e)
+        return None
+
+    def _collect(self, future, fn, *args):
+        if future is not None:
+            try:
+                return future.result()
+            except BrokenProcessPool as e:
+                self._broken(e)
+        return fn(*args)
+
+    def _chunks(self, rows):
+        chunk = []
+        for index, row in enumerate(rows, 1):
+            chunk.append((getattr(rows, 'line_num', index), row))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def prepare_metadata(self, rows):
+        # Yields (line_num, url, record) per metadata CSV row, in order; url is '' and record None for blank rows.
+        # At most two chunks per worker are in flight, so a large file is never read far ahead of the writer.
+        pending = deque()
+        for chunk in self._chunks(rows):
+            pending.append((self._submit(prepare_metadata_chunk, chunk), chunk))
+            if len(pending) >= self.workers * 2:
+                future, chunk = pending.popleft()
+                yield from self._collect(future, prepare_metadata_chunk, chunk)
+        while pending:
+            future, chunk = pending.popleft()
+            yield from self._collect(future, prepare_metadata_chunk, chunk)
+
+    def extract(self, html, url):
+        # Called from job worker threads: they block on the result while the parse runs in another process
+        return self._collect(self._submit(extract_html, self.extractor, html, url), extract_html, self.extractor, html, url)
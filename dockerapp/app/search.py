@@ -0,0 +1,249 @@
+import heapq
+import json
+import logging
+import math
+import os
+import pickle
+import re
+import sys
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+from telemetry import stage
+
+# Full-text search over link titles and cleaned content. An embedded inverted index (one
+# posting list of term frequencies per token) ranked with BM25, with trailing-'*' prefix
+# queries. It lives in memory and is kept on disk like the CSV export: every add or
+# delete appends a line to a change log, and compaction pickles the whole index and
+# truncates the log, so startup loads the snapshot and replays only the recent changes.
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2  # Title tokens count this many times towards a document's term frequencies
+MIN_PREFIX_LENGTH = 3  # Shorter prefixes are searched as whole words
+MAX_PREFIX_TERMS = 20
+SNAPSHOT_VERSION = 1
+STATE_FIELDS = ('doc_ids', 'urls', 'titles', 'doc_terms', 'doc_lengths', 'free', 'postings', 'total_length')
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text):
+    if not text:
+        return []
+    text = text.casefold()
+    if not text.isascii():
+        # Fold accents so 'kuzu' matches 'Kùzu'
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return [token for token in TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+
+def parse_query(query):
+    # Returns (terms, prefixes); 'graph data*' searches for 'graph' and any term starting with 'data'
+    terms, prefixes = [], []
+    for word in query.split():
+        tokens = tokenize(word)
+        if word.endswith('*') and tokens and len(tokens[-1]) >= MIN_PREFIX_LENGTH:
+            terms.extend(tokens[:-1])
+            prefixes.append(tokens[-1])
+        else:
+            terms.extend(tokens)
+    return terms, prefixes
+
+
+class SearchIndex:
+    def __init__(self, index_dir, compact_every=1000):
+        self.index_dir = index_dir
+        self.snapshot_path = os.path.join(index_dir, 'index.pickle')
+        self.log_path = os.path.join(index_dir, 'changes.jsonl')
+        self.compact_every = compact_every
+        self.lock = threading.RLock()
+        self.pending = 0
+        self._reset()
+
+    def _reset(self):
+        self.doc_ids = {}  # url -> doc id; ids of deleted documents are reused
+        self.urls = []
+        self.titles = []
+        self.doc_terms = []  # doc id -> {term: tf}, kept so deletes can find their postings
+        self.doc_lengths = []
+        self.free = []
+        self.postings = {}  # term -> {doc id: tf}
+        self.total_length = 0
+        self.sorted_terms = None
+        self.norms = None  # BM25 length normalization per doc id, recomputed on the first query after a change
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _add(self, url, title, content):
+        self._remove(url)
+        counts = Counter(tokenize(content))
+        for token in tokenize(title):
+            counts[token] += TITLE_WEIGHT
+        length = sum(counts.values())
+        if self.free:
+            doc = self.free.pop()
+            self.urls[doc], self.titles[doc], self.doc_terms[doc], self.doc_lengths[doc] = url, title, counts, length
+        else:
+            doc = len(self.urls)
+            self.urls.append(url)
+            self.titles.append(title)
+            self.doc_terms.append(counts)
+            self.doc_lengths.append(length)
+        self.doc_ids[url] = doc
+        self.total_length += length
+        self.norms = None
+        for term, tf in counts.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                self.sorted_terms = None
+            posting[doc] = tf
+
+    def _remove(self, url):
+        doc = self.doc_ids.pop(url, None)
+        if doc is None:
+            return
+        for term in self.doc_terms[doc]:
+            posting = self.postings[term]
+            del posting[doc]
+            if not posting:
+                del self.postings[term]
+                self.sorted_terms = None
+        self.total_length -= self.doc_lengths[doc]
+        self.norms = None
+        self.urls[doc], self.titles[doc], self.doc_terms[doc], self.doc_lengths[doc] = None, None, {}, 0
+        self.free.append(doc)
+
+    def _log(self, changes):
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as file:
+            for change in changes:
+                file.write(json.dumps(change) + '\n')
+        self.pending += len(changes)
+        if self.compact_every and self.pending >= self.compact_every:
+            self.compact()
+
+    def add(self, records):
+        # records are Link records (url, title, cleaned_content); an existing url is replaced
+        changes = [{"op": "add", "url": record['url'], "title": record['title'] or '',
+                    "content": record['cleaned_content'] or ''} for record in records]
+        with self.lock, stage('search_update'):
+            for change in changes:
+                self._add(change['url'], change['title'], change['content'])
+            self._log(changes)
+
+    def delete(self, url):
+        with self.lock, stage('search_update'):
+            self._remove(url)
+            self._log([{"op": "delete", "url": url}])
+
+    def load(self):
+        # Returns False when there is no snapshot to load, so the caller can rebuild from the database
+        with self.lock:
+            self._reset()
+            try:
+                with open(self.snapshot_path, 'rb') as file:
+                    snapshot = pickle.load(file)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                if os.path.exists(self.snapshot_path):
+                    logger.warning("Unreadable search index snapshot %s: %s", self.snapshot_path, e)
+                return False
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                return False
+            for name in STATE_FIELDS:
+                setattr(self, name, snapshot[name])
+            self.pending = 0
+            if os.path.exists(self.log_path):
+                with open(self.log_path, 'r', encoding='utf-8') as file:
+                    for line in file:
+                        try:
+                            change = json.loads(line)
+                        except ValueError:
+                            continue  # A line torn by a crash mid-append
+                        if change['op'] == 'delete':
+                            self._remove(change['url'])
+                        else:
+                            self._add(change['url'], change['title'], change['content'])
+                        self.pending += 1
+            logger.info("Loaded search index: %d documents, %d terms (%d logged changes)",
+                        len(self.doc_ids), len(self.postings), self.pending)
+            return True
+
+    def compact(self):
+        with self.lock, stage('search_compact'):
+            os.makedirs(self.index_dir, exist_ok=True)
+            snapshot = {name: getattr(self, name) for name in STATE_FIELDS}
+            snapshot['version'] = SNAPSHOT_VERSION
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+            # Replaying the log over the new snapshot is idempotent, so a crash before this point is safe
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            compacted, self.pending = self.pending, 0
+            return compacted
+
+    def rebuild(self, conn):
+        with self.lock, stage('search_rebuild'):
+            self._reset()
+            for url, title, content in conn.execute("MATCH (l:Link) RETURN l.url, l.title, l.cleaned_content"):
+                self._add(url, title or '', content or '')
+            self.compact()
+            logger.info("Rebuilt search index: %d documents, %d terms", len(self.doc_ids), len(self.postings))
+            return len(self.doc_ids)
+
+    def _expand(self, prefix):
+        if self.sorted_terms is None:
+            self.sorted_terms = sorted(self.postings)
+        terms = []
+        for term in self.sorted_terms[bisect_left(self.sorted_terms, prefix):]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        # Very short prefixes match many terms; keep the ones that occur in the most documents
+        return heapq.nlargest(MAX_PREFIX_TERMS, terms, key=lambda term: len(self.postings[term]))
+
+    def search(self, query, limit=10, offset=0):
+        with self.lock, stage('search'):
+            terms, prefixes = parse_query(query)
+            weights = Counter(terms)
+            for prefix in prefixes:
+                for term in self._expand(prefix):
+                    weights[term] += 1
+            count = len(self.doc_ids)
+            if not count:
+                return {"total": 0, "results": []}
+            norms = self.norms
+            if norms is None:
+                average = self.total_length / count or 1.0
+                norms = self.norms = [K1 * (1 - B + B * length / average) for length in self.doc_lengths]
+            scores = {}
+            get = scores.get
+            for term, weight in weights.items():
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5)) * weight * (K1 + 1)
+                for doc, tf in posting.items():
+                    scores[doc] = get(doc, 0.0) + idf * tf / (tf + norms[doc])
+            top = heapq.nlargest(offset + limit, scores, key=scores.__getitem__)[offset:]
+            return {"total": len(scores), "results": [
+                {"url": self.urls[doc], "title": self.titles[doc], "score": round(scores[doc], 6)} for doc in top
+            ]}
+
+
+if __name__ == "__main__":
+    # Offline rebuild: python search.py [db_path] [index_dir] (stop the web app first to release the DB lock)
+    import kuzu
+    db = kuzu.Database(sys.argv[1] if len(sys.argv) > 1 else "/app/db/kuzu.db")
+    index = SearchIndex(sys.argv[2] if len(sys.argv) > 2 else "/app/db/search")
+    print(f"Indexed {index.rebuild(kuzu.Connection(db))} links")
@@ -0,0 +1,317 @@
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from search import tokenize
+from telemetry import stage
+
+# Content similarity links. Each link's title and cleaned content is embedded as an
+# L2-normalized float32 row of one NumPy matrix, so cosine similarity against every link
+# is a single matrix-vector product. Embeddings come from a local hashing embedder
+# (signed feature hashing of words and word pairs, no model needed) or from an Ollama
+# embedding model. The top-k neighbours above a threshold are materialized as
+# SIMILAR_TO edges, stored once per pair from the lexically smaller URL to the larger.
+# The matrix is saved to disk every few hundred changes and reconciled with the Link
+# table at startup, so embeddings are only computed for links it has not seen.
+
+SCHEMA = "CREATE REL TABLE IF NOT EXISTS SIMILAR_TO (FROM Link TO Link, score DOUBLE)"
+HASHING_DIM = 256
+SYNC_LOOKUP_LIMIT = 100  # More links missing from the index than this are found with one scan instead of an IN list
+
+logger = logging.getLogger(__name__)
+
+
+def hashing_embedder(dim=HASHING_DIM):
+    def embed(texts):
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = Counter(tokens)
+            features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+            for feature, count in features.items():
+                code = zlib.crc32(feature.encode('utf-8'))
+                rows.append(row)
+                columns.append(code % dim)
+                values.append((1.0 + math.log(count)) * (1 if code & 0x80000000 else -1))
+        matrix = np.zeros((len(texts), dim), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)), values)
+        return matrix
+    embed.name = f"hashing-{dim}"
+    return embed
+
+
+def ollama_embedder(llm, model):
+    def embed(texts):
+        return np.array(llm.embed(texts, model), dtype=np.float32)
+    embed.name = f"ollama-{model}"
+    return embed
+
+
+def link_text(title, content):
+    return f"{title or ''}\n{content or ''}"
+
+
+class VectorIndex:
+    def __init__(self, index_dir, embed, batch_size=256, save_every=500):
+        self.index_dir = index_dir
+        self.embed = embed
+        self.batch_size = batch_size
+        self.save_every = save_every
+        self.lock = threading.RLock()
+        self.pending = 0
+        self._reset()
+
+    def _reset(self):
+        self.vectors = None  # Rows beyond len(self.urls) are spare capacity; freed rows are zeroed
+        self.urls = []
+        self.titles = []
+        self.ids = {}
+        self.free = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, url):
+        return url in self.ids
+
+    def _embed(self, texts):
+        with stage('embed'):
+            vectors = np.asarray(self.embed(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _upsert(self, url, title, vector):
+        row = self.ids.get(url)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = len(self.urls)
+                self.urls.append(None)
+                self.titles.append(None)
+                if self.vectors is None:
+                    self.vectors = np.zeros((1024, len(vector)), dtype=np.float32)
+                elif row >= len(self.vectors):
+                    grown = np.zeros((len(self.vectors) * 2, self.vectors.shape[1]), dtype=np.float32)
+                    grown[:len(self.vectors)] = self.vectors
+                    self.vectors = grown
+            self.ids[url] = row
+        self.urls[row] = url
+        self.titles[row] = title
+        self.vectors[row] = vector
+
+    def _remove(self, url):
+        row = self.ids.pop(url, None)
+        if row is None:
+            return
+        self.urls[row] = None
+        self.titles[row] = None
+        self.vectors[row] = 0.0
+        self.free.append(row)
+
+    def _changed(self, count):
+        self.pending += count
+        if self.save_every and self.pending >= self.save_every:
+            self.save()
+
+    def add(self, records):
+        # records are Link records; embeddings are computed in batches of batch_size
+        records = list(records)
+        for start in range(0, len(records), self.batch_size):
+            batch = records[start:start + self.batch_size]
+            vectors = self._embed([link_text(record['title'], record['cleaned_content']) for record in batch])
+            with self.lock:
+                for record, vector in zip(batch, vectors):
+                    self._upsert(record['url'], record['title'], vector)
+        with self.lock:
+            self._changed(len(records))
+
+    def delete(self, url):
+        with self.lock:
+            self._remove(url)
+            self._changed(1)
+
+    def _paths(self):
+        return os.path.join(self.index_dir, 'vectors.npy'), os.path.join(self.index_dir, 'vectors.json')
+
+    def save(self):
+        with self.lock, stage('vector_save'):
+            os.makedirs(self.index_dir, exist_ok=True)
+            vectors_path, meta_path = self._paths()
+            count = len(self.urls)
+            with open(f"{vectors_path}.tmp", 'wb') as file:
+                np.save(file, self.vectors[:count] if self.vectors is not None else np.zeros((0, 0), dtype=np.float32))
+            with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as file:
+                json.dump({"embedder": self.embed.name, "urls": self.urls, "titles": self.titles}, file)
+            os.replace(f"{vectors_path}.tmp", vectors_path)
+            os.replace(f"{meta_path}.tmp", meta_path)
+            self.pending = 0
+
+    def load(self):
+        # Returns False when there is no usable saved matrix (missing, torn, or from another embedder)
+        vectors_path, meta_path = self._paths()
+        with self.lock:
+            self._reset()
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as file:
+                    meta = json.load(file)
+                vectors = np.load(vectors_path)
+            except (OSError, ValueError) as e:
+                if os.path.exists(meta_path):
+                    logger.warning("Unreadable vector index in %s: %s", self.index_dir, e)
+                return False
+            if meta['embedder'] != self.embed.name or len(vectors) != len(meta['urls']):
+                return False
+            if len(vectors):
+                self.vectors = np.zeros((max(1024, len(vectors) * 2), vectors.shape[1]), dtype=np.float32)
+                self.vectors[:len(vectors)] = vectors
+            self.urls = meta['urls']
+            self.titles = meta['titles']
+            for row, url in enumerate(self.urls):
+                if url is None:
+                    self.free.append(row)
+                else:
+                    self.ids[url] = row
+            return True
+
+    def sync(self, conn):
+        # Embeds links the index has not seen and drops ones no longer in the database; returns the added URLs
+        with stage('vector_sync'):
+            # Only the URLs are read for every link; content is read just for the links that need embedding
+            urls = {row[0] for row in conn.execute("MATCH (l:Link) RETURN l.url")}
+            with self.lock:
+                stale = [url for url in self.ids if url not in urls]
+                for url in stale:
+                    self._remove(url)
+            missing = {url for url in urls if url not in self.ids}
+            if len(missing) > SYNC_LOOKUP_LIMIT:
+                # Kùzu matches IN against every element of the list, so a long list is slower than one full scan
+                result = conn.execute("MATCH (l:Link) RETURN l.url, l.title, l.cleaned_content")
+            elif missing:
+                result = conn.execute("MATCH (l:Link) WHERE l.url IN $urls RETURN l.url, l.title, l.cleaned_content",
+                                      {"urls": list(missing)})
+            else:
+                result = []
+            missing = [{"url": url, "title": title, "cleaned_content": content}
+                       for url, title, content in result if url in missing]
+            if missing or stale:
+                self.add(missing)
+                self.save()
+                logger.info("Vector index synced: %d links embedded, %d removed", len(missing), len(stale))
+            return [record['url'] for record in missing]
+
+    def _similar(self, rows, k, threshold):
+        # For each row, its top-k other rows scoring at least threshold, as (row position, other, score) arrays sorted
+        # by position then descending score. Thresholding first leaves a short candidate list to rank instead of a
+        # full partial sort over every link.
+        threshold = max(threshold, 1e-6)  # Freed rows are zero vectors and never reach a positive threshold
+        sims = self.vectors[rows] @ self.vectors[:len(self.urls)].T
+        sims[np.arange(len(rows)), rows] = -np.inf
+        positions, others = np.nonzero(sims >= threshold)
+        scores = sims[positions, others]
+        order = np.lexsort((-scores, positions))
+        positions, others, scores = positions[order], others[order], scores[order]
+        rank = np.arange(len(positions)) - np.searchsorted(positions, positions)
+        keep = rank < k
+        return positions[keep], others[keep], scores[keep]
+
+    def neighbours(self, url, k=10, threshold=0.0):
+        with self.lock, stage('similar'):
+            row = self.ids.get(url)
+            if row is None:
+                return []
+            _, others, scores = self._similar(np.array([row]), k, threshold)
+            return [{"url": self.urls[other], "title": self.titles[other], "score": round(score, 6)}
+                    for other, score in zip(others.tolist(), scores.tolist())]
+
+    def pairs(self, urls=None, k=10, threshold=0.0, block=256):
+        # {(smaller url, larger url): score} for each given link's (default: every link's) top-k neighbours.
+        # Similarities are computed a block of rows at a time, so memory stays at block x links floats.
+        with self.lock, stage('similar_pairs'):
+            if urls is None:
+                rows = np.array([row for row, url in enumerate(self.urls) if url is not None], dtype=np.int64)
+            else:
+                rows = np.array([self.ids[url] for url in urls if url in self.ids], dtype=np.int64)
+            found = {}
+            for start in range(0, len(rows), block):
+                chunk = rows[start:start + block]
+                positions, others, scores = self._similar(chunk, k, threshold)
+                for row, other, score in zip(chunk[positions].tolist(), others.tolist(), scores.tolist()):
+                    found[tuple(sorted((self.urls[row], self.urls[other])))] = score
+            return found
+
+
+def link_similar(conn, urls, pairs):
+    # Replaces the SIMILAR_TO edges touching a few links; every statement is a primary-key lookup, so this
+    # is for single-link updates (batches go through copy_similar)
+    for url in urls:
+        conn.execute("MATCH (l:Link {url: $url})-[r:SIMILAR_TO]->(:Link) DELETE r", {"url": url})
+        conn.execute("MATCH (:Link)-[r:SIMILAR_TO]->(l:Link {url: $url}) DELETE r", {"url": url})
+    for (a, b), score in pairs.items():
+        conn.execute("MATCH (a:Link {url: $a}), (b:Link {url: $b}) MERGE (a)-[r:SIMILAR_TO]->(b) SET r.score = $score",
+                     {"a": a, "b": b, "score": score})
+
+
+def copy_similar(conn, urls, pairs, staging_dir=None):
+    # Batch version of link_similar: the old edges are found with one join against the URL list and the new
+    # pairs go in with COPY FROM a staged file (every pair touches one of the links, so none survives the delete)
+    urls = list(urls)
+    if urls:
+        conn.execute("UNWIND $urls AS url MATCH (l:Link)-[r:SIMILAR_TO]->(:Link) WHERE l.url = url DELETE r", {"urls": urls})
+        conn.execute("UNWIND $urls AS url MATCH (:Link)-[r:SIMILAR_TO]->(l:Link) WHERE l.url = url DELETE r", {"urls": urls})
+    # COPY fails on an endpoint deleted since the pairs were computed, where MERGE would just skip it
+    ends = list({url for pair in pairs for url in pair})
+    found = {row[0] for row in conn.execute("UNWIND $urls AS url MATCH (l:Link) WHERE l.url = url RETURN l.url", {"urls": ends})}
+    if len(found) < len(ends):
+        pairs = {(a, b): score for (a, b), score in pairs.items() if a in found and b in found}
+    return copy_pairs(conn, pairs, staging_dir)
+
+
+def rebuild_similar(conn, pairs, staging_dir=None):
+    # Full replacement goes through COPY FROM a staged file instead of one MERGE per edge
+    conn.execute("MATCH ()-[r:SIMILAR_TO]->() DELETE r")
+    return copy_pairs(conn, pairs, staging_dir)
+
+
+def copy_pairs(conn, pairs, staging_dir=None):
+    if not pairs:
+        return 0
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    stage_dir = tempfile.mkdtemp(prefix='kuzu_similar_', dir=staging_dir)
+    try:
+        path = os.path.join(stage_dir, 'similar_to.parquet')
+        keys = list(pairs)
+        pq.write_table(pa.table({
+            "from": pa.array([a for a, _ in keys], type=pa.string()),
+            "to": pa.array([b for _, b in keys], type=pa.string()),
+            "score": pa.array([pairs[key] for key in keys], type=pa.float64())
+        }), path)
+        conn.execute(f"COPY SIMILAR_TO FROM '{path}'")
+    finally:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+    return len(pairs)
+
+
+if __name__ == "__main__":
+    # Offline rebuild with the hashing embedder: python similarity.py [db_path] [index_dir] [k] [threshold]
+    import kuzu
+    db = kuzu.Database(sys.argv[1] if len(sys.argv) > 1 else "/app/db/kuzu.db")
+    conn = kuzu.Connection(db)
+    conn.execute(SCHEMA)
+    index = VectorIndex(sys.argv[2] if len(sys.argv) > 2 else "/app/db/vectors", hashing_embedder())
+    index.load()
+    index.sync(conn)
+    pairs = index.pairs(k=int(sys.argv[3]) if len(sys.argv) > 3 else 5,
+                        threshold=float(sys.argv[4]) if len(sys.argv) > 4 else 0.35)
+    print(f"Rebuilt {rebuild_similar(conn, pairs)} SIMILAR_TO edges")
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+
+# Restart bookkeeping, kept in the database itself so a replaced or deleted database file
+# never inherits another one's state. The stored schema version lets a restart skip the
+# DDL and data migrations once they have run, and the fingerprint of the metadata CSV the
+# database is known to hold lets it skip the preload entirely while the file is unchanged.
+# A fingerprint is the file's size and mtime plus a SHA-256 of its content; the hash is
+# only recomputed when the size or mtime differ, so an unchanged file costs one stat().
+
+SCHEMA_VERSION = 1  # Bump whenever the DDL or a migration changes
+STATE_SCHEMA = "CREATE NODE TABLE IF NOT EXISTS AppState (name STRING, value STRING, PRIMARY KEY (name))"
+PRELOAD_STATE = 'preload'
+
+
+def read_state(conn, name):
+    try:
+        result = conn.execute("MATCH (s:AppState {name: $name}) RETURN s.value", {"name": name})
+    except RuntimeError:
+        return None  # Databases created before AppState existed
+    return json.loads(result.get_next()[0]) if result.has_next() else None
+
+
+def write_state(conn, name, value):
+    conn.execute("MERGE (s:AppState {name: $name}) SET s.value = $value", {"name": name, "value": json.dumps(value)})
+
+
+def show_tables(conn):
+    return {row[0] for row in conn.execute("CALL show_tables() RETURN name")}
+
+
+def ensure_schema(conn, statements, migrations=()):
+    # Runs the DDL and migrations unless this schema version already has; returns the tables it created
+    if read_state(conn, 'schema_version') == SCHEMA_VERSION:
+        return set()
+    existing = show_tables(conn)
+    conn.execute(STATE_SCHEMA)
+    for statement in statements:
+        conn.execute(statement)
+    for migrate in migrations:
+        migrate(conn)
+    write_state(conn, 'schema_version', SCHEMA_VERSION)
+    return show_tables(conn) - existing - {'AppState'}
+
+
+def file_fingerprint(path, known=None):
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if known and all(known.get(key) == value for key, value in fingerprint.items()):
+        fingerprint['sha256'] = known['sha256']
+        return fingerprint
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+def file_loaded(conn, path):
+    # True when the file at path is the one the database was last recorded as holding
+    known = read_state(conn, PRELOAD_STATE)
+    if not known or not os.path.exists(path):
+        return False
+    return file_fingerprint(path, known)['sha256'] == known['sha256']
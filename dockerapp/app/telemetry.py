@@ -0,0 +1,108 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Latency histograms for the hot paths (rendered in the Prometheus text format on
+# /metrics), a per-request trace id carried through a context variable, and logging
+# setup that stamps every record with the current trace id.
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+trace_id = contextvars.ContextVar('trace_id', default='-')
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self.series.items())
+        for labels, counts, total in series:
+            label_str = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_str + ',' if label_str else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_str}}} {total}")
+            lines.append(f"{self.name}_count{{{label_str}}} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+STAGE_SECONDS = Histogram('webgraph_stage_seconds', 'Latency of ingest and serving stages.', ('stage',))
+OLLAMA_SECONDS = Histogram('webgraph_ollama_seconds', 'Latency of Ollama chat calls (cache misses only).', ('call',))
+KUZU_SECONDS = Histogram('webgraph_kuzu_statement_seconds', 'Latency of Kùzu statements by leading clause.', ('clause',))
+HTTP_SECONDS = Histogram('webgraph_http_request_seconds', 'Latency of HTTP requests by endpoint.', ('endpoint', 'method'))
+HISTOGRAMS = [STAGE_SECONDS, OLLAMA_SECONDS, KUZU_SECONDS, HTTP_SECONDS]
+
+
+def stage(name):
+    return STAGE_SECONDS.time(name)
+
+
+def statement_clause(query):
+    # Label Kùzu timings by their first keyword (MATCH, MERGE, COPY, ...) to keep cardinality bounded
+    head = query.lstrip().split(None, 1)
+    return head[0].upper() if head else 'EMPTY'
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
+
+
+def new_trace_id():
+    return uuid.uuid4().hex[:16]
+
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
+def configure_logging(level='INFO'):
+    handler = logging.StreamHandler()
+    handler.addFilter(TraceIdFilter())
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+    # The Ollama client logs every HTTP request at INFO
+    logging.getLogger('httpx').setLevel(logging.WARNING)
@@ -0,0 +1,302 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, '..', 'app')
+sys.path.insert(0, BENCH_DIR)
+
+import datasets
+import standins
+
+# Benchmark harness for ingestion, the index page, /graph_data and the CSV export.
+# Each dataset size runs in a fresh process (so peak RSS is per size) against a
+# throwaway database, with local stand-ins for the fetched pages and for Ollama.
+#
+#   python benchmark.py --sizes 1000,10000,100000 --output results.json
+#   python benchmark.py compare before.json after.json
+#
+# The 100k size takes several minutes; most of it is materializing CROSS_CATEGORY edges.
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+    return {"p50_ms": pick(50) * 1000, "p95_ms": pick(95) * 1000, "max_ms": ordered[-1] * 1000}
+
+
+def timed_request(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = getattr(client, method)(url, **kwargs)
+    return time.perf_counter() - start, response
+
+
+def wait_for_jobs(main, timeout=3600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        states = [main.job_manager.status(job_id) for job_id in list(main.job_manager.jobs)]
+        if all(state['status'] == 'completed' for state in states):
+            return states
+        time.sleep(0.05)
+    raise TimeoutError("Benchmark jobs did not finish")
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_worker(args):
+    workdir = args.workdir
+    profile = datasets.load_profile()
+    standins.PageHandler.delay = args.fetch_delay
+    standins.OllamaHandler.delay = args.llm_delay
+    standins.OllamaHandler.categories = list(profile['categories'])
+    standins.OllamaHandler.keywords = list(profile['keywords'])
+    _, pages_url = standins.serve(standins.PageHandler)
+    _, ollama_url = standins.serve(standins.OllamaHandler)
+    os.makedirs(os.path.join(workdir, 'db'), exist_ok=True)
+    os.environ.update({
+        "KUZU_DB_PATH": os.path.join(workdir, 'db', 'kuzu.db'),
+        "METADATA_CSV": os.path.join(workdir, 'links_with_metadata.csv'),
+        "LLM_CACHE_DIR": os.path.join(workdir, 'llm_cache'),
+        "JOBS_DIR": os.path.join(workdir, 'jobs'),
+        "SEARCH_INDEX_DIR": os.path.join(workdir, 'search'),
+        "VECTOR_INDEX_DIR": os.path.join(workdir, 'vectors'),
+        "GRAPH_SNAPSHOT_DIR": os.path.join(workdir, 'graph'),
+        "OLLAMA_HOST": ollama_url,
+        "INGEST_MODE": args.ingest_mode,
+        "EXPORT_COMPACT_EVERY": "0",
+        "LOG_LEVEL": os.getenv('LOG_LEVEL', 'WARNING')
+    })
+    dataset_path = os.path.join(workdir, 'dataset.csv')
+    datasets.write_metadata_csv(dataset_path, args.size, seed=args.seed, head_share=args.head_share)
+    sys.path.insert(0, APP_DIR)
+    import main
+    from helpers import metadata_row_to_record
+    client = main.app.test_client()
+    results = {"size": args.size}
+
+    # Ingestion of a pre-analyzed CSV (bulk COPY or per-row MERGE depending on INGEST_MODE)
+    main.job_manager.start()
+    with open(dataset_path, 'rb') as file:
+        start = time.perf_counter()
+        client.post('/upload_csv', data={'file': (file, 'dataset.csv')}, content_type='multipart/form-data')
+        wait_for_jobs(main)
+        elapsed = time.perf_counter() - start
+        main.index_updates.submit(lambda: None).result()  # Search and similarity updates run after the upload returns
+        index_elapsed = time.perf_counter() - start - elapsed
+    with main.pool.connection() as conn:
+        links = conn.execute("MATCH (l:Link) RETURN COUNT(l)").get_next()[0]
+        keywords = conn.execute("MATCH (k:Keyword) RETURN COUNT(k)").get_next()[0]
+        categories = conn.execute("MATCH (c:Category) RETURN COUNT(c)").get_next()[0]
+        interconnections = main.count_cross_category(conn)
+    results["dataset"] = {"links": links, "keywords": keywords, "categories": categories, "interconnections": interconnections}
+    results["ingest_metadata"] = {"rows": args.size, "seconds": elapsed, "rows_per_sec": args.size / elapsed,
+                                  "index_update_seconds": index_elapsed}
+
+    # Ingestion of URL-only rows through fetch and the LLM stand-ins
+    if args.fetch_rows:
+        url_path = os.path.join(workdir, 'urls.csv')
+        datasets.write_url_csv(url_path, pages_url, args.fetch_rows, seed=args.seed)
+        with open(url_path, 'rb') as file:
+            start = time.perf_counter()
+            client.post('/upload_csv', data={'file': (file, 'urls.csv')}, content_type='multipart/form-data')
+            states = wait_for_jobs(main)
+            elapsed = time.perf_counter() - start
+        results["ingest_fetch"] = {"rows": args.fetch_rows, "seconds": elapsed, "rows_per_sec": args.fetch_rows / elapsed,
+                                   "failed": sum(state['failed'] for state in states)}
+
+        # Recrawl of the fetched links: the stand-in answers with 304s for the ETags stored at ingest
+        urls = [f"{pages_url}/fetch/{args.seed}/{i}" for i in range(args.fetch_rows)]
+        start = time.perf_counter()
+        job_id = client.post('/recrawl', data={'url': urls}).get_json()['job_id']
+        wait_for_jobs(main)
+        elapsed = time.perf_counter() - start
+        reasons = main.job_manager.status(job_id)['skip_reasons']
+        results["recrawl"] = {"rows": len(urls), "seconds": elapsed, "not_modified": reasons.get('not modified', 0),
+                              "unchanged": reasons.get('unchanged', 0)}
+
+    main.index_updates.submit(lambda: None).result()  # Measure the read paths with no index updates still queued
+
+    # The index page caches its rendered tables per data version, like /graph_data below
+    cold, warm = [], []
+    for _ in range(args.runs):
+        main.data_version.bump()
+        elapsed, response = timed_request(client, 'get', '/')
+        cold.append(elapsed)
+        warm.append(timed_request(client, 'get', '/')[0])
+    results["index"] = dict(percentiles(cold), bytes=len(response.data), status=response.status_code)
+    results["index_cached"] = percentiles(warm)
+    elapsed, response = timed_request(client, 'get', f'/?page={max(1, args.size // 50)}&sort=title&order=desc')
+    results["index_last_page"] = {"ms": elapsed * 1000, "status": response.status_code}
+
+    # Cold requests bump the data version so the response cache is bypassed; warm ones hit it
+    cold, warm = [], []
+    for _ in range(args.runs):
+        main.data_version.bump()
+        elapsed, response = timed_request(client, 'get', '/graph_data')
+        cold.append(elapsed)
+        warm.append(timed_request(client, 'get', '/graph_data')[0])
+    payload = response.get_json()
+    results["graph_data"] = dict(percentiles(cold), bytes=len(response.data), nodes=len(payload['nodes']), edges=len(payload['edges']))
+    results["graph_data_cached"] = percentiles(warm)
+
+    main.data_version.bump()
+    cursor, pages, size = None, 0, 0
+    start = time.perf_counter()
+    while True:
+        url = '/graph_data?limit=1000' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url)
+        size += len(response.data)
+        pages += 1
+        cursor = response.get_json().get('next_cursor')
+        if not cursor:
+            break
+    results["graph_data_paged"] = {"pages": pages, "seconds": time.perf_counter() - start, "bytes": size}
+
+    # First call after a change rebuilds the keyword index; later calls are served from memory
+    urls = [row['url'] for row in datasets.generate_rows(args.runs, seed=args.seed)]
+    elapsed, response = timed_request(client, 'get', f'/related/{urls[0]}')
+    samples = [timed_request(client, 'get', f'/related/{url}')[0] for url in urls]
+    results["related"] = dict(percentiles(samples), index_build_ms=elapsed * 1000, status=response.status_code)
+
+    samples = [timed_request(client, 'get', f'/similar/{url}')[0] for url in urls]
+    results["similar"] = percentiles(samples)
+
+    queries = [row['title'].split()[-1] for row in datasets.generate_rows(args.runs, seed=args.seed)]
+    queries += ['graph', 'graph data*', 'knowledge grap*']
+    samples = []
+    for query in queries:
+        elapsed, response = timed_request(client, 'get', '/search', query_string={'q': query})
+        samples.append(elapsed)
+    results["search"] = dict(percentiles(samples), status=response.status_code)
+
+    start = time.perf_counter()
+    main.save_to_csv()
+    results["save_to_csv_full"] = {"seconds": time.perf_counter() - start}
+    records = [metadata_row_to_record(row, row['url']) for row in datasets.generate_rows(100, seed=args.seed + 1)]
+    samples = []
+    for record in records:
+        start = time.perf_counter()
+        main.save_to_csv(added=[record])
+        samples.append(time.perf_counter() - start)
+    results["save_to_csv_append"] = percentiles(samples)
+    start = time.perf_counter()
+    main.exporter.compact()
+    results["export_compact"] = {"seconds": time.perf_counter() - start}
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(results))
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--', '..'], cwd=BENCH_DIR, text=True).strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def run_suite(args):
+    import kuzu
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git": git_revision(),
+        "environment": {"python": platform.python_version(), "kuzu": kuzu.__version__, "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "config": {"seed": args.seed, "runs": args.runs, "fetch_rows": args.fetch_rows, "ingest_mode": args.ingest_mode,
+                   "head_share": args.head_share, "fetch_delay": args.fetch_delay, "llm_delay": args.llm_delay},
+        "results": []
+    }
+    for size in [int(size) for size in args.sizes.split(',')]:
+        with tempfile.TemporaryDirectory() as workdir:
+            command = [sys.executable, os.path.abspath(__file__), 'worker', '--size', str(size), '--workdir', workdir,
+                       '--seed', str(args.seed), '--runs', str(args.runs), '--fetch-rows', str(args.fetch_rows),
+                       '--ingest-mode', args.ingest_mode, '--fetch-delay', str(args.fetch_delay),
+                       '--head-share', str(args.head_share), '--llm-delay', str(args.llm_delay)]
+            output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        report["results"].append(result)
+        print(f"size={size}: ingest {result['ingest_metadata']['rows_per_sec']:.0f} rows/s, "
+              f"index p50 {result['index']['p50_ms']:.1f}ms, graph_data p50 {result['graph_data']['p50_ms']:.1f}ms "
+              f"({result['graph_data']['bytes']} bytes), save_to_csv {result['save_to_csv_full']['seconds']:.2f}s, "
+              f"peak RSS {result['peak_rss_mb']:.0f}MB", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+
+def flatten(value, prefix=''):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(args):
+    with open(args.before, 'r', encoding='utf-8') as file:
+        before = json.load(file)
+    with open(args.after, 'r', encoding='utf-8') as file:
+        after = json.load(file)
+    print(f"before {before['git']['commit']}  after {after['git']['commit']}")
+    old_results = {result['size']: dict(flatten(result)) for result in before['results']}
+    for result in after['results']:
+        old = old_results.get(result['size'])
+        if old is None:
+            continue
+        print(f"\nsize={result['size']}")
+        for key, value in flatten(result):
+            if key == 'size' or key not in old:
+                continue
+            change = (value - old[key]) / old[key] * 100 if old[key] else 0.0
+            print(f"  {key:<36} {old[key]:>14.2f} {value:>14.2f} {change:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion, query and export benchmarks")
+    subcommands = parser.add_subparsers(dest='command')
+    for name in ('run', 'worker'):
+        sub = subcommands.add_parser(name)
+        sub.add_argument('--seed', type=int, default=0)
+        sub.add_argument('--runs', type=int, default=5, help="Repetitions for each latency measurement")
+        sub.add_argument('--fetch-rows', type=int, default=200, help="URL-only rows ingested through fetch and the LLM")
+        sub.add_argument('--ingest-mode', choices=['bulk', 'row'], default='bulk')
+        sub.add_argument('--head-share', type=float, default=0.1, help="Share of keywords drawn from the shipped vocabulary")
+        sub.add_argument('--fetch-delay', type=float, default=0.02, help="Stand-in page latency in seconds")
+        sub.add_argument('--llm-delay', type=float, default=0.05, help="Stand-in Ollama latency in seconds")
+        if name == 'run':
+            sub.add_argument('--sizes', default='1000,10000,100000')
+            sub.add_argument('--output')
+        else:
+            sub.add_argument('--size', type=int, required=True)
+            sub.add_argument('--workdir', required=True)
+    sub = subcommands.add_parser('compare')
+    sub.add_argument('before')
+    sub.add_argument('after')
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in ('run', 'worker', 'compare', '-h', '--help'):
+        argv = ['run'] + argv
+    args = parser.parse_args(argv)
+    if args.command == 'worker':
+        run_worker(args)
+    elif args.command == 'compare':
+        compare(args)
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
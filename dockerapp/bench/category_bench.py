@@ -0,0 +1,116 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCH_DIR, '..', '..')
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'app'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'tests'))
+
+from categories import DEFAULT_TAXONOMY, CategoryMatcher, category_for
+from test_categories import legacy_parse_category_and_keywords, random_responses
+
+# Equivalence and throughput check for category resolution. The reference is the previous
+# parse_category_and_keywords, kept verbatim (with the taxonomy as a parameter) in
+# tests/test_categories.py, which runs a small version of this check with the unit tests. Inputs
+# are built from every CSV in the repo with category/keyword/content columns, in the shapes
+# the app produces (metadata rows, LLM classify responses, structured-call categories), plus
+# seeded random responses mixing taxonomy names, case and Unicode case-mapping oddities.
+#
+#   python category_bench.py [--random 20000] [--taxonomy FILE]
+
+CORPORA = [
+    os.path.join(REPO_DIR, 'dockerapp', 'app', 'links_with_metadata.csv'),
+    os.path.join(REPO_DIR, 'notebook', 'links_with_metadata.csv'),
+    os.path.join(REPO_DIR, 'notebook', 'links_with_content.csv'),
+]
+
+
+def corpus_responses():
+    responses = []
+    for path in CORPORA:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                category = (row.get('category') or '').strip()
+                keyword = row.get('keyword') or ''
+                content = row.get('content') or ''
+                responses.append(f"Category: {category or 'Uncategorized'}")
+                responses.append(f"Category: {category}\nKeywords: {keyword}")
+                responses.append(f"Category: {category} Keywords: {keyword}. {row.get('category_explanation') or ''}")
+                responses.append(f"{row.get('title') or ''}\n{content[:1000]}")
+                responses.append(content)
+    return responses
+
+
+def check(responses, matcher, taxonomy):
+    failures = 0
+    for response in responses:
+        expected = legacy_parse_category_and_keywords(response, taxonomy)
+        actual = matcher.parse(response)
+        if actual != expected:
+            failures += 1
+            if failures <= 10:
+                print(f"MISMATCH on {response[:120]!r}:\n  expected {expected}\n  actual   {actual}")
+    return failures
+
+
+def measure(parse, responses, seconds):
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for response in responses:
+            parse(response)
+        done += len(responses)
+    return (time.perf_counter() - start) / done * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Category resolution equivalence and throughput")
+    parser.add_argument('--random', type=int, default=20000, help="Random responses in the equivalence set")
+    parser.add_argument('--taxonomy', help="Also check a custom taxonomy file (one category per line)")
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    corpus = corpus_responses()
+    failures = 0
+    taxonomies = [DEFAULT_TAXONOMY, list(reversed(DEFAULT_TAXONOMY)) + ['database', 'Graph']]
+    if args.taxonomy:
+        from categories import load_taxonomy
+        taxonomies.append(load_taxonomy(args.taxonomy))
+    for taxonomy in taxonomies:
+        matcher = CategoryMatcher(taxonomy)
+        responses = corpus + list(random_responses(rng, args.random, taxonomy)) + ['', 'Category:', 'Keywords: none']
+        failures += check(responses, matcher, taxonomy)
+        if taxonomy is DEFAULT_TAXONOMY:
+            labels = [response[len("Category: "):] for response in responses if response.startswith("Category: ")]
+            failures += sum(category_for(label) != legacy_parse_category_and_keywords(f"Category: {label}")[0] for label in labels)
+        print(f"equivalence: {len(taxonomy)} categories, {len(responses)} responses")
+    print(f"equivalence: {failures} mismatches")
+
+    matcher = CategoryMatcher(DEFAULT_TAXONOMY)
+    shapes = {
+        "metadata row": [response for response in corpus if '\n' not in response and response.startswith('Category: ')
+                         and 'Keywords:' not in response],
+        "classify response": [response for response in corpus if response.startswith('Category: ') and '\nKeywords:' in response],
+        "long text": [response for response in corpus if not response.startswith('Category: ') and response][:500],
+    }
+    print("per call:")
+    for name, responses in shapes.items():
+        before = measure(legacy_parse_category_and_keywords, responses, args.seconds)
+        after = measure(matcher.parse, responses, args.seconds)
+        print(f"  {name:<18} {before:7.2f}us -> {after:7.2f}us  {before / after:5.2f}x")
+    labels = [response[len("Category: "):] for response in shapes["metadata row"]]
+    before = measure(lambda label: legacy_parse_category_and_keywords(f"Category: {label}")[0], labels, args.seconds)
+    after = measure(category_for, labels, args.seconds)
+    print(f"  {'metadata category':<18} {before:7.2f}us -> {after:7.2f}us  {before / after:5.2f}x (category_for, memoized)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import collections
+import csv
+import os
+import random
+
+# Synthetic links_with_metadata.csv datasets. Category frequencies, keywords per link and
+# content lengths are sampled from the shipped CSV; keywords mix a head of the shipped
+# vocabulary (shared by many links) with a long tail of rare synthetic terms, as in the
+# real data where most keywords appear on one or two pages.
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'links_with_metadata.csv')
+FIELDS = ['url', 'title', 'content', 'category', 'keyword', 'category_explanation', 'keyword_explanation']
+
+
+def load_profile(path=SAMPLE_CSV):
+    with open(path, 'r', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    categories = collections.Counter(row['category'].strip() for row in rows if row['category'].strip())
+    keywords = collections.Counter()
+    keyword_counts = []
+    for row in rows:
+        row_keywords = [k.strip() for k in row['keyword'].split(',') if k.strip()][:3]
+        keywords.update(row_keywords)
+        keyword_counts.append(len(row_keywords))
+    return {
+        "categories": categories,
+        "keywords": keywords,
+        "keyword_counts": keyword_counts,
+        "content_lengths": [len(row['content']) for row in rows],
+        "words": ' '.join(row['content'] for row in rows).split() or ['content']
+    }
+
+
+def generate_rows(size, seed=0, head_share=0.1, profile=None):
+    profile = profile or load_profile()
+    rng = random.Random(seed)
+    category_names = list(profile['categories'])
+    category_weights = [profile['categories'][name] for name in category_names]
+    head = list(profile['keywords'])
+    head_weights = [profile['keywords'][name] for name in head]
+    tail_size = max(100, int(size * 1.5))
+    words = profile['words']
+    for i in range(size):
+        keywords = []
+        for _ in range(rng.choice(profile['keyword_counts']) or 1):
+            if rng.random() < head_share:
+                keyword = rng.choices(head, head_weights)[0]
+            else:
+                keyword = f"term {rng.randrange(tail_size)}"
+            if keyword not in keywords:
+                keywords.append(keyword)
+        length = rng.choice(profile['content_lengths'])
+        start = rng.randrange(len(words))
+        content = ' '.join(words[(start + j) % len(words)] for j in range(length // 6 + 1))[:length]
+        yield {
+            "url": f"https://bench{i % 97}.example.com/article/{i}",
+            "title": f"Synthetic article {i}",
+            "content": content,
+            "category": rng.choices(category_names, category_weights)[0],
+            "keyword": ', '.join(keywords),
+            "category_explanation": "Synthetic benchmark row",
+            "keyword_explanation": "Synthetic benchmark row"
+        }
+
+
+def write_metadata_csv(path, size, seed=0, head_share=0.1):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(generate_rows(size, seed, head_share))
+
+
+def write_url_csv(path, base_url, size, seed=0):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['url'])
+        for i in range(size):
+            writer.writerow([f"{base_url}/fetch/{seed}/{i}"])
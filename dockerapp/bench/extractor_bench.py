@@ -0,0 +1,170 @@
+import argparse
+import os
+import random
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from bs4 import XMLParsedAsHTMLWarning
+
+from extractor import EXTRACTORS, extract_with_soup
+
+# Parity and throughput check for the HTML extractors. The parity corpus is a set of
+# hand-written edge cases plus seeded random tag soup (unclosed and stray tags, nested
+# paragraphs, entities, comments, CDATA, script/template text), optionally extended with
+# saved pages from a directory; every extractor must match the BeautifulSoup one exactly.
+# Throughput is measured single-threaded, i.e. pages/sec per core, on realistic pages.
+# tests/test_extractor.py runs a subset of the edge cases with the unit tests.
+#
+#   python extractor_bench.py [--corpus DIR] [--pages 200] [--random 2000]
+
+EDGE_CASES = [
+    "",
+    "plain text without tags",
+    "<title>Only a title</title>",
+    "<title>  Spaced title \n</title><p>x</p>",
+    "<title></title><p>empty title</p>",
+    "<title>A &amp; B &#8217; &#x2014; &#150; &bogus; &amp</title>",
+    "<title>Mixed <b>bold</b> title</title><p>a</p>",
+    "<title><b>Only bold</b></title>",
+    "<title>With <!-- comment --> inside</title>",
+    "<title>Unclosed title<p>para",
+    "<p>before</p><title>Late title</title>",
+    "<svg><title>Icon</title></svg><title>Page</title>",
+    "<p>one<p>two<p>three",
+    "<p>outer <span>inner</span> <b>bold</b></p><h2>Heading</h2>",
+    "<h1>Title<p>nested paragraph</p> tail</h1>",
+    "<p>text</div> still</p>",
+    "</p><p>stray end tag first",
+    "<p/>self closed<p>next</p>",
+    "<p>line<br>break<br/>again</br></p>",
+    "<p>script <script>var x = '<p>not text</p>';</script> after</p>",
+    "<p>style <style>p { color: red }</style> after</p>",
+    "<template><p>template text</p></template><p>visible</p>",
+    "<p>ruby <ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby></p>",
+    "<p>cdata <![CDATA[inside cdata]]> after</p>",
+    "<!DOCTYPE html><html><head><title>Doc</title></head><body><p>Body</p></body></html>",
+    "<p>   </p><p>\n\n</p><p>after blanks</p>",
+    "<p>a</p>" * 3000,
+    "<title>Big</title>" + "<p>" + "word " * 3000 + "</p>" + "<p>tail</p>",
+    "<p>" + "x" * 6000,
+    "<p>ünïcödé — “quotes” &nbsp;non&nbsp;breaking&nbsp;</p>",
+    "<P>Upper case tags</P><H3>Heading</H3>",
+    "<p>attr <a href='/x?a=1&b=2'>link</a></p>",
+    "<pre>  preformatted  </pre><p>x</p><textarea> area </textarea>",
+    "<?xml version='1.0'?><p>pi</p>",
+    "<p>comment<!-- c -->split</p>",
+]
+
+TAGS = ['p', 'h1', 'h2', 'h6', 'div', 'span', 'a', 'b', 'i', 'ul', 'li', 'td', 'title', 'script', 'style', 'template',
+        'rt', 'pre', 'br', 'img', 'hr', 'section', 'P', 'H2']
+TEXT = ['graph', 'database', 'café', 'naïve', '—', 'x', '  ', '\n', '\t', 'κόσμε', '&amp;', '&nbsp;', '&#8217;',
+        '&#x1F600;', '&#150;', '&bogus;', '&lt;', '&amp', '&#0;', '&#xD800;', '&#65', 'a&b', '&copy']
+
+
+def random_page(rng, parts=200):
+    out = []
+    for _ in range(rng.randint(1, parts)):
+        roll = rng.random()
+        tag = rng.choice(TAGS)
+        if roll < 0.3:
+            out.append(f"<{tag}>")
+        elif roll < 0.45:
+            out.append(f"</{tag}>")
+        elif roll < 0.5:
+            out.append(f"<{tag}/>")
+        elif roll < 0.53:
+            out.append(f"<!-- {rng.choice(TEXT)} -->")
+        elif roll < 0.55:
+            out.append(f"<![CDATA[{rng.choice(TEXT)}]]>")
+        else:
+            out.append(' '.join(rng.choice(TEXT) for _ in range(rng.randint(1, 8))))
+    return ''.join(out)
+
+
+def realistic_page(rng, index):
+    words = ("graph database knowledge network ownership compliance analysis model retrieval search "
+             "energy health record fraud detection ledger query language platform data").split()
+    sentence = lambda: ' '.join(rng.choice(words) for _ in range(rng.randint(8, 25))).capitalize() + '.'
+    head = (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Article {index} &amp; notes</title>"
+            + ''.join(f"<link rel='stylesheet' href='/s{i}.css'>" for i in range(10))
+            + "<script>" + "var config = {a: 1, b: [1, 2, 3]};" * rng.randint(200, 800) + "</script>"
+            + "<style>" + ".c { margin: 0 }" * rng.randint(100, 400) + "</style></head>")
+    nav = "<nav><ul>" + ''.join(f"<li><a href='/n{i}'>Section {i}</a></li>" for i in range(60)) + "</ul></nav>"
+    body = ''.join(
+        (f"<h2>{sentence()}</h2>" if i % 6 == 0 else "")
+        + f"<p>{sentence()} <a href='/l{i}'>{rng.choice(words)}</a> {sentence()} <b>{sentence()}</b></p>"
+        for i in range(rng.randint(20, 120))
+    )
+    footer = "<footer>" + "<div><span>footer link</span></div>" * 200 + "</footer>"
+    return head + "<body>" + nav + "<article>" + body + "</article>" + footer + "</body></html>"
+
+
+def load_corpus(directory):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='replace') as file:
+                pages.append((name, file.read()))
+    return pages
+
+
+def check_parity(pages):
+    failures = 0
+    for name, html in pages:
+        expected = extract_with_soup(html, 'https://example.com')
+        for extractor_name, extract in EXTRACTORS.items():
+            actual = extract(html, 'https://example.com')
+            if actual != expected:
+                failures += 1
+                print(f"MISMATCH {extractor_name} on {name}:\n  expected {expected!r:.300}\n  actual   {actual!r:.300}")
+    return failures
+
+
+def measure(extract, pages, seconds=3.0):
+    done = 0
+    size = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for html in pages:
+            extract(html, 'https://example.com')
+            done += 1
+            size += len(html)
+    elapsed = time.perf_counter() - start
+    return done / elapsed, size / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML extractor parity and throughput")
+    parser.add_argument('--corpus', help="Directory of saved .html pages to add to the parity corpus")
+    parser.add_argument('--random', type=int, default=2000, help="Random tag-soup pages in the parity corpus")
+    parser.add_argument('--pages', type=int, default=50, help="Realistic pages in the throughput corpus")
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
+    rng = random.Random(args.seed)
+    corpus = [(f"edge-{i}", html) for i, html in enumerate(EDGE_CASES)]
+    corpus += [(f"random-{i}", random_page(rng)) for i in range(args.random)]
+    realistic = [realistic_page(rng, i) for i in range(args.pages)]
+    corpus += [(f"realistic-{i}", html) for i, html in enumerate(realistic)]
+    if args.corpus:
+        saved = load_corpus(args.corpus)
+        corpus += saved
+        realistic += [html for _, html in saved]
+    failures = check_parity(corpus)
+    print(f"parity: {len(corpus)} pages, {failures} mismatches")
+    average = sum(len(html) for html in realistic) / len(realistic)
+    print(f"throughput on {len(realistic)} pages (avg {average / 1024:.0f} KiB), single thread:")
+    baseline = None
+    for name, extract in EXTRACTORS.items():
+        pages_per_sec, mb_per_sec = measure(extract, realistic, args.seconds)
+        baseline = baseline or pages_per_sec
+        print(f"  {name:<10} {pages_per_sec:8.1f} pages/s/core {mb_per_sec:7.2f} MB/s  {pages_per_sec / baseline:5.2f}x")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import kuzu
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from dbpool import ConnectionPool
+
+# Read-throughput load test for the connection pool: builds a throwaway database of
+# synthetic links and runs the hot read queries from N threads, each checking out its
+# own pooled connection. Usage: python load_test.py [links] [seconds_per_step]
+
+QUERIES = [
+    ("MATCH (l:Link {url: $url}) RETURN l.url", lambda urls: {"url": random.choice(urls)}),
+    ("MATCH (l:Link)-[:HAS_KEYWORD]->(k:Keyword) WHERE l.url = $url RETURN k.name", lambda urls: {"url": random.choice(urls)}),
+    ("MATCH (l:Link)-[:BELONGS_TO]->(c:Category {name: $name}) RETURN l.url LIMIT 20",
+     lambda urls: {"name": f"Category {random.randrange(20)}"})
+]
+
+
+def build_database(path, links):
+    db = kuzu.Database(path)
+    conn = kuzu.Connection(db)
+    conn.execute("CREATE NODE TABLE Link (url STRING, title STRING, PRIMARY KEY (url))")
+    conn.execute("CREATE NODE TABLE Category (name STRING, PRIMARY KEY (name))")
+    conn.execute("CREATE NODE TABLE Keyword (name STRING, PRIMARY KEY (name))")
+    conn.execute("CREATE REL TABLE BELONGS_TO (FROM Link TO Category)")
+    conn.execute("CREATE REL TABLE HAS_KEYWORD (FROM Link TO Keyword)")
+    urls = [f"https://example.com/page/{i}" for i in range(links)]
+    conn.execute("UNWIND $names AS name CREATE (:Category {name: name})", {"names": [f"Category {i}" for i in range(20)]})
+    conn.execute("UNWIND $names AS name CREATE (:Keyword {name: name})", {"names": [f"keyword {i}" for i in range(200)]})
+    conn.execute("UNWIND $urls AS url CREATE (:Link {url: url, title: url})", {"urls": urls})
+    conn.execute("MATCH (l:Link), (c:Category) WHERE c.name = 'Category ' + CAST(hash(l.url) % 20 AS STRING) "
+                 "CREATE (l)-[:BELONGS_TO]->(c)")
+    for offset in range(3):
+        conn.execute("MATCH (l:Link), (k:Keyword) WHERE k.name = 'keyword ' + CAST((hash(l.url) + $offset) % 200 AS STRING) "
+                     "CREATE (l)-[:HAS_KEYWORD]->(k)", {"offset": offset * 67})
+    conn.close()
+    return db, urls
+
+
+def run_step(pool, urls, threads, seconds):
+    counts = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def client(index):
+        while time.perf_counter() < stop:
+            query, params = random.choice(QUERIES)
+            with pool.connection() as conn:
+                result = conn.execute(query, params(urls))
+                while result.has_next():
+                    result.get_next()
+            counts[index] += 1
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / seconds
+
+
+def main():
+    links = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    cores = os.cpu_count() or 1
+    steps = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db, urls = build_database(os.path.join(tmp_dir, "load.db"), links)
+        print(f"{links} links, {cores} cores, {seconds:.0f}s per step")
+        baseline = None
+        for threads in steps:
+            pool = ConnectionPool(db, size=threads)
+            qps = run_step(pool, urls, threads, seconds)
+            baseline = baseline or qps
+            print(f"threads={threads:<3} qps={qps:10.1f} speedup={qps / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
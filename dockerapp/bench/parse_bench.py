@@ -0,0 +1,79 @@
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'app'))
+
+import datasets
+from extractor_bench import realistic_page
+from ingest import collect_records
+from pipeline import RowPipeline
+
+# Speedup of the parse stage from 1 to N worker processes, without a database:
+#  - metadata rows: collect_records over a generated links_with_metadata.csv (URL
+#    normalization, category/keyword parsing, dedupe), as done before a bulk load
+#  - fetched pages: HTML extraction submitted from job-worker-like threads
+# Speedup is bounded by the cores actually available; on a single core it stays near 1x.
+#
+#   python parse_bench.py [--rows 20000] [--pages 400] [--workers 1,2,4,8]
+
+
+def metadata_text(rows, seed):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=datasets.FIELDS)
+    writer.writeheader()
+    writer.writerows(datasets.generate_rows(rows, seed=seed))
+    return buffer.getvalue()
+
+
+def bench_metadata(pipeline, text):
+    start = time.perf_counter()
+    records, _ = collect_records(csv.DictReader(io.StringIO(text)), pipeline)
+    return len(records), time.perf_counter() - start
+
+
+def bench_pages(pipeline, pages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda page: pipeline.extract(page, 'https://example.com'), pages))
+    return len(pages), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse stage speedup from 1 to N worker processes")
+    cores = os.cpu_count() or 1
+    parser.add_argument('--rows', type=int, default=20000, help="Metadata CSV rows")
+    parser.add_argument('--pages', type=int, default=400, help="Fetched pages to extract")
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({1, 2, 4, 8, cores}) if n <= max(cores, 2)))
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=8, help="Submitting threads for page extraction (JOB_WORKERS)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    text = metadata_text(args.rows, args.seed)
+    rng = random.Random(args.seed)
+    pages = [realistic_page(rng, i) for i in range(args.pages)]
+    print(f"{cores} cores; {args.rows} metadata rows, {args.pages} pages")
+    print(f"{'workers':>7} {'rows/s':>10} {'speedup':>8} {'pages/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in [int(n) for n in args.workers.split(',')]:
+        # Started before any threads exist, as in main
+        pipeline = RowPipeline(workers=workers, chunk_size=args.chunk_size).start()
+        try:
+            rows, row_seconds = bench_metadata(pipeline, text)
+            done, page_seconds = bench_pages(pipeline, pages, args.threads)
+        finally:
+            pipeline.shutdown()
+        rates = (rows / row_seconds, done / page_seconds)
+        baseline = baseline or rates
+        print(f"{workers:>7} {rates[0]:>10.0f} {rates[0] / baseline[0]:>7.2f}x {rates[1]:>10.1f} {rates[1] / baseline[1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
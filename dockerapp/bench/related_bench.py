@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'app'))
+
+import kuzu
+
+import datasets
+from benchmark import percentiles
+from dbpool import ConnectionPool
+from ingest import copy_from, write_stage
+from keywords import KeywordIndex, keyword_labels
+
+# Keyword index build time, incremental update time and /related query latency at scale. Only
+# the tables the index reads (Link, Keyword, HAS_KEYWORD) are loaded, straight from staged
+# files, so a 100k-link graph is ready in seconds without materializing CROSS_CATEGORY edges.
+#
+#   python related_bench.py [--sizes 10000,100000] [--queries 1000]
+
+
+def load(db, rows):
+    conn = kuzu.Connection(db)
+    conn.execute("CREATE NODE TABLE Link (url STRING, title STRING, PRIMARY KEY (url))")
+    conn.execute("CREATE NODE TABLE Keyword (name STRING, label STRING, PRIMARY KEY (name))")
+    conn.execute("CREATE REL TABLE HAS_KEYWORD (FROM Link TO Keyword)")
+    stage = tempfile.mkdtemp(prefix='related_bench_')
+    try:
+        labels, pairs = {}, []
+        for row in rows:
+            for name, label in keyword_labels(row['keyword'].split(',')).items():
+                labels.setdefault(name, label)
+                pairs.append((row['url'], name))
+        for table, columns in (
+            ('Link', {"url": [row['url'] for row in rows], "title": [row['title'] for row in rows]}),
+            ('Keyword', {"name": list(labels), "label": list(labels.values())}),
+            ('HAS_KEYWORD', {"from": [url for url, _ in pairs], "to": [name for _, name in pairs]})
+        ):
+            path = os.path.join(stage, f"{table}.parquet")
+            write_stage(path, columns, 'parquet')
+            copy_from(conn, table, path, 'parquet')
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
+    conn.close()
+    return len(pairs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword index build and /related latency")
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--head-share', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    profile = datasets.load_profile()
+    for size in [int(size) for size in args.sizes.split(',')]:
+        rows = list(datasets.generate_rows(size, seed=args.seed, head_share=args.head_share, profile=profile))
+        workdir = tempfile.mkdtemp(prefix='related_db_')
+        try:
+            db = kuzu.Database(os.path.join(workdir, 'kuzu.db'))
+            edges = load(db, rows)
+            pool = ConnectionPool(db, size=2)
+            index = KeywordIndex()
+            start = time.perf_counter()
+            with pool.connection() as conn:
+                index.rebuild(conn)
+            build = time.perf_counter() - start
+            rng = random.Random(args.seed)
+            updates = []
+            for _ in range(args.queries):
+                row = rng.choice(rows)
+                record = {"url": row['url'], "title": row['title'], "keyword_list": row['keyword'].split(',')}
+                start = time.perf_counter()
+                index.delete(record['url'])
+                index.add([record])
+                updates.append(time.perf_counter() - start)
+            update = percentiles(updates)
+            samples = []
+            for _ in range(args.queries):
+                url = rng.choice(rows)['url']
+                start = time.perf_counter()
+                index.related(url, limit=args.limit)
+                samples.append(time.perf_counter() - start)
+            query = percentiles(samples)
+            print(f"size={size}: {edges} keyword edges, {len(index.names)} keywords, index build {build:.2f}s; "
+                  f"delete+add p50 {update['p50_ms']:.3f}ms; related p50 {query['p50_ms']:.2f}ms p95 {query['p95_ms']:.2f}ms max {query['max_ms']:.2f}ms")
+            del pool, db
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'app'))
+
+import datasets
+from benchmark import percentiles
+from helpers import metadata_row_to_record
+from search import SearchIndex, tokenize
+
+# Search index build, snapshot load and /search query latency at scale. Queries are drawn
+# from the indexed content itself: single words, word pairs and three- or four-letter
+# prefixes, so posting lists range from rare terms to ones found in most documents.
+#
+#   python search_bench.py [--sizes 10000,100000] [--queries 1000]
+
+
+def make_queries(records, count, rng):
+    words = [token for record in records[:2000] for token in tokenize(record['cleaned_content'])]
+    queries = {"term": [], "pair": [], "prefix": []}
+    for _ in range(count):
+        queries["term"].append(rng.choice(words))
+        queries["pair"].append(f"{rng.choice(words)} {rng.choice(words)}")
+        queries["prefix"].append(rng.choice(words)[:rng.choice((3, 4))] + '*')
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search index build and query latency")
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    profile = datasets.load_profile()
+    for size in [int(size) for size in args.sizes.split(',')]:
+        records = [metadata_row_to_record(row, row['url'])
+                   for row in datasets.generate_rows(size, seed=args.seed, profile=profile)]
+        workdir = tempfile.mkdtemp(prefix='search_bench_')
+        try:
+            index = SearchIndex(workdir, compact_every=0)
+            start = time.perf_counter()
+            index.add(records)
+            build = time.perf_counter() - start
+            index.compact()
+            start = time.perf_counter()
+            SearchIndex(workdir).load()
+            load = time.perf_counter() - start
+            rng = random.Random(args.seed)
+            line = f"size={size}: {len(index.postings)} terms, build {build:.2f}s, snapshot load {load:.2f}s"
+            for kind, queries in make_queries(records, args.queries, rng).items():
+                samples = []
+                for query in queries:
+                    start = time.perf_counter()
+                    index.search(query, limit=args.limit)
+                    samples.append(time.perf_counter() - start)
+                query = percentiles(samples)
+                line += f"; {kind} p50 {query['p50_ms']:.2f}ms p95 {query['p95_ms']:.2f}ms"
+            print(line)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'app'))
+
+import datasets
+from benchmark import percentiles
+from helpers import metadata_row_to_record
+from similarity import VectorIndex, hashing_embedder
+
+# Embedding throughput, /similar query latency and the all-links top-k pass that
+# materializes SIMILAR_TO edges, with the local hashing embedder. Nothing touches the
+# database: the edge load itself is a single COPY FROM.
+#
+#   python similar_bench.py [--sizes 10000,100000] [--queries 1000]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding, /similar and SIMILAR_TO rebuild timings")
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    profile = datasets.load_profile()
+    for size in [int(size) for size in args.sizes.split(',')]:
+        records = [metadata_row_to_record(row, row['url'])
+                   for row in datasets.generate_rows(size, seed=args.seed, profile=profile)]
+        workdir = tempfile.mkdtemp(prefix='similar_bench_')
+        try:
+            index = VectorIndex(workdir, hashing_embedder(), save_every=0)
+            start = time.perf_counter()
+            index.add(records)
+            embed = time.perf_counter() - start
+            start = time.perf_counter()
+            index.save()
+            VectorIndex(workdir, hashing_embedder()).load()
+            save_load = time.perf_counter() - start
+            rng = random.Random(args.seed)
+            samples = []
+            for _ in range(args.queries):
+                url = rng.choice(records)['url']
+                start = time.perf_counter()
+                index.neighbours(url, k=10, threshold=args.threshold)
+                samples.append(time.perf_counter() - start)
+            query = percentiles(samples)
+            start = time.perf_counter()
+            pairs = index.pairs(k=args.k, threshold=args.threshold)
+            rebuild = time.perf_counter() - start
+            print(f"size={size}: embed {size / embed:.0f} links/s, save+load {save_load:.2f}s; "
+                  f"similar p50 {query['p50_ms']:.2f}ms p95 {query['p95_ms']:.2f}ms; "
+                  f"top-{args.k} pairs for all links {rebuild:.1f}s ({len(pairs)} edges)")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
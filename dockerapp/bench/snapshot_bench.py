@@ -0,0 +1,111 @@
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, '..', 'app')
+sys.path.insert(0, BENCH_DIR)
+
+import datasets
+
+# Graph snapshot size and load time against the verbose /graph_data JSON. Each size runs
+# in a fresh process that preloads a generated metadata CSV (what the notebook used to
+# replay before it could draw the graph), builds the snapshot, and reports the payload
+# sizes, the size of the delta after deleting a few links, and how long memory-mapping
+# the saved arrays takes.
+#
+#   python snapshot_bench.py [--sizes 1000,10000] [--deletes 5]
+
+
+def child(workdir, deletes):
+    os.environ.update({
+        "KUZU_DB_PATH": os.path.join(workdir, 'db', 'kuzu.db'),
+        "METADATA_CSV": os.path.join(workdir, 'links_with_metadata.csv'),
+        "LLM_CACHE_DIR": os.path.join(workdir, 'llm_cache'),
+        "JOBS_DIR": os.path.join(workdir, 'jobs'),
+        "SEARCH_INDEX_DIR": os.path.join(workdir, 'search'),
+        "VECTOR_INDEX_DIR": os.path.join(workdir, 'vectors'),
+        "GRAPH_SNAPSHOT_DIR": os.path.join(workdir, 'graph'),
+        "OLLAMA_HOST": "http://127.0.0.1:9",
+        "LOG_LEVEL": os.getenv('LOG_LEVEL', 'WARNING')
+    })
+    sys.path.insert(0, APP_DIR)
+    import main
+    from graph_snapshot import decode_strings, load_arrays
+    client = main.app.test_client()
+    start = time.perf_counter()
+    main.preload_metadata_csv()
+    ingest = time.perf_counter() - start
+    start = time.perf_counter()
+    main.graph_snapshot.refresh(main.data_version.tag(), main.pool.connection)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    graph_data = client.get('/graph_data').data
+    graph_data_s = time.perf_counter() - start
+    full = client.get('/graph_snapshot').data
+    start = time.perf_counter()
+    full_gzip = client.get('/graph_snapshot', headers={'Accept-Encoding': 'gzip'}).data
+    full_gzip_s = time.perf_counter() - start
+    version = json.loads(full)['version']
+    snapshot = main.graph_snapshot
+    urls = [key.partition(':')[2] for key in snapshot.keys if key and key.startswith('Link:')][:deletes]
+    for url in urls:
+        client.post('/delete_link', data={"url": url})
+    start = time.perf_counter()
+    delta = client.get(f'/graph_snapshot?since={version}', headers={'Accept-Encoding': 'gzip'}).data
+    delta_s = time.perf_counter() - start
+    start = time.perf_counter()
+    meta, arrays = load_arrays(snapshot.snapshot_dir)
+    strings = decode_strings(arrays['strings'], arrays['string_offsets'])
+    labels = [strings[label] for label in arrays['node_label'].tolist() if label >= 0]
+    mmap_s = time.perf_counter() - start
+    print(json.dumps({
+        "nodes": meta['nodes'], "edges": meta['edges'], "labels": len(labels),
+        "ingest_s": ingest, "build_s": build, "mmap_s": mmap_s,
+        "graph_data_bytes": len(graph_data), "graph_data_gzip_bytes": len(gzip.compress(graph_data)),
+        "graph_data_s": graph_data_s, "snapshot_bytes": len(full), "snapshot_gzip_bytes": len(full_gzip),
+        "snapshot_gzip_s": full_gzip_s, "delta_gzip_bytes": len(delta), "delta_s": delta_s,
+        "files_bytes": sum(os.path.getsize(os.path.join(snapshot.directory(meta['version']), name))
+                           for name in os.listdir(snapshot.directory(meta['version'])))
+    }))
+    sys.stdout.flush()
+    os._exit(0)  # Skip waiting on the job and parse worker threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph snapshot size and load time")
+    parser.add_argument('--sizes', default='1000,10000')
+    parser.add_argument('--deletes', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.deletes)
+    for size in [int(size) for size in args.sizes.split(',')]:
+        workdir = tempfile.mkdtemp(prefix='snapshot_bench_')
+        try:
+            os.makedirs(os.path.join(workdir, 'db'))
+            datasets.write_metadata_csv(os.path.join(workdir, 'links_with_metadata.csv'), size, seed=args.seed)
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', workdir,
+                                     '--deletes', str(args.deletes)], check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            kb = lambda key: result[key] / 1024
+            print(f"size={size}: {result['nodes']} nodes, {result['edges']} edges; "
+                  f"/graph_data {kb('graph_data_bytes'):.0f}KB ({kb('graph_data_gzip_bytes'):.0f}KB gzipped) "
+                  f"in {result['graph_data_s'] * 1000:.0f}ms; /graph_snapshot {kb('snapshot_bytes'):.0f}KB, "
+                  f"{kb('snapshot_gzip_bytes'):.0f}KB gzip in {result['snapshot_gzip_s'] * 1000:.0f}ms; "
+                  f"delta after {args.deletes} deletes {result['delta_gzip_bytes']}B in {result['delta_s'] * 1000:.0f}ms; "
+                  f"snapshot build {result['build_s']:.2f}s, files {kb('files_bytes'):.0f}KB, "
+                  f"mmap load {result['mmap_s'] * 1000:.0f}ms vs CSV ingest {result['ingest_s']:.2f}s")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import http.server
+import json
+import random
+import threading
+import time
+import zlib
+
+# Local stand-ins for the network and Ollama so benchmarks are reproducible offline.
+# Both servers answer with deterministic, per-URL content after a configurable delay.
+
+WORDS = ("graph database query language knowledge network analysis fraud detection ownership "
+         "compliance energy grid health record model search index retrieval ledger").split()
+
+
+class PageHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0.02
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        rng = random.Random(self.path)
+        paragraphs = ''.join(f"<p>{' '.join(rng.choice(WORDS) for _ in range(60))}</p>" for _ in range(rng.randint(3, 12)))
+        body = (f"<html><head><title>Page {self.path}</title></head>"
+                f"<body><h1>{self.path}</h1>{paragraphs}</body></html>").encode('utf-8')
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OllamaHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0.05
+    categories = ['Database']
+    keywords = ['graph database']
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = request['messages'][0]['content']
+        time.sleep(self.delay)
+        rng = random.Random(prompt)
+        category = rng.choice(self.categories)
+        keywords = rng.sample(self.keywords, min(3, len(self.keywords)))
+        if request.get('format'):
+            content = json.dumps({
+                "cleaned_content": prompt[:500], "category": category, "keywords": keywords,
+                "category_explanation": "Synthetic.", "keyword_explanations": ["Synthetic."] * len(keywords)
+            })
+        elif prompt.startswith('Extract'):
+            content = prompt[:500]
+        else:
+            content = f"Category: {category} Keywords: {', '.join(keywords)}."
+        body = json.dumps({
+            "model": request['model'], "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": content},
+            "done": True, "eval_count": 40, "eval_duration": int(self.delay * 1e9)
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(handler):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
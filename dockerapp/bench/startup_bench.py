@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, '..', 'app')
+sys.path.insert(0, BENCH_DIR)
+
+import datasets
+from benchmark import percentiles
+
+# Container restart latency. The first start preloads a generated metadata CSV; every
+# restart after that runs in a fresh process the way `python main.py` does: import the
+# app, start warm_up() in the background and serve. Reported per restart are the import
+# time (until the server could start listening), the first index page and /search
+# responses issued right away, and when the background warm-up finished.
+#
+#   python startup_bench.py [--sizes 1000,10000] [--restarts 5]
+
+
+def child(workdir):
+    start = time.perf_counter()
+    os.environ.update({
+        "KUZU_DB_PATH": os.path.join(workdir, 'db', 'kuzu.db'),
+        "METADATA_CSV": os.path.join(workdir, 'links_with_metadata.csv'),
+        "LLM_CACHE_DIR": os.path.join(workdir, 'llm_cache'),
+        "JOBS_DIR": os.path.join(workdir, 'jobs'),
+        "SEARCH_INDEX_DIR": os.path.join(workdir, 'search'),
+        "VECTOR_INDEX_DIR": os.path.join(workdir, 'vectors'),
+        "GRAPH_SNAPSHOT_DIR": os.path.join(workdir, 'graph'),
+        "OLLAMA_HOST": "http://127.0.0.1:9",
+        "LOG_LEVEL": os.getenv('LOG_LEVEL', 'WARNING')
+    })
+    sys.path.insert(0, APP_DIR)
+    import main
+    imported = time.perf_counter()
+    warm_up = threading.Thread(target=main.warm_up)
+    warm_up.start()
+    client = main.app.test_client()
+    page_status = client.get('/').status_code
+    page = time.perf_counter()
+    search_status = client.get('/search?q=graph').status_code
+    search = time.perf_counter()
+    warm_up.join()
+    finished = time.perf_counter()
+    main.index_updates.submit(main.vector_index.save).result()  # After the embeddings a first-start preload queued
+    print(json.dumps({
+        "import_s": imported - start,
+        "first_page_s": page - imported,
+        "first_search_s": search - page,
+        "warm_up_s": finished - imported,
+        "status": [page_status, search_status],
+        "links": len(main.search_index)
+    }))
+    sys.stdout.flush()
+    os._exit(0)  # Skip waiting on the job and parse worker threads
+
+
+def start_app(workdir):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', workdir],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restart latency with an already loaded database")
+    parser.add_argument('--sizes', default='1000,10000')
+    parser.add_argument('--restarts', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+    for size in [int(size) for size in args.sizes.split(',')]:
+        workdir = tempfile.mkdtemp(prefix='startup_bench_')
+        try:
+            os.makedirs(os.path.join(workdir, 'db'))
+            datasets.write_metadata_csv(os.path.join(workdir, 'links_with_metadata.csv'), size, seed=args.seed)
+            first = start_app(workdir)
+            runs = [start_app(workdir) for _ in range(args.restarts)]
+            line = f"size={size}: first start warm-up {first['warm_up_s']:.2f}s ({first['links']} links)"
+            for key in ('import_s', 'first_page_s', 'first_search_s', 'warm_up_s'):
+                line += f"; {key[:-2]} p50 {percentiles([run[key] for run in runs])['p50_ms']:.0f}ms"
+            print(line)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
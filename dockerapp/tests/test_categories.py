@@ -0,0 +1,81 @@
+import os
+import random
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from categories import DEFAULT_TAXONOMY, CategoryMatcher, category_for
+
+# Run from dockerapp/: python -m unittest discover tests
+# CategoryMatcher must resolve exactly like the per-row regex loop it replaced, kept verbatim below (with the
+# taxonomy as a parameter). bench/category_bench.py runs the same comparison over the repo's CSVs and times it.
+
+
+def legacy_parse_category_and_keywords(response, categories=DEFAULT_TAXONOMY):
+    category = 'Uncategorized'
+    suggested_category = 'Uncategorized'
+    keywords = ['none']
+    if not response:
+        return category, suggested_category, keywords
+    match = re.search(r'Category:\s*([A-Za-z\s/]+)(?:\s*Keywords:|$)', response)
+    if match:
+        suggested_category = match.group(1).strip()
+    for cat in categories:
+        if cat.lower() == suggested_category.lower() or cat.lower() in response.lower():
+            category = cat
+            break
+    match = re.search(r'Keywords:\s*([^.]+)', response)
+    if match:
+        keyword_str = match.group(1).strip()
+        keywords = [k.strip() for k in keyword_str.split(',') if k.strip()][:3]
+    if not keywords or keywords == ['none']:
+        keywords = re.findall(r'\b[A-Z][a-zA-Z\s-]+\b', response)
+        keywords = [k.strip() for k in keywords if len(k.split()) <= 2 and k.lower() not in category.lower() and k.lower() not in suggested_category.lower()][:3]
+    return category, suggested_category, keywords if keywords else ['none']
+
+
+def random_responses(rng, count, taxonomy):
+    pieces = list(taxonomy) + [name.upper() for name in taxonomy] + [
+        'Category:', 'Keywords:', 'Category: ', 'Keywords: ', '.', ',', ' ', '\n', 'İstanbul', 'ΣΊΣΥΦΟΣ', 'straße',
+        'Graph Databases', 'none', 'Knowledge Graph', 'uncategorized', 'healthcare database', 'News/Blog', 'Data',
+        'E-Commerce platform', 'Machine Learning', 'AI'
+    ]
+    for _ in range(count):
+        yield ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+
+
+RESPONSES = [
+    '', 'Category:', 'Keywords: none', 'Category: Database', 'Category: database\nKeywords: graph, kuzu, cypher',
+    'Category: Blog Keywords: graph databases, neo4j. The post compares graph engines.',
+    'Category: Unknown Thing\nKeywords: none', 'Category: News/Blog', 'Category: Machine Learning / AI',
+    'A post about Data Analysis and Machine Learning with Python Pandas.',
+    'Category: Blog\nKeywords: a, b, c, d', 'Category: E-commerce Keywords: Shopify, Stripe',
+    'Category: ΣΊΣΥΦΟΣ İstanbul straße', 'Knowledge Graph Tools For Healthcare Data',
+]
+
+
+class CategoryMatcherTest(unittest.TestCase):
+    def check(self, taxonomy, responses):
+        matcher = CategoryMatcher(taxonomy)
+        for response in responses:
+            with self.subTest(response=response[:80]):
+                self.assertEqual(matcher.parse(response), legacy_parse_category_and_keywords(response, taxonomy))
+
+    def test_matches_legacy_parse(self):
+        self.check(DEFAULT_TAXONOMY, RESPONSES + list(random_responses(random.Random(0), 2000, DEFAULT_TAXONOMY)))
+
+    def test_matches_legacy_parse_with_overlapping_taxonomy(self):
+        # Reversed priorities plus entries that are substrings of others
+        taxonomy = list(reversed(DEFAULT_TAXONOMY)) + ['database', 'Graph']
+        self.check(taxonomy, RESPONSES + list(random_responses(random.Random(1), 2000, taxonomy)))
+
+    def test_category_for_matches_legacy_parse(self):
+        for label in ['Database', 'database', 'News/Blog', 'Graph Databases', 'Uncategorized', '', 'Data Analysis']:
+            with self.subTest(label=label):
+                self.assertEqual(category_for(label), legacy_parse_category_and_keywords(f"Category: {label}")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
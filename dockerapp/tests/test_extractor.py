@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from bs4 import XMLParsedAsHTMLWarning
+
+from extractor import MAX_CONTENT_CHARS, StreamingExtractor, _Done, extract_streaming, extract_with_soup
+
+# Run from dockerapp/: python -m unittest discover tests
+# A small subset of bench/extractor_bench.py's parity corpus; the bench adds random tag soup and saved pages.
+
+URL = "https://example.com/page"
+
+CASES = {
+    "entities": "<title>A &amp; B &#8217; &#x2014; &#150; &bogus; &amp</title><p>&lt;x&gt; &copy a&b &#0; &#xD800; &#65</p>",
+    "nbsp": "<p>ünïcödé — “quotes” &nbsp;non&nbsp;breaking&nbsp;</p>",
+    "void tags": "<p>line<br>break<br/>again</br></p><p>image <img src='x.png'> rule <hr> end</p>",
+    "stray end tags": "</p><p>stray end tag first</div> still</p></span>",
+    "self closed": "<p/>self closed<p>next</p>",
+    "unclosed paragraphs": "<p>one<p>two<p>three",
+    "nested content tags": "<h1>Title<p>nested paragraph</p> tail</h1><p>outer <span>inner</span> <b>bold</b></p>",
+    "script and style": "<p>script <script>var x = '<p>not text</p>';</script> after <style>p {}</style></p>",
+    "template": "<template><p>template text</p></template><p>visible</p>",
+    "cdata": "<p>cdata <![CDATA[inside cdata]]> after</p><p>comment<!-- c -->split</p>",
+    "svg title": "<svg><title>Icon</title></svg><title>Page</title><p>x</p>",
+    "unclosed title": "<title>Unclosed title<p>para",
+    "document": "<!DOCTYPE html><html><head><title>Doc</title></head><body><p>Body</p></body></html>",
+    "long paragraph": "<p>" + "x" * 6000,
+    "many paragraphs": "<title>Big</title>" + "<p>word</p>" * 3000 + "<p>tail</p>",
+}
+
+
+class ExtractorParityTest(unittest.TestCase):
+    def test_streaming_matches_soup(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', XMLParsedAsHTMLWarning)
+            for name, html in CASES.items():
+                with self.subTest(name):
+                    self.assertEqual(extract_streaming(html, URL), extract_with_soup(html, URL))
+
+    def test_content_is_capped(self):
+        title, content = extract_streaming(CASES["many paragraphs"], URL)
+        self.assertEqual(title, "Big")
+        self.assertEqual(len(content), MAX_CONTENT_CHARS)
+
+    def test_stops_once_the_limit_is_reached(self):
+        # Once the title is known, parsing ends inside the handlers before the rest of the page is tokenized
+        parser = StreamingExtractor(limit=100)
+        with self.assertRaises(_Done):
+            parser.feed("<title>T</title><p>" + "word " * 100 + "</p>" * 10 + "<p>unreached</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import kuzu
+
+from helpers import LINK_COLUMNS, metadata_row_to_record
+from ingest import bulk_load
+from interconnections import SCHEMA as CROSS_CATEGORY_SCHEMA, count_cross_category, rebuild_cross_category
+from listing import count_links
+
+# Run from dockerapp/: python -m unittest discover tests
+
+SCHEMA = [
+    f"CREATE NODE TABLE Link ({', '.join(f'{column} STRING' for column in LINK_COLUMNS)}, PRIMARY KEY (url))",
+    "CREATE NODE TABLE Category (name STRING, PRIMARY KEY (name))",
+    "CREATE NODE TABLE Keyword (name STRING, label STRING, PRIMARY KEY (name))",
+    "CREATE REL TABLE BELONGS_TO (FROM Link TO Category)",
+    "CREATE REL TABLE HAS_KEYWORD (FROM Link TO Keyword)",
+    CROSS_CATEGORY_SCHEMA
+]
+
+
+def record(url, category, keyword):
+    return metadata_row_to_record({"title": url, "content": "Some content", "category": category, "keyword": keyword,
+                                   "category_explanation": "", "keyword_explanation": ""}, url)
+
+
+class MergeExistingTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='ingest_test_')
+        self.db = kuzu.Database(os.path.join(self.workdir, 'kuzu.db'))
+        self.conn = kuzu.Connection(self.db)
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+
+    def tearDown(self):
+        self.conn.close()
+        self.db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def rows(self, query):
+        return sorted(tuple(row) for row in self.conn.execute(query, {"url": "https://a.com/x"}))
+
+    def test_merge_replaces_category_and_keywords(self):
+        bulk_load(self.conn, [record("https://a.com/x", "Database", "graph, kuzu"),
+                              record("https://b.com/y", "Blog", "graph"),
+                              record("https://c.com/z", "Blog", "python")], fmt='csv')
+        self.assertEqual(count_cross_category(self.conn), 1)  # a and b share 'graph' across Database and Blog
+
+        changed = record("https://a.com/x", "Blog", "python")
+        stats = bulk_load(self.conn, [changed], fmt='csv', merge_existing=True)
+
+        self.assertEqual(stats['merged'], 1)
+        self.assertEqual(self.rows("MATCH (l:Link {url: $url})-[:BELONGS_TO]->(c:Category) RETURN c.name"),
+                         [(changed['category'],)])
+        self.assertEqual(self.rows("MATCH (l:Link {url: $url})-[:HAS_KEYWORD]->(k:Keyword) RETURN k.name"),
+                         [("python",)])
+        self.assertEqual(count_links(self.conn), 3)
+        self.assertEqual(count_cross_category(self.conn), 0)  # a, b and c now all belong to Blog
+
+    def test_small_batch_refreshes_cross_category(self):
+        bulk_load(self.conn, [record(f"https://{name}.com", "Blog", "graph") for name in "abcde"], fmt='csv')
+        self.assertEqual(count_cross_category(self.conn), 0)
+
+        bulk_load(self.conn, [record("https://f.com", "Database", "graph")], fmt='csv')  # Below REBUILD_SHARE
+
+        self.assertEqual(count_cross_category(self.conn), 5)
+        self.assertEqual(rebuild_cross_category(self.conn), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
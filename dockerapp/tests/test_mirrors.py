@@ -0,0 +1,36 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from mirrors import MirrorIndex
+
+# Run from dockerapp/: python -m unittest discover tests
+
+
+class MirrorIndexTest(unittest.TestCase):
+    def test_find_skips_the_link_itself(self):
+        index = MirrorIndex()
+        index.add([{"url": "https://a.com", "content_hash": "h1"}, {"url": "https://b.com", "content_hash": "h1"},
+                   {"url": "https://c.com", "content_hash": ""}])
+
+        self.assertEqual(index.find("h1", "https://b.com"), "https://a.com")
+        self.assertEqual(index.find("h1", "https://a.com"), "https://b.com")
+        self.assertIsNone(index.find("h2"))
+        self.assertEqual(len(index), 2)  # Links without a fingerprint are not indexed
+
+    def test_replace_and_delete(self):
+        index = MirrorIndex()
+        index.add([{"url": "https://a.com", "content_hash": "h1"}, {"url": "https://b.com", "content_hash": "h1"}])
+
+        index.set("https://a.com", "h2")
+        index.delete("https://b.com")
+
+        self.assertIsNone(index.find("h1"))
+        self.assertEqual(index.find("h2"), "https://a.com")
+        self.assertEqual(index.urls, {"h2": {"https://a.com"}})
+
+
+if __name__ == "__main__":
+    unittest.main()